@@ -0,0 +1,123 @@
+"""
+Persistent answer cache for repeated questions
+--> Keys answers on (document hash, model, normalized question, prompt template version)
+--> Stores answers in SQLite with TTL expiry and LRU eviction
+--> Tracks hit/miss counters for display in the sidebar
+"""
+
+# import required libraries
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+DEFAULT_DB_PATH = os.environ.get("FINDOC_ANSWER_CACHE", os.path.join(".cache", "answers.sqlite3"))
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600    # one week
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?.! ")
+
+
+# Answer Cache : SQLite-backed store of model answers
+class AnswerCache:
+    """Answer cache with TTL expiry, LRU eviction and hit/miss counters"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    document_hash TEXT,
+                    model TEXT,
+                    question TEXT,
+                    answer TEXT,
+                    created_at REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_access ON answers (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection per call so the cache is safe to share across threads"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:    # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(document_hash: str, model: str, question: str, template_version: str) -> str:
+        """Build the cache key for a question about a document"""
+        raw = "\x1f".join([document_hash or "", model, normalize_question(question), str(template_version)])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached answer, or None if missing or expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT answer, created_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE answers SET last_access = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, document_hash: str, model: str, question: str, answer: str):
+        """Store an answer and evict the least recently used entries beyond max_entries"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, document_hash, model, normalize_question(question), answer, now, now)
+            )
+            conn.execute("""
+                DELETE FROM answers WHERE key IN (
+                    SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        """Remove all cached answers and reset the counters"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
@@ -1,183 +1,318 @@
 # import required libraries
 import streamlit as st
 import pandas as pd
-import PyPDF2
-import io
-import requests
 import json
-import re
-from typing import Dict, List, Any, Optional
-import numpy as np
-import openpyxl
-from openpyxl import load_workbook
-import plotly.express as px
-import plotly.graph_objects as go
+import logging
+import time
+from typing import Dict, List, Any, Iterator
+from retrieval import DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET, estimate_tokens
+from doc_cache import DocumentCache, document_key
+from answer_cache import AnswerCache
+from ingest import PdfIngestion
+from jobs import JobQueue
+from table_store import TableStore
+from column_stats import describe_table
+from semantic_index import SemanticSearch
+from workspace import QUICK_QUESTIONS, Workspace
+from context_budget import ANSWER_RESERVE_TOKENS, context_window, fit_budget, token_report
+from conversation import Conversation
+from ollama_client import OllamaClient
+from document_processor import DocumentProcessor
+from tracing import METRICS_PORT, start_metrics_server, tracer
 
 
-# Configure Streamlit page
-st.set_page_config(
-    page_title="Financial Document Q&A Assistant",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+INGEST_POLL_SECONDS = 1.0    # refresh interval while documents are still being extracted or processed
+PAGE_SIZES = [100, 500, 1000]    # sheet rows sent to the browser per page
+MAX_CHART_ITEMS = 1000    # line items offered in the period chart selector
 
+logger = logging.getLogger(__name__)
 
-# Ollama Client : Handles communication with Ollama API for LLM responses
-class OllamaClient:
-    """Client for interacting with Ollama API"""
+
+# Streamlit Helper Functions
+def initialize_session_state():
+    """Initialize Streamlit session state variables"""
+    if 'messages' not in st.session_state:
+        st.session_state.messages = []    # chat history
+    if 'workspace' not in st.session_state:
+        st.session_state.workspace = Workspace(jobs=get_job_queue(), semantic=get_semantic_search())    # loaded documents: text, tables, metrics and index per file
+    if 'conversation' not in st.session_state:
+        st.session_state.conversation = None    # chat history sent to Ollama in conversation mode
+    if 'ollama_client' not in st.session_state:
+        st.session_state.ollama_client = OllamaClient(on_error=st.error)
+
+@st.cache_resource
+def get_document_cache() -> DocumentCache:
+    """Processed document cache shared by all sessions on this server"""
+    return DocumentCache()
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Answer cache shared by all sessions on this server"""
+    return AnswerCache()
+
+@st.cache_resource
+def get_metrics_server():
+    """Prometheus /metrics endpoint (when FINDOC_METRICS_PORT is set), started once per server"""
+    return start_metrics_server()
+
+@st.cache_resource
+def get_table_store() -> TableStore:
+    """Memory-mapped table store shared by all sessions on this server"""
+    # Evicted documents leave the document cache too, so a later upload is reprocessed
+    return TableStore(on_evict=get_document_cache().invalidate)
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Background document processing pool shared by all sessions on this server"""
+    return JobQueue()
+
+@st.cache_resource
+def get_semantic_search() -> SemanticSearch:
+    """Chunk embedding and vector store shared by all sessions on this server"""
+    return SemanticSearch()
+
+def process_uploaded_file(uploaded_file, key: str, table_store: TableStore) -> Dict[str, Any]:
+    """Extract text, tables, metrics and retrieval index from an uploaded file (runs as a background job)"""
+    processed = DocumentProcessor().process(uploaded_file)    # read errors fail the job and are shown by sync_ingestion
+    processed['excel_data'] = table_store.save(key, processed['excel_data'])    # sheets move to memory-mapped files
+    return processed
+
+def load_documents(uploaded_files: List[Any]):
+    """Add newly uploaded files to the workspace and drop the ones removed from the uploader"""
+    workspace = st.session_state.workspace
+    files = {}
+    for uploaded_file in uploaded_files:
+        start = time.perf_counter()
+        data = uploaded_file.getvalue()
+        key = document_key(data)    # hashing is part of reading the upload
+        if key not in workspace and key not in files:
+            tracer.record('upload_read', time.perf_counter() - start, bytes=len(data))
+        files.setdefault(key, uploaded_file)
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
-        self.available_models = []
-        self.check_connection()    # Check if Ollama is running and fetch models
+    cache = get_document_cache()
+    for key, uploaded_file in files.items():
+        if key in workspace:
+            continue    # reruns keep already loaded documents
+        info = {'type': uploaded_file.type, 'size': uploaded_file.size}
+        processed = cache.get(key)
+        if processed is not None:
+            workspace.add(key, uploaded_file.name, processed, **info)
+        elif uploaded_file.type == "application/pdf":
+            # Large PDFs become queryable after the first pages; the rest loads in the background
+            try:
+                ingestion = PdfIngestion(uploaded_file.getvalue()).start()
+            except Exception as e:
+                # Kept with its error so reruns do not try (and fail) again
+                document = workspace.add(key, uploaded_file.name, **info)
+                document['error'] = str(e)
+                st.error(f"Error reading {document['name']}: {document['error']}")
+                continue
+            workspace.add(key, uploaded_file.name, ingestion=ingestion, **info)
+        else:
+            # Other files are processed by the job queue; sync_ingestion swaps the result in when it is done
+            job_id = get_job_queue().submit(process_uploaded_file, uploaded_file, key, get_table_store(),
+                                            name=uploaded_file.name)
+            workspace.add(key, uploaded_file.name, job=job_id, **info)
     
-    def check_connection(self):
-        """Check if Ollama is running and get available models"""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            if response.status_code == 200:
-                models_data = response.json()
-                self.available_models = [model['name'] for model in models_data.get('models', [])]
-                return True
-        except requests.exceptions.ConnectionError:
-            st.error("❌ Cannot connect to Ollama. Please ensure Ollama is running on localhost:11434")
-            return False
-        except Exception as e:
-            st.error(f"❌ Error connecting to Ollama: {str(e)}")
-            return False
+    new_ingestions = [document for document in workspace.ingesting()
+                      if document['ingestion'] is not None and not document['ingested_pages']]
+    if new_ingestions:
+        with st.spinner("Reading first pages..."):
+            for document in new_ingestions:
+                document['ingestion'].wait_until_ready()
     
-    def generate_response(self, model: str, prompt: str, context: str = "") -> str:
-        """Generate response using Ollama model"""
-        """Send user question + document content to Ollama and return response"""
-        try:
-            # Build full prompt with context + question
-            full_prompt = f"""You are a financial document analysis assistant. Based on the following financial document content, answer the user's question accurately and concisely.
+    workspace.retain(list(files))
 
-Document Content:
-{context}
+def sync_ingestion():
+    """Fold pages extracted and documents processed in the background into the workspace"""
+    for document in st.session_state.workspace.sync():
+        if document['error'] == "Cancelled":
+            st.warning(f"Stopped loading {document['name']}")
+        elif document['error']:
+            st.error(f"Error reading {document['name']}: {document['error']}")
+        elif document['document_content']:
+            document['excel_data'] = get_table_store().save(document['key'], document['excel_data'])
+            get_document_cache().put(document['key'], Workspace.processed(document))
 
-User Question: {prompt}
+def format_response_stats(stats: Dict[str, Any]) -> str:
+    """Format response timing stats as a short caption"""
+    if not stats or not stats.get('total_s'):
+        return ""
+    queued = f"⏳ Queued {stats['queue_s']:.2f}s · " if stats.get('queue_s', 0) >= 0.05 else ""
+    first_token = f"First token {stats['first_token_s']:.2f}s · " if stats.get('first_token_s') is not None else ""
+    caption = (f"{queued}⏱️ {first_token}"
+               f"{stats['tokens']} tokens in {stats['total_s']:.2f}s · "
+               f"{stats['tokens_per_s']:.1f} tokens/s")
+    # Only tokens Ollama had to evaluate count here; a reused conversation prefix is not re-evaluated
+    if stats.get('prompt_tokens') is not None:
+        caption += f" · 🧠 Prompt eval {stats['prompt_tokens']:,} tokens in {stats['prompt_eval_s']:.2f}s"
+    return caption
 
-Please provide a clear, accurate answer based only on the information in the document. If the information is not available in the document, please state that clearly."""
+def render_streamed_response(token_stream: Iterator[str]) -> str:
+    """Render tokens incrementally in the current container and return the full text"""
+    placeholder = st.empty()
+    parts = []
+    for token in token_stream:
+        parts.append(token)
+        placeholder.markdown("".join(parts) + "▌")
+    response = "".join(parts)
+    placeholder.markdown(response)
+    return response
 
-            # Request payload
-            payload = {
-                "model": model,
-                "prompt": full_prompt,
-                "stream": False
-            }
-            
-            # Call Ollama API
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                return response.json().get('response', 'No response generated')
-            else:
-                return f"Error: {response.status_code} - {response.text}"
-                
-        except requests.exceptions.Timeout:
-            return "Request timed out. Please try again."
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+def get_conversation(keys: List[str], model: str, token_budget: int) -> Conversation:
+    """Return the conversation for this model and document selection, starting a new one when either changes"""
+    key = (model, tuple(keys))
+    conversation = st.session_state.conversation
+    if conversation is None or conversation.key != key:
+        workspace = st.session_state.workspace
+        budget = fit_budget(model, token_budget, OllamaClient.build_system_prompt())
+        
+        # Documents that fit go into the stable prefix once; larger (or still loading) ones send excerpts per question
+        document_tokens = sum(document['document_index'].total_tokens for document in workspace.select(keys))
+        in_prefix = document_tokens <= budget and not workspace.ingesting(keys)
+        context = workspace.build_context("", keys, token_budget=budget) if in_prefix else ""
+        conversation = Conversation(key, OllamaClient.build_system_prompt(context), in_prefix)
+        st.session_state.conversation = conversation
+    return conversation
 
+def answer_question(question: str, keys: List[str], model: str, top_k: int, token_budget: int,
+                    stream: bool = True, direct: bool = True, chat: bool = True, semantic: bool = True) -> Dict[str, Any]:
+    """Answer a question about the selected documents in an assistant chat bubble and return the chat message
 
-# Document Processor : Extracts text/data from PDFs and Excel sheets
-class DocumentProcessor:
-    """Handles processing of PDF and Excel financial documents"""
+    With chat=True earlier turns are sent along, keeping the prompt prefix stable so Ollama reuses it.
+    With semantic=True excerpts are also ranked by meaning, for documents whose chunks are embedded.
+    """
+    client = st.session_state.ollama_client
+    workspace = st.session_state.workspace
+    conversation = get_conversation(keys, model, token_budget) if chat else None
+    stats = ""
     
-    @staticmethod
-    def extract_pdf_text(uploaded_file) -> str:
-        """Read PDF and return extracted text"""
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            st.error(f"Error reading PDF: {str(e)}")
-            return ""
+    # Simple metric questions are answered from the tables without calling the model
+    if direct:
+        routed = workspace.route(question, keys)
+        if routed['answer'] is not None:
+            source = "tables" if routed['route'] == 'table' else "extracted metrics"
+            stats = f"🧮 Answered from {source} in {routed['elapsed_ms']:.1f} ms"
+            with st.chat_message("assistant"):
+                st.markdown(routed['answer'])
+                st.caption(stats)
+            if conversation is not None:
+                conversation.record(question, routed['answer'])
+            return {"role": "assistant", "content": routed['answer'], "stats": stats}
     
-    @staticmethod
-    def extract_excel_data(uploaded_file) -> tuple[str, Dict[str, pd.DataFrame]]:
-        """Extract data from Excel file"""
-        """Read all Excel sheets → return text summary + DataFrames"""
-        try:
-            # Read all sheets
-            excel_file = pd.ExcelFile(io.BytesIO(uploaded_file.read()))
-            sheets_data = {}
-            text_summary = ""
-            
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                sheets_data[sheet_name] = df
-                
-                # Create text summary of the sheet
-                text_summary += f"\n=== Sheet: {sheet_name} ===\n"
-                text_summary += f"Shape: {df.shape[0]} rows, {df.shape[1]} columns\n"
-                text_summary += f"Columns: {', '.join(df.columns.astype(str))}\n"
-                
-                # Add numeric data summary
-                numeric_cols = df.select_dtypes(include=[np.number]).columns
-                if len(numeric_cols) > 0:
-                    text_summary += "\nNumeric Data Summary:\n"
-                    for col in numeric_cols:
-                        if df[col].notna().sum() > 0:
-                            text_summary += f"{col}: Min={df[col].min():.2f}, Max={df[col].max():.2f}, Mean={df[col].mean():.2f}\n"
-                
-                # Add first few rows as text
-                text_summary += "\nSample Data:\n"
-                text_summary += df.head(10).to_string() + "\n"
-            
-            return text_summary, sheets_data
-            
-        except Exception as e:
-            st.error(f"Error reading Excel file: {str(e)}")
-            return "", {}
+    # Answers depend on the retrieval settings as well as the prompt template; follow-ups also on the history
+    answer_cache = get_answer_cache()
+    use_cache = conversation is None or not conversation.turns
+    template_version = f"{client.PROMPT_TEMPLATE_VERSION}:k{top_k}:b{token_budget}" + (":chat" if chat else "")
+    semantic = semantic and get_semantic_search().available()
+    if semantic:
+        template_version += f":e{get_semantic_search().model}"    # excerpts differ from keyword-only retrieval
+    documents_key = workspace.cache_key(keys)
+    cache_key = answer_cache.make_key(documents_key, model, question, template_version)
+    cached = answer_cache.get(cache_key) if use_cache else None
     
-    @staticmethod
-    def extract_financial_metrics(text: str) -> Dict[str, Any]:
-        """Extract common key financial metrics from text using regex"""
-        metrics = {}
+    with st.chat_message("assistant"):
+        if cached is not None:
+            response = cached
+            stats = "⚡ Cached answer"
+            st.markdown(response)
+            st.caption(stats)
+            if conversation is not None:
+                conversation.record(question, response)
+            return {"role": "assistant", "content": response, "stats": stats}
         
-        # Common financial terms to look for
-        patterns = {
-            'revenue': r'revenue[s]?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            'net_income': r'net\s+income\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            'total_assets': r'total\s+assets\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            'total_liabilities': r'total\s+liabilities\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            'cash': r'cash\s*(?:and\s+equivalents)?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            'expenses': r'(?:total\s+)?expenses?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-        }
-        
-        for metric, pattern in patterns.items():
-            matches = re.findall(pattern, text.lower(), re.IGNORECASE)
-            if matches:
-                # Convert to float, removing commas
-                values = [float(match.replace(',', '')) for match in matches]
-                metrics[metric] = values[0] if len(values) == 1 else values
+        started = time.perf_counter()
+        full_tokens = sum(estimate_tokens(document['document_content']) for document in workspace.select(keys))
+        if conversation is None:
+            budget = fit_budget(model, token_budget, client.build_prompt(question))
+            context = workspace.build_context(question, keys, top_k, budget, semantic)
+            if stream:
+                response = render_streamed_response(client.stream_response(model, question, context))
+            else:
+                with st.spinner("Analyzing document and generating response..."):
+                    response = client.generate_response(model, question, context)
+                st.markdown(response)
+        else:
+            # Excerpts only when the document is not already in the stable prefix; half the window stays for history
+            context = ""
+            budget = 0
+            if not conversation.document_in_prefix:
+                budget = fit_budget(model, token_budget, conversation.system['content'] + question, share=0.5)
+                context = workspace.build_context(question, keys, top_k, budget, semantic)
+            else:
+                context = workspace.analytics_context(question, keys)    # computed figures are not in the prefix
+            user_content = conversation.user_content(question, context)
+            messages = conversation.messages(user_content, context_window(model) - ANSWER_RESERVE_TOKENS)
+            if stream:
+                response = render_streamed_response(client.stream_chat(model, messages))
+            else:
+                with st.spinner("Analyzing document and generating response..."):
+                    response = client.chat_response(model, messages)
+                st.markdown(response)
+            if not client.last_stats.get('error'):    # a failed stream may have sent part of an answer
+                conversation.record(user_content, response)
         
-        return metrics
+        failed = bool(client.last_stats.get('error'))
+        stats = format_response_stats(client.last_stats)
+        tokens = token_report(context, full_tokens)
+        if conversation is None or not conversation.document_in_prefix:
+            context_stats = (f"📉 Context {tokens['context_tokens']:,} tokens "
+                             f"(saved {tokens['saved_tokens']:,} of {tokens['full_tokens']:,})")
+            stats = f"{stats} · {context_stats}" if stats else context_stats
+        if conversation is not None:
+            turns = len(conversation.turns)
+            stats += f" · 💬 {turns} turn{'s' if turns != 1 else ''} in history"
+        st.caption(stats)
+        logger.info("route=llm model=%s latency_ms=%.2f context_tokens=%d saved_tokens=%d budget=%d "
+                    "prompt_eval_tokens=%s chat=%s",
+                    model, (time.perf_counter() - started) * 1000, tokens['context_tokens'],
+                    tokens['saved_tokens'], budget, client.last_stats.get('prompt_tokens'), chat)
+    
+    # Answers about a partially extracted (or not yet embedded) document must not be cached as the full document's;
+    # neither must answers about one that was stopped or failed part way
+    pending = workspace.ingesting(keys) or (semantic and workspace.embedding(keys))
+    pending = pending or any(document['error'] for document in workspace.select(keys))
+    if use_cache and not failed and not pending:
+        answer_cache.put(cache_key, documents_key, model, question, response)
+    
+    return {"role": "assistant", "content": response, "stats": stats}
 
+def format_sizes(row: Dict[str, Any]) -> str:
+    """Size totals of a performance summary row, e.g. '2 pages · 5.4 KB'"""
+    parts = []
+    for name in ('bytes', 'pages', 'sheets', 'rows', 'chars', 'metrics', 'documents', 'tokens', 'prompt_tokens', 'eval_tokens'):
+        value = row.get(name)
+        if value is None:
+            continue
+        if name == 'bytes':
+            parts.append(f"{value / 1024:,.1f} KB")
+        else:
+            parts.append(f"{value:,} {name.replace('_', ' ')}")
+    return " · ".join(parts)
 
-# Streamlit Helper Functions
-def initialize_session_state():
-    """Initialize Streamlit session state variables"""
-    if 'messages' not in st.session_state:
-        st.session_state.messages = []    # chat history
-    if 'document_content' not in st.session_state:
-        st.session_state.document_content = ""    # raw extracted text
-    if 'excel_data' not in st.session_state:
-        st.session_state.excel_data = {}    # excel DataFrames
-    if 'financial_metrics' not in st.session_state:
-        st.session_state.financial_metrics = {}    # extracted metrics
-    if 'ollama_client' not in st.session_state:
-        st.session_state.ollama_client = OllamaClient()
+def display_performance_panel():
+    """Sidebar panel with per-stage latency across all sessions on this server"""
+    with st.expander("⏱️ Performance"):
+        summary = tracer.summary()
+        if not summary:
+            st.caption("No stages recorded yet: upload a document or ask a question.")
+            return
+        st.dataframe(pd.DataFrame([{
+            'Stage': row['label'],
+            'Calls': row['count'],
+            'Mean ms': round(row['mean_ms'], 1),
+            'p95 ms': round(row['p95_ms'], 1) if row['p95_ms'] is not None else None,
+            'Last ms': round(row['last_ms'], 1) if row['last_ms'] is not None else None,
+            'Processed': format_sizes(row),
+        } for row in summary]), hide_index=True, use_container_width=True)
+        
+        st.download_button("⬇️ Export spans (JSON)", json.dumps(list(tracer.spans), indent=2),
+                           file_name="findoc_trace.json", mime="application/json")
+        if METRICS_PORT:
+            st.caption(f"📡 Prometheus metrics on port {METRICS_PORT} at /metrics")
+        if st.button("Reset timings"):
+            tracer.reset()
+            st.rerun()
 
 def display_financial_metrics(metrics: Dict[str, Any]):
     """Display extracted financial metrics"""
@@ -197,34 +332,102 @@ def display_financial_metrics(metrics: Dict[str, Any]):
                 st.metric(metric.replace('_', ' ').title(), f"${value:,.2f}")
         col_idx += 1
 
-def display_excel_data(excel_data: Dict[str, pd.DataFrame]):
-    """Show each Excel sheet in a tab with stats"""
+def table_shape(tables: Dict[str, pd.DataFrame], sheet_name: str) -> tuple:
+    """(rows, columns) without loading the sheet when the mapping knows it"""
+    if hasattr(tables, 'shape'):
+        return tables.shape(sheet_name)
+    return tables[sheet_name].shape
+
+def table_page(tables: Dict[str, pd.DataFrame], sheet_name: str, start: int, rows: int) -> pd.DataFrame:
+    """One page of a sheet; stored tables convert only these rows"""
+    if hasattr(tables, 'page'):
+        return tables.page(sheet_name, start, rows)
+    return tables[sheet_name].iloc[start:start + rows]
+
+def display_excel_data(excel_data: Dict[str, pd.DataFrame], table_stats: Dict[str, Dict[str, Any]], key: str = ""):
+    """Show one page of the selected Excel sheet (or PDF table) with the stats computed at ingest"""
     if not excel_data:
         return
     
-    st.subheader("📋 Excel Data")
+    st.subheader("📋 Excel Data" if getattr(excel_data, 'source', 'pdf') == 'excel' else "📋 Extracted Tables")
     
-    tabs = st.tabs(list(excel_data.keys()))
+    # A selector instead of tabs so only the selected sheet is read and rendered
+    sheet_name = st.radio("Sheet", list(excel_data.keys()), horizontal=True, label_visibility="collapsed",
+                          key=f"sheet-{key}")
+    rows, columns = table_shape(excel_data, sheet_name)
     
-    for idx, (sheet_name, df) in enumerate(excel_data.items()):
-        with tabs[idx]:
-            st.write(f"**Sheet: {sheet_name}**")
-            st.write(f"Dimensions: {df.shape[0]} rows × {df.shape[1]} columns")
-            
-            # Display dataframe
-            st.dataframe(df, use_container_width=True)
-            
-            # Show basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 0:
-                st.write("**Numeric Columns Summary:**")
-                st.dataframe(df[numeric_cols].describe(), use_container_width=True)
+    st.write(f"**Sheet: {sheet_name}**")
+    st.write(f"Dimensions: {rows} rows × {columns} columns")
+    
+    # Only the current page is sent to the browser
+    page_rows, page = PAGE_SIZES[0], 1
+    if rows > PAGE_SIZES[0]:
+        size_col, page_col = st.columns(2)
+        with size_col:
+            page_rows = st.selectbox("Rows per page", PAGE_SIZES, key=f"page-size-{key}")
+        pages = -(-rows // page_rows)
+        with page_col:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                                   key=f"page-{key}-{sheet_name}-{page_rows}")
+    start = (page - 1) * page_rows
+    frame = table_page(excel_data, sheet_name, start, page_rows)
+    st.dataframe(frame, use_container_width=True)
+    if rows > page_rows:
+        st.caption(f"Rows {start + 1:,}–{start + len(frame):,} of {rows:,}")
+    
+    # Show basic statistics for numeric columns
+    stats = table_stats.get(sheet_name)
+    if stats:
+        st.write("**Numeric Columns Summary:**")
+        st.dataframe(pd.DataFrame(describe_table(stats)), use_container_width=True)
+
+def display_period_analytics(cubes: Dict[str, Any], key: str = ""):
+    """Chart line items and ratios over their periods from the cubes computed at ingest"""
+    if not cubes:
+        return
+    import plotly.express as px    # only documents with period tables need plotly
+    
+    st.subheader("📉 Period Analytics")
+    names = list(cubes)
+    cube = cubes[st.selectbox("Table", names, key=f"cube-{key}") if len(names) > 1 else names[0]]
+    
+    # Revenue and net income by default; large tables offer their first rows
+    default = [row for row in (cube.find('revenue'), cube.find('net_income')) if row is not None]
+    default = default or list(range(min(3, len(cube.labels))))
+    options = sorted(set(range(min(len(cube.labels), MAX_CHART_ITEMS))) | set(default))
+    rows = st.multiselect("Line items", options, default=default, format_func=cube.labels.__getitem__,
+                          key=f"items-{key}-{cube.table}")
+    measures = cube.available()
+    measure = st.radio("Measure", list(measures), format_func=measures.get, horizontal=True,
+                       key=f"measure-{key}-{cube.table}")
+    
+    if rows:
+        frame = cube.frame(rows, measure)
+        chart = px.bar if measure in ('change', 'yoy') else px.line
+        options = {'barmode': 'group'} if chart is px.bar else {'markers': True}
+        fig = chart(frame, x='period', y='value', color='item', category_orders={'period': cube.periods},
+                    labels={'value': measures[measure], 'period': "", 'item': ""}, **options)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    if cube.ratios:
+        st.write("**Ratios:**")
+        fig = px.line(cube.ratio_frame(), x='period', y='value', color='ratio', markers=True,
+                      category_orders={'period': cube.periods}, labels={'value': "", 'period': "", 'ratio': ""})
+        st.plotly_chart(fig, use_container_width=True)
 
 
 # Main App
 def main():
     """Main application function"""
+    # Configure Streamlit page (here rather than at import, so importing app.py has no side effects)
+    st.set_page_config(
+        page_title="Financial Document Q&A Assistant",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
     initialize_session_state()
+    get_metrics_server()
     
     # Header
     st.title("📊 Financial Document Q&A Assistant")
@@ -234,7 +437,9 @@ def main():
     with st.sidebar:
         st.header("⚙️ Configuration")
         
-        # Model selection
+        # Model selection (the model list is shared by all sessions and refetched after a short TTL)
+        if st.button("🔄 Refresh models"):
+            st.session_state.ollama_client.check_connection(refresh=True)
         if st.session_state.ollama_client.available_models:
             selected_model = st.selectbox(
                 "Select Ollama Model",
@@ -245,65 +450,136 @@ def main():
             st.error("No Ollama models available. Please install and run a model.")
             selected_model = None
         
+        server_stats = st.session_state.ollama_client.server.stats()
+        st.caption(f"🖥️ Ollama load: {server_stats['active']}/{server_stats['max_concurrency']} busy · "
+                   f"{server_stats['waiting']} queued")
+        
+        # Retrieval settings
+        with st.expander("🔎 Retrieval Settings"):
+            top_k = st.slider(
+                "Chunks per question (top-k)", 1, 20, DEFAULT_TOP_K,
+                help="Number of most relevant document chunks sent to the model"
+            )
+            token_budget = st.number_input(
+                "Context token budget", min_value=250, max_value=32000,
+                value=DEFAULT_TOKEN_BUDGET, step=250,
+                help="Approximate maximum number of document tokens sent per question"
+            )
+            semantic_search = st.checkbox(
+                "Semantic search", value=True,
+                help="Also rank excerpts by meaning with a local embedding model, "
+                     "so questions find rows that use different words"
+            )
+            semantic = get_semantic_search()
+            if semantic_search and not semantic.available():
+                st.caption(f"Semantic search needs the embedding model: `ollama pull {semantic.model}`")
+        
+        stream_responses = st.checkbox(
+            "Stream responses", value=True,
+            help="Show the answer token by token as the model generates it"
+        )
+        conversation_mode = st.checkbox(
+            "Conversation mode", value=True,
+            help="Send earlier turns with each question so follow-ups make sense; "
+                 "Ollama reuses the unchanged prompt prefix, so follow-ups only pay for new tokens"
+        )
+        direct_answers = st.checkbox(
+            "Answer numeric questions directly", value=True,
+            help="Look simple metric questions up in the tables instead of asking the model"
+        )
+        
+        # Answer cache counters
+        cache_stats = get_answer_cache().stats()
+        st.caption(f"💾 Answer cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses "
+                   f"({cache_stats['hit_rate']:.0%} hit rate)")
+        
+        # Where time goes: per-stage latency of processing and answering
+        display_performance_panel()
+        
         st.divider()
         
         # Document upload
         st.header("📄 Document Upload")
-        uploaded_file = st.file_uploader(
-            "Upload Financial Document",
+        uploaded_files = st.file_uploader(
+            "Upload Financial Documents",
             type=['pdf', 'xlsx', 'xls'],
-            help="Upload PDF or Excel files containing financial statements"
+            accept_multiple_files=True,
+            help="Upload one or more PDF or Excel files containing financial statements"
         )
         
-        if uploaded_file is not None:
-            with st.spinner("Processing document..."):
-                processor = DocumentProcessor()
-                
-                if uploaded_file.type == "application/pdf":
-                    # Extract PDF
-                    content = processor.extract_pdf_text(uploaded_file)
-                    st.session_state.document_content = content
-                    st.session_state.excel_data = {}
-                    
-                elif uploaded_file.type in ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 
-                                           "application/vnd.ms-excel"]:
-                    # Extract Excel
-                    content, excel_data = processor.extract_excel_data(uploaded_file)
-                    st.session_state.document_content = content
-                    st.session_state.excel_data = excel_data
-                
-                # Extract key financial metrics
-                st.session_state.financial_metrics = processor.extract_financial_metrics(content)
-                
-                st.success(f"✅ Document processed successfully!")
-                st.write(f"**File:** {uploaded_file.name}")
-                st.write(f"**Type:** {uploaded_file.type}")
-                st.write(f"**Size:** {uploaded_file.size / 1024:.1f} KB")
+        # New files are processed, removed files dropped; reruns keep loaded documents
+        load_documents(uploaded_files or [])
+        workspace = st.session_state.workspace
+        
+        # Pick up pages extracted since the last rerun
+        sync_ingestion()
+        
+        jobs = get_job_queue()
+        for document in workspace.select():
+            ingestion, job_id = document['ingestion'], document['job']
+            icon = "⏳" if ingestion is not None or job_id is not None else "⚠️" if document['error'] else "✅"
+            st.write(f"{icon} **{document['name']}** ({document['size'] / 1024:.1f} KB)")
+            if ingestion is not None:
+                st.progress(ingestion.progress,
+                            text=f"Extracting pages: {document['ingested_pages']}/{ingestion.page_count}")
+            elif job_id is not None:
+                st.caption("Processing..." if jobs.status(job_id) == 'running' else "Queued for processing")
+            elif document['embedding_job'] is not None:
+                st.caption("Embedding chunks for semantic search...")
+            if ingestion is not None or job_id is not None:
+                if st.button("Cancel", key=f"cancel-{document['key']}"):
+                    workspace.cancel(document['key'])
+                    st.rerun()
     
     # Main content area
-    if st.session_state.document_content:
+    documents = [document for document in workspace.select() if document['document_content']]
+    if documents:
+        # Document details, one document at a time
+        names = {document['key']: document['name'] for document in documents}
+        viewed_key = documents[0]['key']
+        if len(names) > 1:
+            viewed_key = st.selectbox("📂 View document", list(names), format_func=names.get)
+        viewed = workspace.documents[viewed_key]
+        
         # Display financial metrics
-        display_financial_metrics(st.session_state.financial_metrics)
+        display_financial_metrics(viewed['financial_metrics'])
         
         # Display Excel data if available
-        if st.session_state.excel_data:
-            display_excel_data(st.session_state.excel_data)
+        if viewed['excel_data']:
+            display_excel_data(viewed['excel_data'], viewed['table_stats'], key=viewed_key)
+        
+        # Growth, trailing totals and ratios of tables organized by period
+        display_period_analytics(viewed['period_cubes'], key=viewed_key)
         
         st.divider()
         
         # Q&A Interface
-        st.subheader("💬 Ask Questions About Your Financial Document")
+        st.subheader("💬 Ask Questions About Your Financial Documents")
+        
+        # Questions target one, several or all documents; the selection resets when documents change
+        selected_keys = list(names)
+        if len(names) > 1:
+            selected_keys = st.multiselect(
+                "Ask about", list(names), default=list(names), format_func=names.get,
+                key=f"ask-{'-'.join(names)}",
+                help="Relevant passages are retrieved from each selected document and merged"
+            )
         
         # Display chat history
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
+                if message.get("stats"):
+                    st.caption(message["stats"])
         
         # User input
         if prompt := st.chat_input("Ask a question about your financial document..."):
             if selected_model is None:
                 st.error("Please select an Ollama model first.")
                 return
+            if not selected_keys:
+                st.error("Please select at least one document to ask about.")
+                return
             
             # Add user message to chat history
             st.session_state.messages.append({"role": "user", "content": prompt})
@@ -311,76 +587,43 @@ def main():
                 st.markdown(prompt)
             
             # Generate assistant response
-            with st.chat_message("assistant"):
-                with st.spinner("Analyzing document and generating response..."):
-                    response = st.session_state.ollama_client.generate_response(
-                        selected_model,
-                        prompt,
-                        st.session_state.document_content
-                    )
-                    st.markdown(response)
+            message = answer_question(prompt, selected_keys, selected_model, top_k, token_budget,
+                                      stream_responses, direct_answers, conversation_mode, semantic_search)
             
             # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            st.session_state.messages.append(message)
         
         # Quick question buttons
         st.subheader("🚀 Quick Questions")
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            if st.button("What is the total revenue?"):
-                if selected_model:
-                    st.session_state.messages.append({"role": "user", "content": "What is the total revenue?"})
-                    with st.spinner("Generating response..."):
-                        response = st.session_state.ollama_client.generate_response(
-                            selected_model,
-                            "What is the total revenue?",
-                            st.session_state.document_content
-                        )
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        st.rerun()
         
-        with col2:
-            if st.button("What are the main expenses?"):
-                if selected_model:
-                    st.session_state.messages.append({"role": "user", "content": "What are the main expenses?"})
-                    with st.spinner("Generating response..."):
-                        response = st.session_state.ollama_client.generate_response(
-                            selected_model,
-                            "What are the main expenses?",
-                            st.session_state.document_content
-                        )
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        st.rerun()
-        
-        with col3:
-            if st.button("What is the net income?"):
-                if selected_model:
-                    st.session_state.messages.append({"role": "user", "content": "What is the net income?"})
-                    with st.spinner("Generating response..."):
-                        response = st.session_state.ollama_client.generate_response(
-                            selected_model,
-                            "What is the net income?",
-                            st.session_state.document_content
-                        )
-                        st.session_state.messages.append({"role": "assistant", "content": response})
-                        st.rerun()
+        for col, question in zip(st.columns(len(QUICK_QUESTIONS)), QUICK_QUESTIONS):
+            with col:
+                clicked = st.button(question)
+            if clicked and selected_model and selected_keys:
+                st.session_state.messages.append({"role": "user", "content": question})
+                with st.chat_message("user"):
+                    st.markdown(question)
+                message = answer_question(question, selected_keys, selected_model, top_k, token_budget,
+                                          stream_responses, direct_answers, conversation_mode, semantic_search)
+                st.session_state.messages.append(message)
+                st.rerun()
         
         # Clear chat button
         if st.button("🗑️ Clear Chat History"):
             st.session_state.messages = []
+            st.session_state.conversation = None
             st.rerun()
     
     else:
         # Welcome screen
-        st.info("👈 Please upload a financial document from the sidebar to get started.")
+        st.info("👈 Please upload one or more financial documents from the sidebar to get started.")
         
         # Instructions
         st.subheader("📖 How to Use")
         st.markdown("""
         1. **Install Ollama**: Make sure Ollama is installed and running locally
         2. **Download a Model**: Install a language model (e.g., `ollama pull llama3.2`)
-        3. **Upload Document**: Use the sidebar to upload a PDF or Excel financial document
+        3. **Upload Documents**: Use the sidebar to upload PDF or Excel financial documents (several at once to compare them)
         4. **Ask Questions**: Use natural language to query your financial data
         
         ### Supported Document Types:
@@ -397,6 +640,11 @@ def main():
     # Footer
     st.markdown("---")
     st.markdown("© Financial Document Q&A Assistant | Created by Shubha Pandey")
+    
+    # Keep refreshing while pages are still being extracted or documents processed (or embedded) in the background
+    if st.session_state.workspace.ingesting() or st.session_state.workspace.embedding():
+        time.sleep(INGEST_POLL_SECONDS)
+        st.rerun()
 
 # Entry point
 if __name__ == "__main__":
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Headless batch Q&A over a folder of financial documents
+--> Asks the Quick Questions (plus any from a questions file) of every PDF / Excel file in a folder
+--> Processes documents in parallel worker processes, without importing Streamlit
+--> Streams one row per answer to JSONL or CSV as soon as its document is done
+--> Resumes an interrupted run by skipping answers already in the output file
+--> Reports throughput (documents/min, questions/min)
+
+Usage: python batch_qa.py DOCS_DIR --model llama3.2 --output results.jsonl [--questions questions.txt]
+"""
+
+# import required libraries
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from answer_cache import AnswerCache
+from context_budget import fit_budget
+from doc_cache import DocumentCache, document_key
+from document_processor import MIME_TYPES, DocumentError, DocumentProcessor, LocalFile
+from ollama_client import OllamaClient
+from ollama_http import DEFAULT_BASE_URL
+from pdf_extract import available_cpus
+from retrieval import DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET
+from workspace import QUICK_QUESTIONS, Workspace
+
+
+logger = logging.getLogger("batch_qa")
+
+FIELDS = ['document', 'question', 'answer', 'route', 'error', 'latency_s', 'model', 'timestamp']
+
+
+def find_documents(docs_dir: str) -> List[str]:
+    """Supported files under docs_dir (recursively), in a stable order"""
+    paths = []
+    for root, _, files in os.walk(docs_dir):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in MIME_TYPES and not name.startswith(('.', '~$')):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def load_questions(path: Optional[str], include_quick: bool = True) -> List[str]:
+    """Quick Questions followed by one question per non-empty line of path ('#' starts a comment)"""
+    questions = list(QUICK_QUESTIONS) if include_quick else []
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and line not in questions:
+                    questions.append(line)
+    return questions
+
+
+def complete_row(row: Dict[str, Any]) -> bool:
+    """True for a row written out in full: every field present and a valid timestamp (the last field)"""
+    if any(row.get(field) is None for field in FIELDS):
+        return False
+    try:
+        return datetime.fromisoformat(row['timestamp']).tzinfo is not None
+    except (TypeError, ValueError):
+        return False
+
+
+def read_csv(output: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Rows of a CSV output that end with a line break, and the number of bytes they (and the header) take up
+
+    A row cut off when the previous run was interrupted, possibly inside a quoted answer, is left out.
+    """
+    with open(output, newline='', encoding='utf-8') as f:
+        lines = f.readlines()
+    reader = csv.reader(iter(lines))
+    header, rows, length, consumed = None, [], 0, 0
+    try:
+        for values in reader:
+            text = "".join(lines[consumed:reader.line_num])
+            consumed = reader.line_num
+            if not text.endswith(("\n", "\r")):
+                break
+            length += len(text.encode('utf-8'))
+            if header is None:
+                header = values
+            else:
+                rows.append(dict(zip(header, values)))
+    except csv.Error:
+        pass    # unterminated quote at the end of the file
+    return rows, length
+
+
+def read_done(output: str) -> Set[Tuple[str, str]]:
+    """(document, question) pairs answered in full and without error in an earlier run"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    if output.endswith('.csv'):
+        rows, _ = read_csv(output)
+    else:
+        rows = []
+        with open(output, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue    # line cut off when the previous run was interrupted
+    for row in rows:
+        if isinstance(row, dict) and complete_row(row) and not row['error']:
+            done.add((row['document'], row['question']))
+    return done
+
+
+# Result Writer : Appends result rows to a JSONL or CSV file as they arrive
+class ResultWriter:
+    """Line-buffered JSONL / CSV output that survives interruption"""
+
+    def __init__(self, output: str):
+        self.csv = output.endswith('.csv')
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        if not new_file and self.csv:
+            # Drop the row cut off by the interruption: a newline cannot close a quoted field left open
+            _, length = read_csv(output)
+            if length < os.path.getsize(output):
+                with open(output, 'r+b') as f:
+                    f.truncate(length)
+            new_file = length == 0
+        self.file = open(output, 'a', newline='', encoding='utf-8')
+        if not new_file and not self.csv:
+            with open(output, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")    # end the row cut off by the interruption
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, row: Dict[str, Any]):
+        if self.csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()    # a crash loses at most the row being written
+
+    def close(self):
+        self.file.close()
+
+
+def make_row(path: str, question: str, model: str, answer: str = "", route: str = "", error: str = "",
+             latency: float = 0.0) -> Dict[str, Any]:
+    return {
+        'document': path, 'question': question, 'answer': answer, 'route': route, 'error': error,
+        'latency_s': round(latency, 3), 'model': model,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def answer_document(path: str, questions: List[str], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Process one document and answer its questions; runs in a worker process"""
+    model = options['model']
+    rows = []
+
+    def add_row(question: str, answer: str = "", route: str = "", error: str = "", latency: float = 0.0):
+        rows.append(make_row(path, question, model, answer, route, error, latency))
+
+    try:
+        local_file = LocalFile(path)
+        key = document_key(local_file.getvalue())
+        doc_cache = DocumentCache() if options['cache'] else None
+        processed = doc_cache.get(key) if doc_cache else None
+        if processed is None:
+            # One extraction process per document: the batch already runs one worker per document
+            processed = DocumentProcessor(max_workers=1).process(local_file)    # raises DocumentError
+            if doc_cache and processed['document_content']:
+                doc_cache.put(key, processed)
+    except Exception as e:
+        error = str(e) if isinstance(e, DocumentError) else f"Error reading document: {str(e)}"
+        return [make_row(path, question, model, error=error) for question in questions]
+
+    if not processed['document_content']:
+        return [make_row(path, question, model, error="No text could be extracted") for question in questions]
+
+    semantic = None
+    if options['semantic']:
+        from semantic_index import SemanticSearch    # NumPy loads only for semantic runs
+        semantic = SemanticSearch(base_url=options['base_url'])
+    workspace = Workspace(semantic=semantic)    # no job queue: chunks are embedded here, in the worker
+    workspace.add(key, local_file.name, processed, type=local_file.type, size=local_file.size)
+    client = OllamaClient(options['base_url'])    # connection errors surface in each answer
+    answer_cache = AnswerCache() if options['cache'] else None
+    top_k, token_budget = options['top_k'], options['token_budget']
+    template_version = f"{client.PROMPT_TEMPLATE_VERSION}:k{top_k}:b{token_budget}"    # same entries as the app
+    if semantic is not None and semantic.available():
+        template_version += f":e{semantic.model}"
+
+    for question in questions:
+        started = time.perf_counter()
+        if options['direct']:
+            routed = workspace.route(question)
+            if routed['answer'] is not None:
+                add_row(question, routed['answer'], routed['route'], latency=time.perf_counter() - started)
+                continue
+
+        cache_key = answer_cache.make_key(key, model, question, template_version) if answer_cache else None
+        answer = answer_cache.get(cache_key) if answer_cache else None
+        route = 'cache'
+        if answer is None:
+            budget = fit_budget(model, token_budget, client.build_prompt(question))
+            context = workspace.build_context(question, top_k=top_k, token_budget=budget)
+            answer = client.generate_response(model, question, context)
+            route = 'llm'
+            if client.last_stats.get('error'):
+                add_row(question, route=route, error=client.last_stats['error'], latency=time.perf_counter() - started)
+                continue
+            if answer_cache:
+                answer_cache.put(cache_key, key, model, question, answer)
+        add_row(question, answer, route, latency=time.perf_counter() - started)
+    return rows
+
+
+def run(args: argparse.Namespace) -> int:
+    """Answer every pending (document, question) pair and report throughput; returns the exit code"""
+    questions = load_questions(args.questions, include_quick=not args.no_quick)
+    if not questions:
+        logger.error("No questions to ask")
+        return 2
+    documents = find_documents(args.docs_dir)
+    if not documents:
+        logger.error("No PDF or Excel files found in %s", args.docs_dir)
+        return 2
+
+    client = OllamaClient(args.base_url, on_error=logger.error)
+    if not client.available_models:
+        return 1
+    if args.model not in client.available_models:
+        logger.error("Model %s is not installed; available: %s", args.model, ", ".join(client.available_models))
+        return 1
+
+    # Resume: only ask what the output file does not already answer
+    done = read_done(args.output) if args.resume else set()
+    pending = {}
+    for path in documents:
+        remaining = [question for question in questions if (path, question) not in done]
+        if remaining:
+            pending[path] = remaining
+    skipped = len(documents) * len(questions) - sum(len(remaining) for remaining in pending.values())
+    logger.info("%d documents, %d questions each; %d answers already done, %d pending",
+                len(documents), len(questions), skipped, len(documents) * len(questions) - skipped)
+    if not pending:
+        return 0
+
+    options = {
+        'model': args.model, 'base_url': args.base_url, 'top_k': args.top_k,
+        'token_budget': args.token_budget, 'direct': not args.no_direct, 'cache': not args.no_cache,
+        'semantic': args.semantic,
+    }
+    if not args.resume and os.path.exists(args.output):
+        os.remove(args.output)
+    writer = ResultWriter(args.output)
+    started = time.perf_counter()
+    answered = failed = finished = 0
+    try:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(pending))) as pool:
+            futures = {pool.submit(answer_document, path, remaining, options): path
+                       for path, remaining in pending.items()}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    rows = [make_row(path, question, args.model, error=f"Error processing document: {str(e)}")
+                            for question in pending[path]]
+                for row in rows:
+                    writer.write(row)
+                    if row['error']:
+                        failed += 1
+                    else:
+                        answered += 1
+                finished += 1
+                minutes = (time.perf_counter() - started) / 60
+                logger.info("[%d/%d] %s · %.1f documents/min · %.1f questions/min",
+                            finished, len(pending), os.path.basename(path),
+                            finished / minutes, (answered + failed) / minutes)
+    finally:
+        writer.close()
+
+    minutes = (time.perf_counter() - started) / 60
+    print(f"Done in {minutes * 60:.1f}s: {finished} documents, {answered} answers, {failed} errors · "
+          f"{finished / minutes:.1f} documents/min · {(answered + failed) / minutes:.1f} questions/min")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a question set over every document in a folder")
+    parser.add_argument("docs_dir", help="folder of PDF / Excel documents (searched recursively)")
+    parser.add_argument("--model", required=True, help="Ollama model to answer with")
+    parser.add_argument("--output", default="batch_results.jsonl", help="results file, .jsonl or .csv")
+    parser.add_argument("--questions", help="text file with one extra question per line")
+    parser.add_argument("--no-quick", action="store_true", help="skip the built-in Quick Questions")
+    parser.add_argument("--workers", type=int, default=available_cpus(), help="documents processed in parallel")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="chunks retrieved per question")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET, help="context tokens per question")
+    parser.add_argument("--no-direct", action="store_true", help="send numeric questions to the model as well")
+    parser.add_argument("--semantic", action="store_true",
+                        help="also rank excerpts by meaning (needs the embedding model, see FINDOC_EMBED_MODEL)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the document and answer caches")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="start over instead of skipping answers already in the output")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Ollama server URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%H:%M:%S")
+    logging.getLogger("query_engine").setLevel(logging.WARNING)    # one line per routed question is too chatty here
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
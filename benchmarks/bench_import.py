@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark import time of the processing and LLM modules
+--> Imports each module in a fresh interpreter, as a pool worker or CLI start-up would
+--> Reports the best wall-clock import time and which heavy dependencies were pulled in
+--> Exits non-zero when a library module imports Streamlit or exceeds --max-ms (for CI)
+"""
+
+# import necessary libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Any
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules used outside the Streamlit app (workers, CLI); app is measured for comparison only
+LIBRARY_MODULES = ['document_processor', 'ollama_client', 'workspace', 'table_store', 'batch_qa']
+APP_MODULE = 'app'
+HEAVY_MODULES = ['streamlit', 'plotly', 'pandas', 'numpy', 'openpyxl', 'PyPDF2', 'httpx', 'pyarrow']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'import_s': elapsed, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int) -> Dict[str, Any]:
+    """Best import time of `module` over `repeat` fresh interpreters"""
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(probe['import_s'])
+        heavy = probe['heavy']
+    return {'module': module, 'import_ms': round(min(timings) * 1000, 1), 'heavy_modules': heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per module (best is reported)")
+    parser.add_argument('--max-ms', type=float, default=None, help="fail if a library module takes longer")
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeat) for module in LIBRARY_MODULES + [APP_MODULE]]
+    failures: List[str] = []
+    for result in results[:len(LIBRARY_MODULES)]:
+        if 'streamlit' in result['heavy_modules']:
+            failures.append(f"{result['module']} imports streamlit")
+        if args.max_ms is not None and result['import_ms'] > args.max_ms:
+            failures.append(f"{result['module']} took {result['import_ms']} ms (limit {args.max_ms} ms)")
+
+    if args.json:
+        print(json.dumps({'benchmark': 'import_time', 'results': results, 'failures': failures}))
+    else:
+        app_ms = results[-1]['import_ms']
+        for result in results:
+            share = f"{result['import_ms'] / app_ms:5.0%} of app" if app_ms else ""
+            heavy = ", ".join(result['heavy_modules']) or "-"
+            print(f"{result['module']:<20} {result['import_ms']:8.1f} ms  {share}  ·  heavy: {heavy}")
+        for failure in failures:
+            print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark ingestion and question latency on scalable synthetic documents
+--> Generates PDFs / workbooks of increasing size with generate_sample_docs.py
+--> Times extract_pdf_text, extract_excel_data and extract_financial_metrics, with peak Python memory
+--> Measures end-to-end question latency (routing, retrieval, OllamaClient) against the stub Ollama server
+--> Prints a table or JSON; --baseline fails the run when a stage got slower or bigger than allowed
+"""
+
+# import necessary libraries
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_budget import fit_budget
+from document_processor import DocumentProcessor, LocalFile
+from generate_sample_docs import generate_synthetic_excel, generate_synthetic_pdf
+from ollama_client import OllamaClient
+from stub_ollama import STUB_MODEL, start_stub_server
+from workspace import QUICK_QUESTIONS, Workspace
+
+
+OPEN_QUESTIONS = ["Why did operating expenses change?", "Summarize the main risks in the notes"]
+
+
+def parse_sizes(text: str) -> List[int]:
+    return [int(size) for size in text.split(",") if size.strip()]
+
+
+def run_stage(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best wall-clock time over `repeat` runs, then one traced run for peak Python memory"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(min(timings), 4), 'peak_mb': round(peak / 1e6, 2)}
+
+
+def bench_pdf(path: str, pages: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    local_file = LocalFile(path)
+    processor = DocumentProcessor(max_workers=args.workers)
+
+    def extract_text() -> str:
+        local_file.seek(0)
+        return processor.extract_pdf_text(local_file)
+
+    text = extract_text()
+    extract = run_stage(extract_text, args.repeat)
+    metrics = run_stage(lambda: processor.extract_financial_metrics(text), args.repeat)
+    text_mb = len(text.encode('utf-8')) / 1e6
+    return [
+        {'stage': 'extract_pdf_text', 'size': pages, 'unit': 'pages', 'file_mb': round(local_file.size / 1e6, 3),
+         **extract, 'per_second': round(pages / extract['seconds'], 1)},
+        {'stage': 'extract_financial_metrics', 'size': pages, 'unit': 'pages', 'text_mb': round(text_mb, 3),
+         **metrics, 'mb_per_second': round(text_mb / metrics['seconds'], 1) if metrics['seconds'] else None},
+    ]
+
+
+def bench_excel(path: str, rows: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    local_file = LocalFile(path)
+    processor = DocumentProcessor()
+
+    def extract_excel():
+        local_file.seek(0)
+        return processor.extract_excel_data(local_file)
+
+    extract = run_stage(extract_excel, args.repeat)
+    total_rows = rows * args.sheets
+    return [{'stage': 'extract_excel_data', 'size': rows, 'unit': 'rows per sheet',
+             'file_mb': round(local_file.size / 1e6, 3), **extract, 'per_second': round(total_rows / extract['seconds'], 1)}]
+
+
+def bench_questions(path: str, pages: int, base_url: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Latency of direct (table) answers and model answers through retrieval and OllamaClient"""
+    local_file = LocalFile(path)
+    workspace = Workspace()
+    workspace.add("bench", local_file.name, DocumentProcessor(max_workers=args.workers).process(local_file))
+    client = OllamaClient(base_url)
+    results = []
+    for route, questions in (('direct', QUICK_QUESTIONS), ('llm', OPEN_QUESTIONS)):
+        latencies = []
+        for _ in range(args.repeat):
+            for question in questions:
+                start = time.perf_counter()
+                routed = workspace.route(question)
+                if routed['answer'] is None:
+                    budget = fit_budget(STUB_MODEL, args.token_budget, client.build_prompt(question))
+                    context = workspace.build_context(question, token_budget=budget)
+                    client.generate_response(STUB_MODEL, question, context)
+                latencies.append((time.perf_counter() - start) * 1000)
+        results.append({'stage': f'question_{route}', 'size': pages, 'unit': 'pages', 'questions': len(latencies),
+                        'p50_ms': round(statistics.median(latencies), 2), 'max_ms': round(max(latencies), 2),
+                        'stub_latency_ms': args.stub_latency * 1000})
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Stages slower (or using more memory) than the baseline by more than `tolerance`"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(row['stage'], row['size']): row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        before = baseline.get((row['stage'], row['size']))
+        if before is None:
+            continue
+        for field in ('seconds', 'peak_mb', 'p50_ms'):
+            if before.get(field) and row.get(field) is not None and row[field] > before[field] * (1 + tolerance):
+                regressions.append(f"{row['stage']} ({row['size']} {row['unit']}): {field} "
+                                   f"{before[field]} -> {row[field]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', default="5,20,80", help="comma-separated PDF sizes in pages")
+    parser.add_argument('--excel-rows', default="100,1000,10000", help="comma-separated Excel sizes in rows per sheet")
+    parser.add_argument('--sheets', type=int, default=4, help="sheets per workbook")
+    parser.add_argument('--years', type=int, default=2, help="years of periods in each statement")
+    parser.add_argument('--quarters', type=int, default=4, help="quarters per year (0: annual columns)")
+    parser.add_argument('--noise', type=float, default=0.05, help="relative std. dev. of period-to-period changes")
+    parser.add_argument('--workers', type=int, default=None, help="PDF extraction processes (default: one per CPU)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage (best is reported)")
+    parser.add_argument('--token-budget', type=int, default=1500, help="context tokens per model question")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="seconds the stub server waits per answer")
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    parser.add_argument('--save', help="also write the JSON results to this file (use as a later --baseline)")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown / growth vs. the baseline")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.stub_latency)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in parse_sizes(args.pages):
+            path = generate_synthetic_pdf(os.path.join(tmp, f"report_{pages}.pdf"), pages,
+                                          years=args.years, quarters=args.quarters, noise=args.noise)
+            results.extend(bench_pdf(path, pages, args))
+            results.extend(bench_questions(path, pages, server.base_url, args))
+        for rows in parse_sizes(args.excel_rows):
+            path = generate_synthetic_excel(os.path.join(tmp, f"statements_{rows}.xlsx"), args.sheets, rows,
+                                            args.years, args.quarters, args.noise)
+            results.extend(bench_excel(path, rows, args))
+    server.shutdown()
+
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    report = {'benchmark': 'ingestion', 'python': sys.version.split()[0], 'results': results,
+              'regressions': regressions}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for row in results:
+            size = f"{row['size']:>6} {row['unit']}"
+            if 'p50_ms' in row:
+                print(f"{row['stage']:<26} {size:<22} p50 {row['p50_ms']:8.2f} ms · max {row['max_ms']:8.2f} ms")
+            else:
+                rate = (f"{row['per_second']:,.0f} {row['unit'].split()[0]}/s" if 'per_second' in row
+                        else f"{row['mb_per_second']} MB/s")
+                print(f"{row['stage']:<26} {size:<22} {row['seconds']:8.3f}s · {rate:<18} · peak {row['peak_mb']:.1f} MB")
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled metric extractor against the original per-pattern implementation
+--> Builds a large synthetic income-statement style document
+--> Times both extractors over the same text and prints a summary (or JSON with --json)
+"""
+
+# import necessary libraries
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricExtractor, DEFAULT_METRICS
+
+
+LEGACY_METRICS = ['net_income', 'total_assets', 'total_liabilities', 'revenue', 'cash', 'expenses']
+
+
+LINE_ITEMS = [
+    'Sales Revenue', 'Service Revenue', 'Total Revenue', 'Cost of Goods Sold', 'Gross Profit',
+    'Salaries & Wages', 'Total Operating Expenses', 'Operating Income', 'Interest Expense',
+    'Income Before Taxes', 'Net Income', 'EBITDA', 'Cash and Cash Equivalents', 'Total Assets',
+    'Total Liabilities', 'Notes to the financial statements',
+]
+
+
+# Original implementation, kept here as the baseline
+def legacy_extract_financial_metrics(text: str) -> Dict[str, Any]:
+    """Six separate re.findall passes over text.lower()"""
+    metrics = {}
+    patterns = {
+        'revenue': r'revenue[s]?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+        'net_income': r'net\s+income\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+        'total_assets': r'total\s+assets\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+        'total_liabilities': r'total\s+liabilities\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+        'cash': r'cash\s*(?:and\s+equivalents)?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+        'expenses': r'(?:total\s+)?expenses?\s*:?\s*\$?(\d+(?:,\d{3})*(?:\.\d{2})?)',
+    }
+    for metric, pattern in patterns.items():
+        matches = re.findall(pattern, text.lower(), re.IGNORECASE)
+        if matches:
+            values = [float(match.replace(',', '')) for match in matches]
+            metrics[metric] = values[0] if len(values) == 1 else values
+    return metrics
+
+
+NARRATIVE = [
+    "The Company recognizes income when control of goods transfers to the customer.",
+    "Management believes the allowance for doubtful accounts is adequate as of period end.",
+    "Depreciation is calculated using the straight-line method over estimated useful lives.",
+    "Quarterly results are unaudited and subject to seasonal variation in demand.",
+]
+
+
+def synthetic_document(lines: int, statement_ratio: float = 0.25, seed: int = 42) -> str:
+    """Generate a filing-like document: statement lines mixed with narrative notes"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(lines):
+        if rng.random() >= statement_ratio:
+            parts.append(rng.choice(NARRATIVE) + "\n")
+            continue
+        item = rng.choice(LINE_ITEMS)
+        amount = rng.randint(1_000, 9_999_999)
+        if rng.random() < 0.2:
+            parts.append(f"{item} (${amount:,})\n")
+        else:
+            parts.append(f"{item}: ${amount:,}\n")
+    return "".join(parts)
+
+
+def best_of(func, text: str, repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200_000, help="lines in the synthetic document")
+    parser.add_argument('--statement-ratio', type=float, default=0.25,
+                        help="fraction of lines that are statement line items (rest is narrative)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per implementation (best is reported)")
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    args = parser.parse_args()
+
+    text = synthetic_document(args.lines, args.statement_ratio)
+    extractor = MetricExtractor()
+    legacy_equivalent = MetricExtractor({name: DEFAULT_METRICS[name] for name in LEGACY_METRICS})
+
+    legacy_s = best_of(legacy_extract_financial_metrics, text, args.repeat)
+    same_metrics_s = best_of(legacy_equivalent.extract, text, args.repeat)
+    compiled_s = best_of(extractor.extract, text, args.repeat)
+    hits = len(extractor.find(text))
+
+    results = {
+        'benchmark': 'metric_extraction',
+        'document_mb': round(len(text) / 1e6, 2),
+        'lines': args.lines,
+        'statement_ratio': args.statement_ratio,
+        'legacy_s': round(legacy_s, 4),
+        'compiled_same_metrics_s': round(same_metrics_s, 4),
+        'compiled_s': round(compiled_s, 4),
+        'speedup_same_metrics': round(legacy_s / same_metrics_s, 2) if same_metrics_s else None,
+        'metrics_tracked': len(extractor.metrics),
+        'hits': hits,
+    }
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"📄 Synthetic document: {results['document_mb']} MB, {args.lines:,} lines")
+        print(f"Legacy (6 metrics, 6 passes):          {legacy_s:.3f}s")
+        print(f"Compiled (same 6 metrics, 1 pass):     {same_metrics_s:.3f}s  "
+              f"({results['speedup_same_metrics']}x)")
+        print(f"Compiled ({results['metrics_tracked']} metrics, 1 pass):         {compiled_s:.3f}s  "
+              f"·  {hits:,} hits with positions")
+
+
+if __name__ == "__main__":
+    main()
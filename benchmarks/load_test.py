@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Load test of the Q&A flow with N concurrent users
+--> Each simulated user is a thread with its own OllamaClient, like a Streamlit session
+--> Users ask questions about a shared workspace: routing, retrieval, prompt build, then the model
+--> Runs against the stub Ollama server (latency, tokens/sec, failures configurable) or a real one (--base-url)
+--> Reports p50/p95/p99 of answer latency, time to first token and queue wait, plus throughput and errors
+"""
+
+# import necessary libraries
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_budget import ANSWER_RESERVE_TOKENS, context_window, fit_budget
+from conversation import Conversation
+from document_processor import DocumentProcessor, LocalFile
+from doc_cache import document_key
+from ollama_client import OllamaClient
+from stub_ollama import STUB_MODEL, start_stub_server
+from workspace import QUICK_QUESTIONS, Workspace
+
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_documents")
+QUESTIONS = QUICK_QUESTIONS + [
+    "Why did operating expenses change between quarters?",
+    "Summarize the company's financial performance",
+    "What are the main risks mentioned in the notes?",
+    "Compare current assets to current liabilities",
+]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {f"p{pct}": round(percentile(values, pct), 1) if values else None for pct in (50, 95, 99)}
+
+
+def load_workspace(paths: List[str]) -> Workspace:
+    workspace = Workspace()
+    processor = DocumentProcessor()
+    for path in paths:
+        local_file = LocalFile(path)
+        workspace.add(document_key(local_file.getvalue()), local_file.name, processor.process(local_file),
+                      type=local_file.type, size=local_file.size)
+    return workspace
+
+
+def ask(client: OllamaClient, workspace: Workspace, conversation: Optional[Conversation], question: str,
+        args: argparse.Namespace) -> Dict[str, Any]:
+    """One turn of the Q&A flow; returns its timings in ms"""
+    started = time.perf_counter()
+    if args.direct:
+        routed = workspace.route(question)
+        if routed['answer'] is not None:
+            return {'route': 'direct', 'total_ms': (time.perf_counter() - started) * 1000, 'error': None}
+
+    if conversation is None:
+        budget = fit_budget(args.model, args.token_budget, client.build_prompt(question))
+        context = workspace.build_context(question, top_k=args.top_k, token_budget=budget)
+        if args.stream:
+            response = "".join(client.stream_response(args.model, question, context))
+        else:
+            response = client.generate_response(args.model, question, context)
+    else:
+        budget = fit_budget(args.model, args.token_budget, conversation.system['content'] + question, share=0.5)
+        user_content = conversation.user_content(question, workspace.build_context(question, top_k=args.top_k,
+                                                                                   token_budget=budget))
+        messages = conversation.messages(user_content, context_window(args.model) - ANSWER_RESERVE_TOKENS)
+        if args.stream:
+            response = "".join(client.stream_chat(args.model, messages))
+        else:
+            response = client.chat_response(args.model, messages)
+        if not client.last_stats.get('error'):
+            conversation.record(user_content, response)
+
+    stats = client.last_stats
+    error = stats.get('error')
+    return {
+        'route': 'llm',
+        'total_ms': (time.perf_counter() - started) * 1000,
+        'first_token_ms': stats['first_token_s'] * 1000 if stats.get('first_token_s') is not None else None,
+        'queue_ms': stats.get('queue_s', 0.0) * 1000,
+        'error': error,
+    }
+
+
+def simulate_user(user: int, workspace: Workspace, args: argparse.Namespace,
+                  start_barrier: threading.Barrier) -> List[Dict[str, Any]]:
+    """A session asking --questions questions with think time in between"""
+    rng = random.Random(args.seed + user)
+    client = OllamaClient(args.base_url)
+    conversation = (Conversation((args.model, user), client.build_system_prompt(), document_in_prefix=False)
+                    if args.chat else None)
+    start_barrier.wait()
+    results = []
+    for _ in range(args.questions):
+        results.append(ask(client, workspace, conversation, rng.choice(QUESTIONS), args))
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))    # mean think time between questions
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10, help="concurrent users")
+    parser.add_argument('--questions', type=int, default=10, help="questions per user")
+    parser.add_argument('--think-time', type=float, default=0.0, help="mean seconds between a user's questions")
+    parser.add_argument('--documents', nargs='*', default=None, help="documents to load (default: sample_documents)")
+    parser.add_argument('--no-direct', dest='direct', action='store_false', help="send every question to the model")
+    parser.add_argument('--no-stream', dest='stream', action='store_false', help="wait for complete answers")
+    parser.add_argument('--chat', action='store_true', help="conversation mode (/api/chat with history)")
+    parser.add_argument('--top-k', type=int, default=5, help="chunks retrieved per question")
+    parser.add_argument('--token-budget', type=int, default=1500, help="context tokens per question")
+    parser.add_argument('--base-url', default=None, help="real Ollama server to test instead of the stub")
+    parser.add_argument('--model', default=STUB_MODEL, help="model to ask (with --base-url)")
+    parser.add_argument('--latency', type=float, default=0.2, help="stub: seconds before the first token")
+    parser.add_argument('--tokens-per-second', type=float, default=50.0, help="stub: generation speed")
+    parser.add_argument('--parallel', type=int, default=4, help="stub: requests answered at once (0: unlimited)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="stub: share of requests that fail")
+    parser.add_argument('--failure-status', type=int, default=500, help="stub: HTTP status of failed requests")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for questions and failures")
+    parser.add_argument('--json', action='store_true', help="print machine-readable results")
+    args = parser.parse_args()
+
+    server = None
+    if args.base_url is None:
+        server = start_stub_server(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                   parallel=args.parallel, failure_rate=args.failure_rate,
+                                   failure_status=args.failure_status, seed=args.seed)
+        args.base_url = server.base_url
+
+    documents = args.documents or [os.path.join(SAMPLE_DIR, name) for name in sorted(os.listdir(SAMPLE_DIR))]
+    workspace = load_workspace(documents)
+
+    start_barrier = threading.Barrier(args.users + 1)
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(simulate_user, user, workspace, args, start_barrier) for user in range(args.users)]
+        start_barrier.wait()    # all sessions start together
+        started = time.perf_counter()
+        results = [result for future in futures for result in future.result()]
+        elapsed = time.perf_counter() - started
+    if server is not None:
+        server.shutdown()
+
+    ok = [result for result in results if not result['error']]
+    llm = [result for result in ok if result['route'] == 'llm']
+    report = {
+        'benchmark': 'load_test',
+        'users': args.users,
+        'questions': len(results),
+        'errors': len(results) - len(ok),
+        'direct_answers': len(ok) - len(llm),
+        'seconds': round(elapsed, 2),
+        'questions_per_s': round(len(results) / elapsed, 2),
+        'latency_ms': summarize([result['total_ms'] for result in ok]),
+        'llm_latency_ms': summarize([result['total_ms'] for result in llm]),
+        'first_token_ms': summarize([result['first_token_ms'] for result in llm if result['first_token_ms'] is not None]),
+        'queue_ms': summarize([result['queue_ms'] for result in llm]),
+        'stub': server.counters if server is not None else None,
+        'settings': {key: value for key, value in vars(args).items() if key != 'json'},
+    }
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"👥 {args.users} users · {len(results)} questions in {elapsed:.1f}s · "
+              f"{report['questions_per_s']} questions/s · {report['errors']} errors · "
+              f"{report['direct_answers']} answered from tables")
+        for label, key in (("All answers", 'latency_ms'), ("Model answers", 'llm_latency_ms'),
+                           ("First token", 'first_token_ms'), ("Queue wait", 'queue_ms')):
+            values = report[key]
+            if values['p50'] is not None:
+                print(f"{label:<14} p50 {values['p50']:8.1f} ms · p95 {values['p95']:8.1f} ms · p99 {values['p99']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+One-pass, mergeable statistics for numeric table columns
+--> Count, nulls, min, max, mean and standard deviation, merged with the parallel variance formula
+--> Quantiles from a small mergeable sketch (KLL-style compactors), so streamed sheets need no second pass
+--> Vectorized with NumPy per chunk of rows; chunk summaries merge into each column's running summary
+--> Computed once when a document is processed and stored with it, for the prompt summary and the UI
+"""
+
+# import required libraries
+import math
+from numbers import Number
+from typing import TYPE_CHECKING, Dict, List, Any, Callable, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+SKETCH_SIZE = 256    # values kept per sketch level; quantile error shrinks roughly as 1/SKETCH_SIZE
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+# Quantile Sketch : Mergeable approximate quantiles in bounded memory
+class QuantileSketch:
+    """Levels of sorted samples; a level-i value stands for 2**i inputs. Exact until the first compaction"""
+
+    def __init__(self, size: int = SKETCH_SIZE):
+        self.size = size
+        self.levels = [np.empty(0)]
+        self._odd = 0    # alternates which half a compaction keeps, so errors cancel out
+
+    def update(self, values: np.ndarray):
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def merge(self, other: "QuantileSketch"):
+        for height, level in enumerate(other.levels):
+            if height == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[height] = np.concatenate([self.levels[height], level])
+        self._compact()
+
+    def _compact(self):
+        """Halve every level over capacity, promoting every other sorted value to the level above"""
+        height = 0
+        while height < len(self.levels):
+            level = self.levels[height]
+            if len(level) > self.size:
+                level = np.sort(level)
+                kept, level = (level[-1:], level[:-1]) if len(level) % 2 else (level[:0], level)
+                if height + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[height + 1] = np.concatenate([self.levels[height + 1], level[self._odd::2]])
+                self.levels[height] = kept
+                self._odd ^= 1
+            height += 1
+
+    def quantile(self, q: float) -> float:
+        if len(self.levels) == 1:
+            return float(np.quantile(self.levels[0], q)) if len(self.levels[0]) else math.nan
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        midpoints = np.cumsum(weights) - weights / 2    # rank at the centre of each value's weight
+        return float(np.interp(q * weights.sum(), midpoints, values))
+
+
+# Column Stats : Running summary of one numeric column
+class ColumnStats:
+    """Count, nulls, min, max, mean, variance and quantiles of a column, built chunk by chunk"""
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.min = math.nan
+        self.max = math.nan
+        self.mean = math.nan
+        self.m2 = 0.0    # sum of squared deviations from the mean
+        self.sketch = QuantileSketch()
+
+    def update(self, values: np.ndarray, nulls: int = 0) -> "ColumnStats":
+        """Add a chunk of values (NaN counts as null)"""
+        values = np.asarray(values, dtype=float)
+        present = values[~np.isnan(values)]
+        chunk = ColumnStats()
+        chunk.nulls = nulls + len(values) - len(present)
+        if len(present):
+            chunk.count = len(present)
+            chunk.min, chunk.max = float(present.min()), float(present.max())
+            chunk.mean = float(present.mean())
+            chunk.m2 = float(((present - chunk.mean) ** 2).sum())
+            chunk.sketch.update(present)
+        return self.merge(chunk)
+
+    def merge(self, other: "ColumnStats") -> "ColumnStats":
+        """Fold another summary of the same column (e.g. a later chunk) into this one"""
+        self.nulls += other.nulls
+        if not other.count:
+            return self
+        if not self.count:
+            self.min, self.max, self.mean, self.m2 = other.min, other.max, other.mean, other.m2
+        else:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.count += other.count
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation, like pandas"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+    def describe(self) -> Dict[str, float]:
+        """The rows of DataFrame.describe(), plus the null count"""
+        quantiles = {f"{q:.0%}": self.quantile(q) for q in QUANTILES}
+        return {'count': self.count, 'nulls': self.nulls, 'mean': self.mean, 'std': self.std,
+                'min': self.min, **quantiles, 'max': self.max}
+
+
+def numeric_cells(cells: List[Any], is_missing: Callable[[Any], bool]) -> Optional[np.ndarray]:
+    """Raw cell values of a chunk as floats (NaN for missing); None when any value is text"""
+    values = np.full(len(cells), np.nan)
+    for idx, value in enumerate(cells):
+        if is_missing(value):
+            continue
+        if isinstance(value, bool) or not isinstance(value, Number):
+            return None
+        values[idx] = value
+    return values
+
+
+def frame_stats(df: "pd.DataFrame") -> Dict[str, ColumnStats]:
+    """Stats of every numeric column of a loaded DataFrame, vectorized per column"""
+    numeric = df.select_dtypes(include=[np.number])
+    return {str(col): ColumnStats().update(numeric[col].to_numpy(dtype=float, na_value=np.nan))
+            for col in numeric.columns if numeric[col].notna().any()}
+
+
+def table_stats(tables: Dict[str, "pd.DataFrame"]) -> Dict[str, Dict[str, ColumnStats]]:
+    """Sheet name -> column stats; streamed workbooks reuse the stats of their scan"""
+    summaries = getattr(tables, 'summaries', None)
+    if summaries is not None:
+        return {name: summary['stats'] for name, summary in summaries.items()}
+    return {name: frame_stats(df) for name, df in tables.items()}
+
+
+def describe_table(stats: Dict[str, ColumnStats]) -> Dict[str, Dict[str, float]]:
+    """{column: {statistic: value}}, which pandas shows like DataFrame.describe()"""
+    return {col: column.describe() for col, column in stats.items()}
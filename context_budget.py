@@ -0,0 +1,52 @@
+"""
+Per-model prompt budgeting
+--> Knows the context window of common Ollama models (capped so the server's memory stays bounded)
+--> Reserves room for the prompt template, the question and the answer
+--> Reports how many tokens the compact, question-specific context saved per call
+"""
+
+# import required libraries
+import os
+from typing import Dict
+
+from retrieval import estimate_tokens
+
+
+# Context window (num_ctx) per model family; unknown models get Ollama's default
+MODEL_CONTEXT_WINDOWS = {
+    'llama3.2': 131072,
+    'llama3.1': 131072,
+    'llama3': 8192,
+    'llama2': 4096,
+    'mistral': 32768,
+    'mixtral': 32768,
+    'codellama': 16384,
+    'gemma2': 8192,
+    'phi3': 4096,
+    'qwen2.5': 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+MAX_CONTEXT_WINDOW = int(os.environ.get("FINDOC_MAX_NUM_CTX", "8192"))    # larger windows cost server memory
+ANSWER_RESERVE_TOKENS = 512    # room left for the model's answer
+
+
+def context_window(model: str) -> int:
+    """num_ctx to request for a model such as 'llama3.2:3b'"""
+    family = model.split(':')[0].lower()
+    return min(MODEL_CONTEXT_WINDOWS.get(family, DEFAULT_CONTEXT_WINDOW), MAX_CONTEXT_WINDOW)
+
+
+def fit_budget(model: str, requested: int, prompt_without_context: str, share: float = 1.0) -> int:
+    """Document tokens that fit: the requested budget, capped by (a share of) what the model's window leaves"""
+    available = context_window(model) - estimate_tokens(prompt_without_context) - ANSWER_RESERVE_TOKENS
+    return max(0, min(requested, int(available * share)))
+
+
+def token_report(context: str, full_tokens: int) -> Dict[str, int]:
+    """Tokens sent versus sending the full extracted text verbatim"""
+    context_tokens = estimate_tokens(context) if context else 0
+    return {
+        'context_tokens': context_tokens,
+        'full_tokens': full_tokens,
+        'saved_tokens': max(0, full_tokens - context_tokens),
+    }
@@ -0,0 +1,53 @@
+"""
+Multi-turn conversations over the loaded documents
+--> Keeps the instructions (and the document, when it fits) in a stable system message
+--> Replays earlier turns exactly as sent, so Ollama reuses the cached prompt prefix
+--> Drops the oldest turns once the history outgrows the model's window
+"""
+
+# import required libraries
+from typing import Dict, List, Tuple
+
+from retrieval import estimate_tokens
+
+
+# Conversation : Chat history for one model and document selection
+class Conversation:
+    """Messages sent to Ollama's chat endpoint, kept byte-identical between turns"""
+
+    def __init__(self, key: Tuple, system_prompt: str, document_in_prefix: bool):
+        self.key = key    # (model, document keys) the history belongs to
+        self.system = {'role': 'system', 'content': system_prompt}
+        self.document_in_prefix = document_in_prefix    # False: each question carries its own excerpts
+        self.turns = []    # (user message, assistant message) pairs as sent
+
+    @staticmethod
+    def user_content(question: str, excerpts: str = "") -> str:
+        if not excerpts:
+            return question
+        return f"Relevant document excerpts:\n{excerpts}\n\nQuestion: {question}"
+
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(message['content']) for turn in self.turns for message in turn)
+
+    def messages(self, user_content: str, max_tokens: int) -> List[Dict[str, str]]:
+        """System prefix, as many recent turns as fit in max_tokens, then the new question"""
+        used = estimate_tokens(self.system['content']) + estimate_tokens(user_content)
+        kept = 0
+        for user, assistant in reversed(self.turns):
+            tokens = estimate_tokens(user['content']) + estimate_tokens(assistant['content'])
+            if used + tokens > max_tokens:
+                break
+            used += tokens
+            kept += 1
+
+        # Dropped turns stay dropped, so the following turns share one prefix again
+        self.turns = self.turns[len(self.turns) - kept:]
+        messages = [self.system]
+        for user, assistant in self.turns:
+            messages.extend([user, assistant])
+        messages.append({'role': 'user', 'content': user_content})
+        return messages
+
+    def record(self, user_content: str, answer: str):
+        self.turns.append(({'role': 'user', 'content': user_content}, {'role': 'assistant', 'content': answer}))
@@ -0,0 +1,136 @@
+"""
+Processed document cache
+--> Keys processed documents by a hash of the uploaded file bytes
+--> Keeps recently used documents in an in-memory LRU tier
+--> Persists documents to an on-disk tier with size-based eviction
+"""
+
+# import required libraries
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+# Bump whenever the processing output changes shape so stale entries are ignored
+PROCESSING_VERSION = 11
+
+DEFAULT_CACHE_DIR = os.environ.get("FINDOC_CACHE_DIR", os.path.join(".cache", "documents"))
+DEFAULT_MEMORY_ITEMS = 16
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024    # 512 MB
+
+
+def document_key(data: bytes) -> str:
+    """Return the cache key for raw document bytes"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"v{PROCESSING_VERSION}-{digest}"
+
+
+# Document Cache : Two-tier (memory + disk) store of processed documents
+class DocumentCache:
+    """Thread-safe LRU memory cache backed by a size-bounded disk cache"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_memory_items: int = DEFAULT_MEMORY_ITEMS,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        """Insert into the memory tier, evicting the least recently used entry"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a processed document from memory or disk, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)    # mark as recently used for disk eviction
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupt or incompatible entry: drop it and reprocess
+            self._remove(path)
+            return None
+
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a processed document in both tiers"""
+        with self._lock:
+            self._remember(key, value)
+
+        # Write to a temp file first so concurrent readers never see partial entries
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            return
+        self._evict_disk()
+
+    def invalidate(self, key: str):
+        """Drop a document from both tiers, so its next upload is processed again"""
+        with self._lock:
+            self._memory.pop(key, None)
+        self._remove(self._path(key))
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier fits max_disk_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()    # oldest first
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every cached document from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                self._remove(os.path.join(self.cache_dir, name))
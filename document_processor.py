@@ -0,0 +1,133 @@
+"""
+Document processing shared by the Streamlit app and the batch CLI
+--> Extracts text, tables, metrics and a retrieval index from a PDF or Excel file
+--> Accepts Streamlit uploads or files read from disk (LocalFile)
+--> Reports read errors through a callback (or raises DocumentError), so it runs with or without Streamlit
+--> Imports pandas, openpyxl and PyPDF2 only when a file of that type is processed
+--> Traces each extraction stage with its duration and sizes (see tracing.py)
+"""
+
+# import required libraries
+import io
+import os
+from typing import TYPE_CHECKING, Dict, List, Any, Callable, Optional
+
+from metrics import default_extractor
+from pdf_extract import extract_pages, join_pages
+from retrieval import ChunkIndex
+from tracing import tracer
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from excel_stream import LazyWorkbook
+
+
+PDF_TYPE = "application/pdf"
+EXCEL_TYPES = ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"]
+MIME_TYPES = {'.pdf': PDF_TYPE, '.xlsx': EXCEL_TYPES[0], '.xls': EXCEL_TYPES[1]}
+
+
+class DocumentError(Exception):
+    """Raised for unreadable documents when no on_error callback is given"""
+
+
+def raise_error(message: str):
+    raise DocumentError(message)
+
+
+# Local File : A document on disk that looks like a Streamlit upload
+class LocalFile(io.BytesIO):
+    """File bytes with the name, type and size attributes of an UploadedFile"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            super().__init__(f.read())
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+        self.size = len(self.getvalue())
+
+
+# Document Processor : Extracts text/data from PDFs and Excel sheets
+class DocumentProcessor:
+    """Handles processing of PDF and Excel financial documents"""
+
+    def __init__(self, on_error: Optional[Callable[[str], Any]] = None, max_workers: Optional[int] = None):
+        self.on_error = on_error or raise_error    # st.error in the app, collected per file in the CLI
+        self.max_workers = max_workers    # PDF extraction processes (None: one per CPU)
+
+    @tracer.traced('pdf_parse', lambda pages, self, uploaded_file: {
+        'bytes': getattr(uploaded_file, 'size', None), 'pages': len(pages)})
+    def extract_pdf_pages(self, uploaded_file) -> List[Dict[str, Any]]:
+        """Read PDF and return [{'page': n, 'text': ...}], extracting large files in parallel"""
+        try:
+            return extract_pages(uploaded_file.read(), max_workers=self.max_workers)
+        except Exception as e:
+            self.on_error(f"Error reading PDF: {str(e)}")
+            return []
+
+    def extract_pdf_text(self, uploaded_file) -> str:
+        """Read PDF and return extracted text"""
+        return join_pages(self.extract_pdf_pages(uploaded_file))
+
+    def extract_pdf_tables(self, uploaded_file) -> Dict[str, "pd.DataFrame"]:
+        """Read PDF and return its tables as DataFrames named 'Page N Table M'"""
+        from pdf_tables import collect_tables
+        return collect_tables(self.extract_pdf_pages(uploaded_file))
+
+    @tracer.traced('excel_parse', lambda result, self, uploaded_file: {
+        'bytes': getattr(uploaded_file, 'size', None), 'sheets': len(result[1]),
+        'rows': sum(summary['rows'] for summary in getattr(result[1], 'summaries', {}).values())})
+    def extract_excel_data(self, uploaded_file) -> tuple[str, "LazyWorkbook"]:
+        """Stream all Excel sheets once → return text summary + lazily loaded DataFrames"""
+        from excel_stream import LazyWorkbook, summarize_workbook    # pandas + openpyxl: imported on first use
+        try:
+            # Single read-only pass per sheet; full DataFrames load only when a sheet is opened
+            workbook = LazyWorkbook(uploaded_file.read())
+            return summarize_workbook(workbook), workbook
+
+        except Exception as e:
+            self.on_error(f"Error reading Excel file: {str(e)}")
+            return "", {}
+
+    @staticmethod
+    @tracer.traced('metric_extraction', lambda metrics, text, *_: {'chars': len(text), 'metrics': len(metrics)})
+    def extract_financial_metrics(text: str, pages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Extract common key financial metrics from text in a single compiled regex pass
+
+        Given the PDF pages, each page is read on its own so an "in thousands" only scales its own page.
+        """
+        return default_extractor.extract(text) if pages is None else default_extractor.extract_pages(pages)
+
+    def process(self, uploaded_file) -> Dict[str, Any]:
+        """Extract text, tables, metrics and retrieval index from an uploaded file"""
+        from column_stats import table_stats    # numpy: imported on first use
+        from period_analytics import build_cubes
+        content, excel_data = "", {}
+        index, pages = None, None
+
+        if uploaded_file.type == PDF_TYPE:
+            # Extract PDF page by page so chunks keep their page numbers
+            from pdf_tables import TableCollector    # pandas: imported on first use
+            pages = self.extract_pdf_pages(uploaded_file)
+            content = join_pages(pages)
+            collector = TableCollector()
+            pages, _ = collector.add(pages)    # continuation tables take the real column names
+            excel_data = collector.tables    # rebuilt tables, shown and queried like Excel sheets
+            index = ChunkIndex.from_pages(pages)
+
+        elif uploaded_file.type in EXCEL_TYPES:
+            # Extract Excel; the index holds compact CSV row groups of every sheet rather than the summary text
+            content, excel_data = self.extract_excel_data(uploaded_file)
+            if excel_data:
+                index = ChunkIndex.from_tables(excel_data.compact_tables())
+
+        # Keys mirror the session state variables they are loaded into
+        return {
+            'document_content': content,
+            'excel_data': excel_data,
+            'financial_metrics': self.extract_financial_metrics(content, pages),    # key financial metrics
+            'document_index': index or ChunkIndex.from_text(content),    # retrieval index so each question only sends relevant chunks
+            'table_stats': table_stats(excel_data),    # numeric column stats per sheet, for the summary and the UI
+            'period_cubes': build_cubes(excel_data),    # growth, trailing totals and ratios of period tables
+        }
@@ -0,0 +1,277 @@
+"""
+Streaming Excel loading for large workbooks
+--> Scans each sheet once with openpyxl's read-only mode, computing column stats and sample rows
+--> Column stats are merged chunk by chunk (column_stats.py), so no sheet is read twice for its summary
+--> Keeps memory bounded: only running totals and the first rows are held per sheet
+--> Materializes a full DataFrame for a sheet only when it is first accessed
+--> Renders rows as compact CSV (scaled columns, no padding) for the model's context
+"""
+
+# import required libraries
+import io
+import threading
+from collections.abc import Mapping
+from numbers import Number
+from typing import Dict, List, Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from column_stats import ColumnStats, frame_stats, numeric_cells
+
+
+SAMPLE_ROWS = 10
+STATS_CHUNK_ROWS = 4096    # rows buffered per column stats update
+MAX_CONTEXT_ROWS = 5000    # rows per sheet rendered for retrieval; larger sheets are truncated
+SCALES = ((1e9, "billions"), (1e6, "millions"), (1e3, "thousands"))
+
+# Strings pandas.read_excel treats as missing by default
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value in NA_STRINGS)
+
+
+def is_xlsx(data: bytes) -> bool:
+    """True for zip-based workbooks (xlsx/xlsm) that openpyxl can stream"""
+    return data[:2] == b'PK'
+
+
+def unique_columns(header: List[Any]) -> List[str]:
+    """Name columns the way pandas does: 'Unnamed: i' for blanks, '.n' suffixes for duplicates"""
+    columns = []
+    seen = {}
+    for idx, name in enumerate(header):
+        name = f"Unnamed: {idx}" if name is None else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def compact_value(value: Any, scale: float = 1.0) -> str:
+    """Render a cell without padding: integers without decimals, blanks for missing values"""
+    if is_missing(value) or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, bool) or not isinstance(value, Number):
+        text = str(value).strip()
+        return f'"{text}"' if ',' in text else text
+    value = float(value) / scale
+    if value.is_integer():
+        return str(int(value))
+    return f"{value:.10g}"
+
+
+def column_scale(values: List[Any]) -> float:
+    """Thousands/millions/billions divisor that shortens a numeric column without losing precision"""
+    present = [value for value in values if not is_missing(value)]
+    if not present or any(isinstance(value, bool) or not isinstance(value, Number) for value in present):
+        return 1.0    # empty or text column
+
+    def exact(value: Any, scale: float) -> bool:
+        # Scaled values may keep up to three decimals, e.g. 74,100 -> 74.1 thousands
+        scaled = float(value) / scale
+        return abs(round(scaled, 3) * scale - float(value)) <= 1e-9 * max(1.0, abs(float(value)))
+
+    best, best_length = 1.0, sum(len(compact_value(value)) for value in present)
+    for scale, _ in SCALES:
+        if all(exact(value, scale) for value in present):
+            length = sum(len(compact_value(value, scale)) for value in present)
+            if length < best_length:
+                best, best_length = scale, length
+    return best
+
+
+def compact_lines(columns: List[str], rows: List[List[Any]]) -> List[str]:
+    """CSV header plus one line per row; scaled columns get a unit suffix in the header"""
+    scales = [column_scale([row[idx] if idx < len(row) else None for row in rows]) for idx in range(len(columns))]
+    units = dict((scale, name) for scale, name in SCALES)
+    header = [compact_value(f"{name} ({units[scale]})" if scale in units else name) for name, scale in zip(columns, scales)]
+    lines = [",".join(header)]
+    for row in rows:
+        lines.append(",".join(compact_value(value, scale) for value, scale in zip(row, scales)).rstrip(","))
+    return lines
+
+
+def scan_sheet(rows: Iterator[tuple], sample_rows: int = SAMPLE_ROWS,
+               context_rows: int = MAX_CONTEXT_ROWS) -> Dict[str, Any]:
+    """Summarize a sheet from an iterator of row tuples (header first) in one pass"""
+    header = next(rows, None) or ()
+    columns = unique_columns(list(header))
+    stats = [ColumnStats() for _ in columns]
+    numeric = [True] * len(columns)    # False once a non-numeric value is seen (pandas would use object dtype)
+    chunk = []    # rows not yet added to the column stats
+    sample = []
+    kept = []    # non-blank rows rendered for the model's context
+    row_count = 0
+    pending_blank = 0    # blank rows only count if data follows them
+
+    def add_chunk():
+        for idx in range(len(columns)):
+            if numeric[idx]:
+                values = numeric_cells([row[idx] if idx < len(row) else None for row in chunk], is_missing)
+                if values is None:
+                    numeric[idx] = False
+                else:
+                    stats[idx].update(values)
+        chunk.clear()
+
+    for row in rows:
+        if all(is_missing(value) for value in row):
+            pending_blank += 1
+            continue
+        for _ in range(pending_blank):
+            chunk.append(())
+            if len(sample) < sample_rows:
+                sample.append([np.nan] * len(columns))
+        row_count += pending_blank + 1
+        pending_blank = 0
+
+        # Widen when a data row is longer than the header
+        while len(row) > len(columns):
+            columns.append(f"Unnamed: {len(columns)}")
+            stats.append(ColumnStats().update(np.full(row_count - 1 - len(chunk), np.nan)))    # earlier rows
+            numeric.append(True)
+            for sample_row in sample:
+                sample_row.append(np.nan)
+
+        chunk.append(row)
+        if len(chunk) >= STATS_CHUNK_ROWS:
+            add_chunk()
+        if len(kept) < context_rows:
+            kept.append(list(row))
+        if len(sample) < sample_rows:
+            values = [np.nan if is_missing(value) else value for value in row]
+            sample.append(values + [np.nan] * (len(columns) - len(row)))
+
+    add_chunk()
+    sample_df = pd.DataFrame(sample, columns=columns)
+    return {
+        'columns': columns,
+        'rows': row_count,
+        'stats': {name: s for name, s, is_numeric in zip(columns, stats, numeric) if is_numeric and s.count > 0},
+        'sample': sample_df,
+        'lines': compact_lines(columns, kept),
+    }
+
+
+def scan_dataframe(df: pd.DataFrame, sample_rows: int = SAMPLE_ROWS,
+                   context_rows: int = MAX_CONTEXT_ROWS) -> Dict[str, Any]:
+    """Build the same summary as scan_sheet from an already loaded DataFrame"""
+    return {
+        'columns': [str(col) for col in df.columns],
+        'rows': df.shape[0],
+        'stats': frame_stats(df),
+        'sample': df.head(sample_rows),
+        'lines': compact_lines(
+            [str(col) for col in df.columns],
+            [list(row) for row in df.dropna(how='all').head(context_rows).itertuples(index=False)]
+        ),
+    }
+
+
+# Lazy Workbook : Sheet name -> DataFrame mapping that loads sheets on demand
+class LazyWorkbook(Mapping):
+    """Read-only mapping of sheet names to DataFrames, materialized on first access"""
+
+    source = 'excel'    # PDF tables are plain dicts
+
+    def __init__(self, data: bytes, sample_rows: int = SAMPLE_ROWS):
+        self.data = data
+        self._frames = {}
+        self._lock = threading.Lock()
+
+        if is_xlsx(data):
+            workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+            try:
+                self.summaries = {
+                    name: scan_sheet(workbook[name].iter_rows(values_only=True), sample_rows)
+                    for name in workbook.sheetnames
+                }
+            finally:
+                workbook.close()
+        else:
+            # Legacy .xls cannot be streamed; load eagerly through pandas
+            excel_file = pd.ExcelFile(io.BytesIO(data))
+            self._frames = {name: pd.read_excel(excel_file, sheet_name=name) for name in excel_file.sheet_names}
+            self.summaries = {name: scan_dataframe(df, sample_rows) for name, df in self._frames.items()}
+
+    def __getitem__(self, sheet_name: str) -> pd.DataFrame:
+        if sheet_name not in self.summaries:
+            raise KeyError(sheet_name)
+        with self._lock:
+            if sheet_name not in self._frames:
+                self._frames[sheet_name] = pd.read_excel(io.BytesIO(self.data), sheet_name=sheet_name)
+            return self._frames[sheet_name]
+
+    def __iter__(self):
+        return iter(self.summaries)
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def load_all(self, sheet_names: Optional[List[str]] = None):
+        """Materialize every sheet (or the given sheets) not loaded yet, parsing the workbook once"""
+        with self._lock:
+            missing = [name for name in sheet_names or self.summaries if name not in self._frames]
+            if missing:
+                excel_file = pd.ExcelFile(io.BytesIO(self.data))
+                for name in missing:
+                    self._frames[name] = pd.read_excel(excel_file, sheet_name=name)
+
+    def read_sheet(self, sheet_name: str) -> pd.DataFrame:
+        """The sheet as a DataFrame without keeping it, unless it is already loaded"""
+        with self._lock:
+            frame = self._frames.get(sheet_name)
+        return frame if frame is not None else pd.read_excel(io.BytesIO(self.data), sheet_name=sheet_name)
+
+    def is_loaded(self, sheet_name: str) -> bool:
+        return sheet_name in self._frames
+
+    def shape(self, sheet_name: str) -> tuple:
+        """(rows, columns) from the scan, without loading the sheet"""
+        summary = self.summaries[sheet_name]
+        return summary['rows'], len(summary['columns'])
+
+    def compact_tables(self) -> Dict[str, List[str]]:
+        """Sheet name -> compact CSV lines (header first), for the retrieval index"""
+        return {name: summary['lines'] for name, summary in self.summaries.items()}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled; materialized frames are kept so cached copies stay warm
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def summarize_workbook(workbook: LazyWorkbook) -> str:
+    """Render the per-sheet text summary sent to the model"""
+    parts = []
+    for sheet_name, summary in workbook.summaries.items():
+        parts.append(f"\n=== Sheet: {sheet_name} ===\n")
+        parts.append(f"Shape: {summary['rows']} rows, {len(summary['columns'])} columns\n")
+        parts.append(f"Columns: {', '.join(summary['columns'])}\n")
+
+        # Add numeric data summary
+        if summary['stats']:
+            parts.append("\nNumeric Data Summary:\n")
+            for col, stats in summary['stats'].items():
+                parts.append(f"{col}: Min={stats.min:.2f}, Max={stats.max:.2f}, Mean={stats.mean:.2f}, "
+                             f"Median={stats.quantile(0.5):.2f}\n")
+
+        # Add first few rows as text
+        parts.append("\nSample Data:\n")
+        parts.append(summary['sample'].to_string() + "\n")
+    return "".join(parts)
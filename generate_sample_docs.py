@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 """
 Generate sample financial documents for testing the Financial Document Q&A Assistant
+--> Without options: the fixed sample workbook and income statement in the current folder
+--> With --synthetic: scalable documents (pages, sheets, rows, years/quarters, noise) for benchmarks
 """
 
 # import necessary libraries
+import argparse
 import pandas as pd
 from datetime import datetime, timedelta
 import random
 import numpy as np
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
@@ -441,6 +444,117 @@ def generate_sample_pdf():
     print("✅ Generated sample_income_statement.pdf")
 
 
+# Line items of the synthetic statements: (label, typical quarterly amount); negative amounts are outflows
+SYNTHETIC_ITEMS = [
+    ('Sales Revenue', 1250000), ('Service Revenue', 875000), ('Other Income', 125000), ('Total Revenue', 2250000),
+    ('Direct Materials', 450000), ('Direct Labor', 320000), ('Manufacturing Overhead', 180000),
+    ('Total Cost of Goods Sold', 950000), ('Gross Profit', 1300000), ('Salaries & Wages', 485000),
+    ('Marketing & Advertising', 125000), ('Rent & Utilities', 95000), ('Professional Services', 65000),
+    ('Insurance', 45000), ('Depreciation', 85000), ('Total Operating Expenses', 1025000),
+    ('Operating Income', 275000), ('Interest Income', 15000), ('Interest Expense', -35000),
+    ('Income Before Taxes', 247000), ('Income Tax Expense', 74100), ('Net Income', 172900),
+    ('Cash and Cash Equivalents', 485000), ('Accounts Receivable', 625000), ('Inventory', 385000),
+    ('Total Current Assets', 1615000), ('Property, Plant & Equipment', 2850000), ('Total Assets', 4200000),
+    ('Accounts Payable', 285000), ('Total Current Liabilities', 960000), ('Long-term Debt', 850000),
+    ('Total Liabilities', 1810000), ('Total Equity', 2390000), ('Capital Expenditures', -185000),
+    ('Net Cash from Operating Activities', 465900), ('EBITDA', 360000),
+]
+SYNTHETIC_SHEETS = ['Income Statement', 'Balance Sheet', 'Cash Flow', 'Key Metrics']
+SYNTHETIC_NOTES = [
+    "All amounts are presented in US Dollars and quarterly results are unaudited.",
+    "Revenue recognition follows ASC 606 guidelines; depreciation uses the straight-line method.",
+    "Management believes the allowance for doubtful accounts is adequate as of period end.",
+    "Segment results reflect the internal reporting structure reviewed by the chief operating decision maker.",
+]
+
+
+def period_labels(years: int = 1, quarters: int = 4, first_year: int = 2024) -> list:
+    """Column headers for the reporting periods: 'Q1 2024'... or 'FY 2024' when quarters is 0"""
+    if quarters <= 0:
+        return [f"FY {first_year + year}" for year in range(years)]
+    return [f"Q{quarter + 1} {first_year + year}" for year in range(years) for quarter in range(quarters)]
+
+
+def synthetic_statement(rows: int, periods: list, noise: float, rng: np.random.Generator,
+                        offset: int = 0) -> pd.DataFrame:
+    """Line items (cycling through SYNTHETIC_ITEMS) with a trend plus noise across periods"""
+    labels, values = [], []
+    for idx in range(offset, offset + rows):
+        label, base = SYNTHETIC_ITEMS[idx % len(SYNTHETIC_ITEMS)]
+        cycle = idx // len(SYNTHETIC_ITEMS)
+        if cycle:
+            label = f"Segment {cycle} {label}"    # keep labels unique once the item list repeats
+        growth = 1 + rng.uniform(0.0, 0.05)    # per-period trend
+        changes = 1 + rng.normal(0.0, noise, len(periods)) if noise else np.ones(len(periods))
+        amounts = base * growth ** np.arange(len(periods)) * changes
+        labels.append(label)
+        values.append(np.round(amounts, -2))
+    df = pd.DataFrame(values, columns=periods)
+    df.insert(0, 'Account', labels)
+    return df
+
+
+def generate_synthetic_excel(path: str, sheets: int = 4, rows: int = 40, years: int = 1, quarters: int = 4,
+                             noise: float = 0.05, seed: int = 42) -> str:
+    """Write a workbook of `sheets` statements with `rows` line items over years x quarters periods"""
+    rng = np.random.default_rng(seed)
+    periods = period_labels(years, quarters)
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for idx in range(sheets):
+            name = SYNTHETIC_SHEETS[idx] if idx < len(SYNTHETIC_SHEETS) else f"Schedule {idx + 1}"
+            synthetic_statement(rows, periods, noise, rng, offset=idx * 7).to_excel(writer, sheet_name=name, index=False)
+    return path
+
+
+def generate_synthetic_pdf(path: str, pages: int = 10, rows: int = 30, years: int = 1, quarters: int = 4,
+                           noise: float = 0.05, seed: int = 42) -> str:
+    """Write a report with one statement table of `rows` line items and a few notes per page"""
+    rng = np.random.default_rng(seed)
+    periods = period_labels(years, quarters)
+    wide = len(periods) > 5
+    doc = SimpleDocTemplate(path, pagesize=landscape(letter) if wide else letter,
+                            rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    value_width = min(1.0, 7.5 / len(periods)) * inch if wide else 1.0 * inch
+
+    story = []
+    for page in range(pages):
+        statement = synthetic_statement(rows, periods, noise, rng, offset=page * 7)
+        story.append(Paragraph(f"TechCorp Industries Inc. - Schedule {page + 1}", styles['Heading2']))
+        story.append(Paragraph("(Amounts in USD)", styles['Normal']))
+        data = [[''] + periods]
+        for _, row in statement.iterrows():
+            data.append([row['Account']] + [f"${value:,.0f}" if value >= 0 else f"(${-value:,.0f})"
+                                            for value in row[periods]])
+        table = Table(data, colWidths=[2.3 * inch] + [value_width] * len(periods))
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ]))
+        story.append(table)
+        story.append(Spacer(1, 10))
+        for note in SYNTHETIC_NOTES[:1 + page % len(SYNTHETIC_NOTES)]:
+            story.append(Paragraph(note, styles['Normal']))
+        if page < pages - 1:
+            story.append(PageBreak())
+    doc.build(story)
+    return path
+
+
+def generate_synthetic_documents(output_dir: str = ".", pages: int = 10, sheets: int = 4, rows: int = 40,
+                                 years: int = 1, quarters: int = 4, noise: float = 0.05, seed: int = 42) -> dict:
+    """Write synthetic_report.pdf and synthetic_statements.xlsx to output_dir and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    return {
+        'pdf': generate_synthetic_pdf(os.path.join(output_dir, "synthetic_report.pdf"),
+                                      pages, min(rows, 30), years, quarters, noise, seed),    # one table fits a page
+        'excel': generate_synthetic_excel(os.path.join(output_dir, "synthetic_statements.xlsx"),
+                                          sheets, rows, years, quarters, noise, seed),
+    }
+
+
 # Main Driver
 # Calls both functions above, generates Excel + PDF, and prints summary
 def create_sample_documents():
@@ -474,4 +588,22 @@ def create_sample_documents():
 
 
 if __name__ == "__main__":
-    create_sample_documents()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate sample financial documents")
+    parser.add_argument("--synthetic", action="store_true", help="generate scalable synthetic documents instead")
+    parser.add_argument("--output-dir", default=".", help="folder for the synthetic documents")
+    parser.add_argument("--pages", type=int, default=10, help="PDF pages (one statement table per page)")
+    parser.add_argument("--sheets", type=int, default=4, help="Excel sheets")
+    parser.add_argument("--rows", type=int, default=40, help="line items per sheet (PDF tables hold up to 30)")
+    parser.add_argument("--years", type=int, default=1, help="years of periods")
+    parser.add_argument("--quarters", type=int, default=4, help="quarters per year (0: annual columns)")
+    parser.add_argument("--noise", type=float, default=0.05, help="relative std. dev. of period-to-period changes")
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible documents")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        paths = generate_synthetic_documents(args.output_dir, args.pages, args.sheets, args.rows,
+                                             args.years, args.quarters, args.noise, args.seed)
+        for path in paths.values():
+            print(f"✅ Generated {path}")
+    else:
+        create_sample_documents()
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Incremental PDF ingestion
+--> Extracts PDF pages on a background thread as they become available
+--> Marks the document queryable once the first pages are ready
+--> Reports progress and supports cancellation when another file is uploaded
+"""
+
+# import required libraries
+import threading
+from typing import Dict, List, Any, Optional
+
+from pdf_extract import iter_page_batches, open_pdf
+from tracing import tracer
+
+
+DEFAULT_READY_PAGES = 10    # pages needed before the document can be queried
+INGEST_BATCH_PAGES = 8    # page range size handed to each pool worker
+
+
+# PDF Ingestion : Background page extraction with partial results
+class PdfIngestion:
+    """Extracts a PDF on a background thread, exposing pages as they are extracted"""
+
+    def __init__(self, pdf_bytes: bytes, ready_pages: int = DEFAULT_READY_PAGES,
+                 max_workers: Optional[int] = None):
+        self.pdf_bytes = pdf_bytes
+        self.max_workers = max_workers
+        self.page_count = len(open_pdf(pdf_bytes).pages)
+        self.ready_pages = min(ready_pages, self.page_count)
+        self.pages = []    # extracted pages, in page order
+        self.error = None
+        self.done = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pdf-ingestion", daemon=True)
+
+    def start(self) -> "PdfIngestion":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        with tracer.span('pdf_parse', bytes=len(self.pdf_bytes)) as span:
+            self._extract()
+            span['pages'] = len(self.pages)
+
+    def _extract(self):
+        try:
+            batches = iter_page_batches(self.pdf_bytes, self.max_workers, batch_pages=INGEST_BATCH_PAGES)
+            for batch in batches:
+                if self._cancelled.is_set():
+                    batches.close()
+                    break
+                with self._lock:
+                    self.pages.extend(batch)
+                    if len(self.pages) >= self.ready_pages:
+                        self._ready.set()
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.done = True
+            self._ready.set()
+
+    def cancel(self):
+        """Stop extracting after the current batch"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True when cancel() stopped extraction before the last page"""
+        with self._lock:
+            return self._cancelled.is_set() and len(self.pages) < self.page_count
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the first ready_pages pages are extracted (or extraction ends)"""
+        return self._ready.wait(timeout)
+
+    def snapshot(self, start: int = 0) -> List[Dict[str, Any]]:
+        """Return a copy of the pages extracted so far, from index start onwards"""
+        with self._lock:
+            return self.pages[start:]
+
+    @property
+    def progress(self) -> float:
+        if not self.page_count:
+            return 1.0
+        with self._lock:
+            return len(self.pages) / self.page_count
@@ -0,0 +1,105 @@
+"""
+Background document processing jobs
+--> Runs document processing on a shared worker pool so uploads never block the Streamlit script
+--> Each job has an id, a status (queued, running, done, failed, cancelled) and its result once finished
+--> Ids the queue no longer knows (expired or already collected) report as expired rather than pending
+--> Queued jobs are cancelled outright; a running job finishes but its result is discarded
+--> Sessions keep only job ids and poll for status, so reruns never redo or wait for the work
+"""
+
+# import required libraries
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from pdf_extract import available_cpus
+
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+EXPIRED = 'expired'    # reported for ids the queue no longer tracks
+FINISHED = (DONE, FAILED, CANCELLED)
+FINISHED_JOB_TTL = 3600    # seconds an uncollected result is kept (its session may be gone)
+
+
+# Job Queue : Worker pool running jobs by id
+class JobQueue:
+    """Thread pool whose jobs are tracked by id; one shared instance serves every session"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or available_cpus() + 1    # parsing mostly waits on the PDF pool or I/O
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = {}    # job id -> {'id', 'name', 'status', 'result', 'error', 'submitted', 'started', 'finished'}
+
+    def submit(self, func: Callable[..., Any], *args: Any, name: str = "") -> str:
+        """Queue func(*args) and return its job id"""
+        job_id = f"job-{next(self._ids)}"
+        job = {'id': job_id, 'name': name, 'status': QUEUED, 'result': None, 'error': None,
+               'submitted': time.time(), 'started': None, 'finished': None, 'future': None}
+        with self._lock:
+            expired = [old['id'] for old in self.jobs.values()
+                       if old['status'] in FINISHED and old['finished'] < job['submitted'] - FINISHED_JOB_TTL]
+            for old_id in expired:
+                del self.jobs[old_id]
+            self.jobs[job_id] = job
+            job['future'] = self._pool.submit(self._run, job, func, args)
+        return job_id
+
+    def _run(self, job: Dict[str, Any], func: Callable[..., Any], args: Tuple[Any, ...]):
+        with self._lock:
+            if job['status'] != QUEUED:
+                return    # cancelled while waiting for a worker
+            job['status'], job['started'] = RUNNING, time.time()
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, str(e)
+        with self._lock:
+            if job['status'] == RUNNING:    # a cancelled job keeps its status and drops the result
+                job['status'] = DONE if error is None else FAILED
+                job['result'], job['error'] = result, error
+            job['finished'] = time.time()
+
+    def status(self, job_id: str) -> str:
+        """Job status; EXPIRED for an unknown (expired or already collected) job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job['status'] if job is not None else EXPIRED
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not finished; returns False when it already had"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] in FINISHED:
+                return False
+            job['status'], job['finished'] = CANCELLED, time.time()
+            job['future'].cancel()    # frees the queue slot when no worker picked it up yet
+            return True
+
+    def collect(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a finished job and return it (status, result, error); None while it is still pending
+
+        An unknown id (expired under FINISHED_JOB_TTL or already collected) comes back with status EXPIRED.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return {'id': job_id, 'name': "", 'status': EXPIRED, 'result': None, 'error': "Job expired"}
+            if job['status'] not in FINISHED:
+                return None
+            del self.jobs[job_id]
+            return {key: value for key, value in job.items() if key != 'future'}
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Queued and running jobs, oldest first"""
+        with self._lock:
+            return [{key: value for key, value in job.items() if key not in ('future', 'result')}
+                    for job in self.jobs.values() if job['status'] not in FINISHED]
+
+    def shutdown(self):
+        for job in self.pending():
+            self.cancel(job['id'])
+        self._pool.shutdown(wait=True)
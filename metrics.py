@@ -0,0 +1,197 @@
+"""
+Compiled single-pass financial metric extraction
+--> Combines every metric label into one precompiled alternation scanned once over the text
+--> Extensible metric dictionary (label regex per metric name)
+--> Handles parenthesised negatives and thousands/millions/billions scaling
+--> A scale statement holds for its own page or sheet section, never the whole document
+--> Records the position of every hit
+"""
+
+# import required libraries
+import re
+from bisect import bisect_right
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# Metric name -> label regex, matched against lowercased text. Order matters: more specific labels must come first
+# so "Operating Income" is not consumed as plain "Income".
+DEFAULT_METRICS = {
+    'net_income': r'net\s+(?:income|earnings|profit)',
+    'operating_income': r'operating\s+income',
+    'income_before_taxes': r'income\s+before\s+(?:income\s+)?taxes',
+    'gross_profit': r'gross\s+profit',
+    'ebitda': r'ebitda',
+    'cogs': r'(?:total\s+)?cost\s+of\s+(?:goods\s+sold|sales|revenue)|(?:total\s+)?cogs',
+    'operating_expenses': r'(?:total\s+)?operating\s+expenses',
+    'total_assets': r'total\s+assets',
+    'total_liabilities': r'total\s+liabilities',
+    'total_equity': r'total\s+(?:shareholders|stockholders)[\'’]?\s+equity',
+    'revenue': r'(?:total\s+)?revenues?',
+    'cash': r'cash\s*(?:and\s+(?:cash\s+)?equivalents)?',
+    'expenses': r'(?:total\s+)?expenses?',
+}
+
+# Letters each default label can start with; the scanner skips every other position
+DEFAULT_LABEL_STARTS = {
+    'net_income': 'n', 'operating_income': 'o', 'income_before_taxes': 'i', 'gross_profit': 'g', 'ebitda': 'e',
+    'cogs': 'ct', 'operating_expenses': 'ot', 'total_assets': 't', 'total_liabilities': 't', 'total_equity': 't',
+    'revenue': 'rt', 'cash': 'c', 'expenses': 'et',
+}
+
+# Amount following a label: optional colon/dollar sign, parentheses or minus for negatives,
+# and an optional inline unit such as "$2.5 million"
+VALUE_PATTERN = (
+    r'\s*:?\s*(?P<neg>\(|-(?=\$?\d))?\$?\s*(?P<value>\d+(?:,\d{3})*(?:\.\d+)?)\)?'
+    r'(?:\s*(?P<unit>thousands?|millions?|billions?|bn|mm|k)\b)?'
+)
+
+# Scale statements like "(in thousands)" or "Amounts in millions"; each holds for its own page or sheet section
+SCALE_PATTERN = re.compile(r'\bin\s+(thousands|millions|billions)\b', re.IGNORECASE)
+# Sheet headers written by summarize_workbook (excel_stream.py)
+SECTION_PATTERN = re.compile(r'^=== Sheet: .* ===$', re.MULTILINE)
+
+UNIT_SCALES = {
+    'k': 1e3, 'thousand': 1e3, 'thousands': 1e3,
+    'mm': 1e6, 'million': 1e6, 'millions': 1e6,
+    'bn': 1e9, 'billion': 1e9, 'billions': 1e9,
+}
+
+
+def scale_breaks(text: str) -> Tuple[List[int], List[float]]:
+    """Positions where the scale changes and the scale from there on
+
+    Each sheet section starts at the scale of its first statement (1.0 without one) and every later
+    statement applies from where it appears, so one sheet's "in thousands" never scales another's values.
+    """
+    starts = [0] + [match.start() for match in SECTION_PATTERN.finditer(text)]
+    positions, scales = [], []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        statements = list(SCALE_PATTERN.finditer(text, start, end))
+        positions.append(start)
+        scales.append(UNIT_SCALES[statements[0].group(1).lower()] if statements else 1.0)
+        for match in statements[1:]:
+            positions.append(match.start())
+            scales.append(UNIT_SCALES[match.group(1).lower()])
+    return positions, scales
+
+
+def merge_metrics(*found: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the metrics of consecutive texts (e.g. pages), as extract() reports them for one text"""
+    values = {}
+    for metrics in found:
+        for metric, value in metrics.items():
+            values.setdefault(metric, []).extend(value if isinstance(value, list) else [value])
+    return {metric: merged[0] if len(merged) == 1 else merged for metric, merged in values.items()}
+
+
+# Metric Extractor : One compiled regex for all metrics
+class MetricExtractor:
+    """Extracts financial metrics from text in a single regex pass"""
+
+    def __init__(self, metrics: Optional[Dict[str, str]] = None):
+        self.metrics = dict(DEFAULT_METRICS if metrics is None else metrics)
+        # metric name -> characters its label can start with (default labels keep their declared starts)
+        self.starts = {name: DEFAULT_LABEL_STARTS[name] for name, pattern in self.metrics.items()
+                       if name in DEFAULT_LABEL_STARTS and DEFAULT_METRICS[name] == pattern}
+        self._compile()
+
+    def _prefilter(self) -> str:
+        """Lookahead on the labels' start characters ('' unless every label declares them)"""
+        if any(name not in self.starts for name in self.metrics):
+            return ""
+        chars = sorted(set("".join(self.starts.values())))
+        return "(?=[" + "".join(re.escape(char) for char in chars) + "])"
+
+    def _compile(self):
+        labels = "|".join(f"(?:{pattern})" for pattern in self.metrics.values())
+        self._pattern = re.compile(rf"{self._prefilter()}\b(?P<label>{labels}){VALUE_PATTERN}")
+        self._pattern_ignorecase = re.compile(self._pattern.pattern, re.IGNORECASE)
+        self._label_patterns = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in self.metrics.items()]
+        self._label_cache = {}    # matched label text -> metric name
+
+    def _metric_for(self, label: str) -> str:
+        """Resolve matched label text to its metric, respecting dictionary order"""
+        metric = self._label_cache.get(label)
+        if metric is None:
+            metric = next(name for name, pattern in self._label_patterns if pattern.fullmatch(label))
+            self._label_cache[label] = metric
+        return metric
+
+    def register(self, name: str, pattern: str, first: bool = False, starts: Optional[str] = None):
+        """Add (or replace) a metric label; first=True gives it priority over existing labels
+
+        starts lists the (lowercase) characters the label can begin with; without it every position is tried.
+        """
+        self.metrics.pop(name, None)
+        self.starts.pop(name, None)
+        if starts:
+            self.starts[name] = starts.lower()
+        if first:
+            self.metrics = {name: pattern, **self.metrics}
+        else:
+            self.metrics[name] = pattern
+        self._compile()
+
+    def _prepare(self, text: str) -> Tuple[str, "re.Pattern"]:
+        """Lowercase once instead of matching case-insensitively
+
+        Positions stay valid unless lowercasing changes the text length (rare
+        non-ASCII characters), in which case the case-insensitive pattern is used.
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            return text, self._pattern_ignorecase
+        return lowered, self._pattern
+
+    def _value(self, neg: str, number: str, unit: str, scale: float) -> float:
+        value = float(number.replace(',', '')) * (UNIT_SCALES[unit.lower()] if unit else scale)
+        return -value if neg else value
+
+    def find(self, text: str, scale: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return every metric hit with its value and position in the text
+
+        Values take the scale stated in their own sheet section unless scale is given.
+        """
+        positions, scales = scale_breaks(text) if scale is None else ([0], [scale])
+        scanned, pattern = self._prepare(text)
+
+        hits = []
+        for match in pattern.finditer(scanned):
+            label, neg, number, unit = match.group('label', 'neg', 'value', 'unit')
+            hit_scale = scales[bisect_right(positions, match.start()) - 1]
+            hits.append({
+                'metric': self._metric_for(label),
+                'value': self._value(neg, number, unit, hit_scale),
+                'start': match.start(),
+                'end': match.end(),
+                'text': text[match.start():match.end()].strip(),
+            })
+        return hits
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """Return {metric: value} (a list when a metric appears more than once)"""
+        positions, scales = scale_breaks(text)
+        if len(set(scales)) > 1:
+            # Several scales in play: each hit needs its position
+            values = {}
+            for hit in self.find(text):
+                values.setdefault(hit['metric'], []).append(hit['value'])
+            return {metric: found[0] if len(found) == 1 else found for metric, found in values.items()}
+        scale = scales[0]
+        scanned, pattern = self._prepare(text)
+
+        # findall skips match objects entirely; positions are available through find()
+        values = {}
+        label_cache = self._label_cache
+        for label, neg, number, unit in pattern.findall(scanned):
+            metric = label_cache.get(label) or self._metric_for(label)
+            value = float(number.replace(',', '')) * (UNIT_SCALES[unit.lower()] if unit else scale)
+            values.setdefault(metric, []).append(-value if neg else value)
+        return {metric: found[0] if len(found) == 1 else found for metric, found in values.items()}
+
+    def extract_pages(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """extract() over page dicts, each page on its own so a scale statement covers only its page"""
+        return merge_metrics(*(self.extract(page['text']) for page in pages))
+
+
+default_extractor = MetricExtractor()
@@ -0,0 +1,262 @@
+"""
+Ollama client shared by the Streamlit app and the batch CLI
+--> Builds prompts (single question or stable conversation prefix) from document context
+--> Generates or streams answers through the pooled server session with timing stats
+--> Reports connection problems through a callback, so it runs with or without Streamlit
+--> Traces prompt build, queue wait, prompt eval and generation per request (see tracing.py)
+"""
+
+# import required libraries
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+import requests
+
+from context_budget import context_window
+from ollama_http import DEFAULT_BASE_URL, ServerBusy, get_server
+from retrieval import estimate_tokens
+from tracing import tracer
+
+
+KEEP_ALIVE = os.environ.get("FINDOC_KEEP_ALIVE", "30m")    # how long Ollama keeps a model loaded after a chat turn
+
+logger = logging.getLogger(__name__)
+
+
+# Ollama Client : Handles communication with Ollama API for LLM responses
+class OllamaClient:
+    """Client for interacting with Ollama API"""
+    
+    PROMPT_TEMPLATE_VERSION = 2    # bump when build_prompt changes so cached answers are invalidated
+    
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, on_error: Optional[Callable[[str], Any]] = None):
+        self.base_url = base_url
+        self.on_error = on_error or logger.warning    # st.error in the app
+        self.server = get_server(base_url)    # pooled session, request slots and model list shared by all sessions
+        self.available_models = []
+        self.last_stats = {}    # timing of the most recent response; 'error' is set when it failed, even part way
+        self.check_connection()    # Check if Ollama is running and fetch models
+    
+    def check_connection(self, refresh: bool = False):
+        """Check if Ollama is running and get available models (cached across sessions for a short TTL)"""
+        try:
+            self.available_models = self.server.list_models(refresh=refresh)
+            return True
+        except requests.exceptions.ConnectionError:
+            self.on_error(f"❌ Cannot connect to Ollama. Please ensure Ollama is running on {self.base_url}")
+            return False
+        except Exception as e:
+            self.on_error(f"❌ Error connecting to Ollama: {str(e)}")
+            return False
+    
+    @staticmethod
+    def build_prompt(prompt: str, context: str = "") -> str:
+        """Build full prompt with document context + user question"""
+        return f"""You are a financial document analysis assistant. Based on the following financial document content, answer the user's question accurately and concisely.
+
+Document Content:
+{context}
+
+User Question: {prompt}
+
+Please provide a clear, accurate answer based only on the information in the document. If the information is not available in the document, please state that clearly."""
+    
+    @staticmethod
+    def build_system_prompt(context: str = "") -> str:
+        """Stable conversation prefix: instructions, plus the document content when it fits"""
+        instructions = """You are a financial document analysis assistant. Answer the user's questions about their financial documents accurately and concisely.
+
+Base every answer only on the information in the documents. If the information is not available in the documents, please state that clearly."""
+        if not context:
+            return instructions + "\n\nRelevant document excerpts are provided with each question."
+        return f"""{instructions}
+
+Document Content:
+{context}"""
+    
+    def generate_response(self, model: str, prompt: str, context: str = "") -> str:
+        """Generate response using Ollama model"""
+        """Send user question + document content to Ollama and return response"""
+        self.last_stats = {}
+        try:
+            # Build full prompt with context + question
+            with tracer.span('prompt_build') as span:
+                full_prompt = self.build_prompt(prompt, context)
+                span['tokens'] = estimate_tokens(full_prompt)
+
+            # Request payload
+            payload = {
+                "model": model,
+                "prompt": full_prompt,
+                "stream": False,
+                "options": {"num_ctx": context_window(model)}    # the window the context was budgeted for
+            }
+            
+            # Call Ollama API (waits for a free slot when the server is at its concurrency limit)
+            start = time.perf_counter()
+            with self.server.slot() as queue_time:
+                response = self.server.session.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                    timeout=60
+                )
+            
+            if response.status_code == 200:
+                result = response.json()
+                self.last_stats = self.timing_stats(result, queue_time, None, time.perf_counter() - start, 0)
+                self.trace(self.last_stats)
+                return result.get('response', 'No response generated')
+            else:
+                return self._failed(f"Error: {response.status_code} - {response.text}")
+                
+        except requests.exceptions.Timeout:
+            return self._failed("Request timed out. Please try again.")
+        except ServerBusy as e:
+            return self._failed(f"Error: {str(e)}")
+        except Exception as e:
+            return self._failed(f"Error generating response: {str(e)}")
+    
+    def chat_response(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """Send a conversation to Ollama's chat endpoint and return the reply"""
+        self.last_stats = {}
+        try:
+            with tracer.span('prompt_build') as span:
+                span['tokens'] = sum(estimate_tokens(message['content']) for message in messages)
+            payload = {
+                "model": model,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": KEEP_ALIVE,    # keep the model (and its prompt cache) loaded between turns
+                "options": {"num_ctx": context_window(model)}
+            }
+            
+            start = time.perf_counter()
+            with self.server.slot() as queue_time:
+                response = self.server.session.post(f"{self.base_url}/api/chat", json=payload, timeout=60)
+            
+            if response.status_code == 200:
+                result = response.json()
+                self.last_stats = self.timing_stats(result, queue_time, None, time.perf_counter() - start, 0)
+                self.trace(self.last_stats)
+                return result.get('message', {}).get('content', 'No response generated')
+            else:
+                return self._failed(f"Error: {response.status_code} - {response.text}")
+                
+        except requests.exceptions.Timeout:
+            return self._failed("Request timed out. Please try again.")
+        except ServerBusy as e:
+            return self._failed(f"Error: {str(e)}")
+        except Exception as e:
+            return self._failed(f"Error generating response: {str(e)}")
+    
+    def stream_response(self, model: str, prompt: str, context: str = "") -> Iterator[str]:
+        """Yield response tokens from Ollama's NDJSON stream as they are generated"""
+        with tracer.span('prompt_build') as span:
+            full_prompt = self.build_prompt(prompt, context)
+            span['tokens'] = estimate_tokens(full_prompt)
+        payload = {
+            "model": model,
+            "prompt": full_prompt,
+            "stream": True,
+            "options": {"num_ctx": context_window(model)}
+        }
+        return self._stream("/api/generate", payload)
+    
+    def stream_chat(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield reply tokens for a conversation; an unchanged message prefix is served from Ollama's cache"""
+        with tracer.span('prompt_build') as span:
+            span['tokens'] = sum(estimate_tokens(message['content']) for message in messages)
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "options": {"num_ctx": context_window(model)}
+        }
+        return self._stream("/api/chat", payload)
+    
+    def _failed(self, message: str) -> str:
+        """Record message as the last response's error and return it in place of the answer"""
+        self.last_stats = {'error': message}
+        return message
+    
+    @staticmethod
+    def timing_stats(final_chunk: Dict[str, Any], queue_time: float, first_token_time: Optional[float],
+                     total_time: float, token_count: int) -> Dict[str, Any]:
+        """Timing of one response, preferring Ollama's own eval stats over wall-clock timing"""
+        eval_count = final_chunk.get('eval_count', token_count)
+        eval_seconds = final_chunk.get('eval_duration', 0) / 1e9
+        if not eval_seconds and first_token_time is not None:
+            eval_seconds = total_time - first_token_time
+        
+        return {
+            'queue_s': queue_time,
+            'first_token_s': first_token_time,
+            'total_s': total_time,
+            'tokens': eval_count,
+            'tokens_per_s': eval_count / eval_seconds if eval_seconds > 0 else 0.0,
+            'prompt_tokens': final_chunk.get('prompt_eval_count'),    # tokens Ollama had to evaluate (cached prefix excluded)
+            'prompt_eval_s': final_chunk.get('prompt_eval_duration', 0) / 1e9,
+            'eval_s': eval_seconds,
+        }
+    
+    @staticmethod
+    def trace(stats: Dict[str, Any]):
+        """Record a completed response's stages, using Ollama's own prompt-eval and generation timings"""
+        tracer.record('llm_queue', stats['queue_s'])
+        tracer.record('llm_prompt_eval', stats['prompt_eval_s'], tokens=stats['prompt_tokens'])
+        tracer.record('llm_generation', stats['eval_s'], tokens=stats['tokens'])
+        tracer.record('llm_request', stats['total_s'], prompt_tokens=stats['prompt_tokens'], eval_tokens=stats['tokens'])
+    
+    def _stream(self, path: str, payload: Dict[str, Any]) -> Iterator[str]:
+        """Yield tokens from an NDJSON streaming endpoint and record timing in last_stats"""
+        start = time.perf_counter()
+        first_token_time = None
+        token_count = 0
+        final_chunk = {}
+        queue_time = 0.0
+        error = None
+        
+        try:
+            # Each line of the response body is one JSON object holding the next token
+            with self.server.slot() as queue_time, \
+                    self.server.session.post(f"{self.base_url}{path}", json=payload,
+                                             stream=True, timeout=60) as response:
+                if response.status_code != 200:
+                    error = f"Error: {response.status_code} - {response.text}"
+                    yield error
+                    return
+                
+                for line in response.iter_lines(chunk_size=None):
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get('response') or chunk.get('message', {}).get('content', '')
+                    if token:
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter() - start
+                        token_count += 1
+                        yield token
+                    if chunk.get('done'):
+                        final_chunk = chunk    # read on to the end of the body so the connection is reused
+                        
+        except requests.exceptions.Timeout:
+            error = "Request timed out. Please try again."
+            yield error
+        except ServerBusy as e:
+            error = f"Error: {str(e)}"
+            yield error
+        except Exception as e:
+            error = f"Error generating response: {str(e)}"
+            yield error
+        finally:
+            self.last_stats = self.timing_stats(final_chunk, queue_time, first_token_time,
+                                                time.perf_counter() - start, token_count)
+            # Tokens may already be shown; the flag tells callers not to keep (cache, record) the partial answer
+            if error is not None or not final_chunk:
+                self.last_stats['error'] = error or "Response ended before the model finished"
+            if final_chunk:
+                self.trace(self.last_stats)
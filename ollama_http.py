@@ -0,0 +1,207 @@
+"""
+Shared HTTP plumbing for the Ollama API
+--> One pooled keep-alive session per server, shared by every Streamlit session
+--> Per-server concurrency limit: extra requests queue until a slot frees up
+--> Retries connection failures and 502/503/504 responses with exponential backoff
+--> Caches the installed model list with a refresh TTL
+--> Async client (httpx, optional) with the same limits for batch use; asyncio and httpx load only when it is created
+"""
+
+# import required libraries
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Any, AsyncIterator, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# Connection settings
+DEFAULT_BASE_URL = "http://localhost:11434"
+MAX_CONCURRENCY = int(os.environ.get("FINDOC_OLLAMA_CONCURRENCY", "4"))    # in-flight requests per server
+QUEUE_TIMEOUT = float(os.environ.get("FINDOC_OLLAMA_QUEUE_TIMEOUT", "120"))    # seconds to wait for a free slot
+MODELS_TTL = float(os.environ.get("FINDOC_OLLAMA_MODELS_TTL", "60"))    # seconds before the model list is refetched
+RETRIES = 3
+BACKOFF_FACTOR = 0.5    # sleeps 0.5s, 1s, 2s between attempts
+RETRY_STATUSES = (502, 503, 504)    # Ollama answers 503 when its own queue is full
+
+
+class ServerBusy(Exception):
+    """Raised when no request slot frees up within the queue timeout"""
+
+
+# Ollama Server : Pooled session, request slots and model list for one base URL
+class OllamaServer:
+    """Shared state for one Ollama server, used by every client pointing at it"""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = MAX_CONCURRENCY,
+                 queue_timeout: float = QUEUE_TIMEOUT, models_ttl: float = MODELS_TTL):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.models_ttl = models_ttl
+
+        # Never resend after a read error: the model may already be generating
+        retry = Retry(total=RETRIES, connect=RETRIES, read=0, status=RETRIES, backoff_factor=BACKOFF_FACTOR,
+                      status_forcelist=RETRY_STATUSES, allowed_methods=frozenset({"GET", "POST"}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency + 2, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+
+        self._models = None
+        self._models_at = 0.0
+        self._models_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[float]:
+        """Hold one request slot; yields the seconds spent queueing for it"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._slots.acquire(timeout=timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+        if not acquired:
+            raise ServerBusy(f"Ollama server is busy: no free slot after {timeout:.0f}s "
+                             f"({self.max_concurrency} requests in progress)")
+        try:
+            yield time.perf_counter() - start
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._slots.release()
+
+    def list_models(self, refresh: bool = False, timeout: float = 10) -> List[str]:
+        """Installed model names, fetched at most once per TTL across all sessions"""
+        # Holding the lock while fetching means concurrent callers reuse one request
+        with self._models_lock:
+            fresh = time.monotonic() - self._models_at < self.models_ttl
+            if self._models is None or refresh or not fresh:
+                response = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+                response.raise_for_status()
+                self._models = [model['name'] for model in response.json().get('models', [])]
+                self._models_at = time.monotonic()
+            return list(self._models)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'active': self.active, 'waiting': self.waiting, 'max_concurrency': self.max_concurrency}
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_server(base_url: str = DEFAULT_BASE_URL) -> OllamaServer:
+    """Return the process-wide OllamaServer for a base URL"""
+    key = base_url.rstrip("/")
+    with _servers_lock:
+        if key not in _servers:
+            _servers[key] = OllamaServer(key)
+        return _servers[key]
+
+
+# Async Ollama Client : asyncio variant for batch jobs and services
+class AsyncOllamaClient:
+    """Async Ollama client with keep-alive, a concurrency limit and retry with backoff
+
+    Takes the full prompt; callers build it (see OllamaClient.build_prompt).
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: float = 60, retries: int = RETRIES, backoff_factor: float = BACKOFF_FACTOR):
+        import asyncio
+        try:
+            import httpx    # optional: only AsyncOllamaClient needs it
+        except ImportError:
+            raise ImportError("AsyncOllamaClient requires httpx: pip install httpx") from None
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url, timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency + 2, max_keepalive_connections=max_concurrency),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "AsyncOllamaClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _backoff(self, attempt: int):
+        import asyncio
+        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def _request(self, method: str, path: str, **kwargs) -> "httpx.Response":
+        """Send a request, retrying connection errors and 502/503/504"""
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except self._httpx.ConnectError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            await self._backoff(attempt)
+
+    async def list_models(self) -> List[str]:
+        response = await self._request("GET", "/api/tags")
+        response.raise_for_status()
+        return [model['name'] for model in response.json().get('models', [])]
+
+    async def generate(self, model: str, prompt: str, **options: Any) -> Dict[str, Any]:
+        """Return Ollama's final /api/generate payload (response text plus timing fields)"""
+        payload = {"model": model, "prompt": prompt, "stream": False, **options}
+        async with self._slots:
+            response = await self._request("POST", "/api/generate", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def stream(self, model: str, prompt: str, **options: Any) -> AsyncIterator[str]:
+        """Yield response tokens as they are generated"""
+        payload = {"model": model, "prompt": prompt, "stream": True, **options}
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                try:
+                    async with self._client.stream("POST", "/api/generate", json=payload) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                            await self._backoff(attempt)
+                            continue
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if chunk.get('response'):
+                                yield chunk['response']
+                            if chunk.get('done'):
+                                return
+                        return
+                except self._httpx.ConnectError:
+                    if attempt == self.retries:
+                        raise
+                    await self._backoff(attempt)
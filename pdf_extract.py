@@ -0,0 +1,101 @@
+"""
+Page-level PDF text extraction
+--> Splits a PDF into page ranges and extracts them across a process pool
+--> Falls back to serial extraction for small files or if the pool fails
+--> Keeps the page number with each page's text so answers can cite pages
+--> Reconstructs tables on each page while its text is extracted
+"""
+
+# import required libraries
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects container/affinity limits where supported)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Extraction settings
+DEFAULT_MAX_WORKERS = int(os.environ.get("FINDOC_PDF_WORKERS", "0")) or available_cpus()
+MIN_PAGES_FOR_PARALLEL = 16    # below this, process start-up costs more than it saves
+RANGES_PER_WORKER = 2    # a few ranges per worker evens out slow pages
+
+
+def open_pdf(pdf_bytes: bytes):
+    """PyPDF2 reader over the PDF bytes; PyPDF2 is only imported once a PDF is read"""
+    import PyPDF2
+    return PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+
+def extract_page(page, number: int) -> Dict[str, Any]:
+    """Return {'page', 'text', 'tables', 'context'} for one page (context renders tables compactly)"""
+    from pdf_tables import extract_page_tables    # pandas: imported on first use
+    text, tables, context = extract_page_tables(page)
+    return {'page': number, 'text': text, 'tables': tables, 'context': context}
+
+
+def extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[Dict[str, Any]]:
+    """Extract pages start..end-1; runs inside pool workers"""
+    reader = open_pdf(pdf_bytes)
+    return [extract_page(reader.pages[number], number + 1) for number in range(start, end)]
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split page_count pages into at most `parts` contiguous (start, end) ranges"""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for idx in range(parts):
+        end = start + size + (1 if idx < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_page_batches(pdf_bytes: bytes, max_workers: Optional[int] = None,
+                      min_parallel_pages: int = MIN_PAGES_FOR_PARALLEL,
+                      batch_pages: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """Yield page dict batches in page order as each page range finishes"""
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    reader = open_pdf(pdf_bytes)
+    page_count = len(reader.pages)
+    next_page = 0    # index of the first page not yet yielded
+
+    if max_workers > 1 and page_count >= min_parallel_pages:
+        parts = math.ceil(page_count / batch_pages) if batch_pages else max_workers * RANGES_PER_WORKER
+        ranges = split_page_ranges(page_count, parts)
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(max_workers, len(ranges)))
+            futures = [pool.submit(extract_page_range, pdf_bytes, start, end) for start, end in ranges]
+            for future in futures:
+                batch = future.result()
+                next_page += len(batch)
+                yield batch
+        except Exception:
+            pass    # pool unavailable (e.g. restricted environment): finish on the serial path
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    # Serial path yields one page at a time from the reader opened above
+    for number in range(next_page, page_count):
+        yield [extract_page(reader.pages[number], number + 1)]
+
+
+def extract_pages(pdf_bytes: bytes, max_workers: Optional[int] = None,
+                  min_parallel_pages: int = MIN_PAGES_FOR_PARALLEL) -> List[Dict[str, Any]]:
+    """Return the page dict for every page, in page order"""
+    return [page for batch in iter_page_batches(pdf_bytes, max_workers, min_parallel_pages) for page in batch]
+
+
+def join_pages(pages: List[Dict[str, Any]]) -> str:
+    """Join page texts into a single document string"""
+    return "".join([page['text'] + "\n" for page in pages])
@@ -0,0 +1,223 @@
+"""
+Structured table extraction from PDF pages
+--> Collects positioned text fragments while PyPDF2 extracts page text
+--> Groups fragments into rows by baseline and into columns by x position
+--> Rebuilds financial tables as DataFrames (same shape as Excel sheets)
+--> Renders tables as compact CSV for the model instead of one-cell-per-line text
+"""
+
+# import required libraries
+import re
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+ROW_TOLERANCE = 2.0    # points; fragments closer than this vertically share a row
+MAX_ROW_GAP_FACTOR = 2.5    # a vertical gap this many times the typical row spacing ends a table
+MIN_TABLE_ROWS = 2    # data rows with two or more cells needed to call a region a table
+
+NUMBER_PATTERN = re.compile(r'^(?P<open>\()?\s*(?P<minus>-)?\s*\$?\s*(?P<digits>\d[\d,]*(?:\.\d+)?)\s*%?\s*\)?$')
+
+
+def parse_number(cell: str) -> Optional[float]:
+    """Parse '$1,250,000', '($35,000)' or '57.8%' into a float; None if not numeric"""
+    match = NUMBER_PATTERN.match(cell.strip())
+    if not match:
+        return None
+    value = float(match.group('digits').replace(',', ''))
+    return -value if match.group('open') or match.group('minus') else value
+
+
+def extract_text_and_fragments(page) -> Tuple[str, List[Tuple[float, float, str]]]:
+    """Extract page text and (x, y, text) fragments in a single PyPDF2 pass"""
+    fragments = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if not text.strip():
+            return
+        # Text position in page space: text matrix translated by the current transformation matrix
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        for line in text.splitlines():
+            if line.strip():
+                fragments.append((x, y, line.strip()))
+
+    text = page.extract_text(visitor_text=visitor) or ""
+    return text, fragments
+
+
+def group_rows(fragments: List[Tuple[float, float, str]]) -> List[Dict[str, Any]]:
+    """Group fragments sharing a baseline into rows, top of page first"""
+    rows = []
+    for x, y, text in sorted(fragments, key=lambda frag: (-frag[1], frag[0])):
+        if rows and abs(rows[-1]['y'] - y) <= ROW_TOLERANCE:
+            rows[-1]['cells'].append((x, text))
+        else:
+            rows.append({'y': y, 'cells': [(x, text)]})
+    for row in rows:
+        row['cells'].sort()
+    return rows
+
+
+def find_table_regions(rows: List[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """Return (start, end) row ranges that look like tables"""
+    if len(rows) < 2:
+        return []
+    gaps = [rows[idx]['y'] - rows[idx + 1]['y'] for idx in range(len(rows) - 1)]
+    typical_gap = float(np.median(gaps)) or 1.0
+
+    regions = []
+    start = None
+    last_multi = None    # last row in the current run with two or more cells
+    for idx, row in enumerate(rows):
+        broken = start is not None and rows[idx - 1]['y'] - row['y'] > MAX_ROW_GAP_FACTOR * typical_gap
+        if broken:
+            regions.append((start, last_multi + 1))
+            start = last_multi = None
+        if len(row['cells']) >= 2:
+            if start is None:
+                start = idx
+            last_multi = idx
+        # Single-cell rows (section headings) stay inside a run; trailing ones are trimmed
+    if start is not None:
+        regions.append((start, last_multi + 1))
+
+    tables = []
+    for start, end in regions:
+        multi_rows = [row for row in rows[start:end] if len(row['cells']) >= 2]
+        has_numbers = any(parse_number(text) is not None for row in multi_rows for _, text in row['cells'])
+        if len(multi_rows) >= MIN_TABLE_ROWS and has_numbers:
+            tables.append((start, end))
+    return tables
+
+
+def rows_to_dataframe(rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Align row cells to column anchors and build a DataFrame with numeric columns parsed"""
+    width = max(len(row['cells']) for row in rows)
+    widest = [row for row in rows if len(row['cells']) == width]
+    anchors = [float(np.mean([row['cells'][col][0] for row in widest])) for col in range(width)]
+
+    # Header: a leading row without numbers, unless column names were supplied (continuation)
+    header = None
+    if columns is None and all(parse_number(text) is None for _, text in rows[0]['cells']):
+        header, rows = rows[0], rows[1:]
+
+    def align(row) -> List[str]:
+        cells = [""] * width
+        for x, text in row['cells']:
+            col = min(range(width), key=lambda idx: abs(anchors[idx] - x))
+            cells[col] = f"{cells[col]} {text}".strip()
+        return cells
+
+    if columns is None:
+        columns = align(header) if header else [""] * width
+        columns = [name or ("Line Item" if idx == 0 else f"Column {idx + 1}") for idx, name in enumerate(columns)]
+
+    df = pd.DataFrame([align(row) for row in rows], columns=columns[:width] + [
+        f"Column {idx + 1}" for idx in range(len(columns), width)
+    ])
+    df = df.replace("", np.nan)
+
+    # Convert columns where every non-empty cell is a number
+    for col in df.columns:
+        values = df[col].dropna()
+        parsed = [parse_number(value) for value in values]
+        if len(parsed) and all(value is not None for value in parsed):
+            df[col] = df[col].map(lambda value: np.nan if pd.isna(value) else parse_number(value))
+    return df
+
+
+def extract_page_tables(page) -> Tuple[str, List[pd.DataFrame], str]:
+    """Return (plain text, tables, compact text) for one PDF page
+
+    The compact text keeps non-table lines and renders each table as CSV, which is
+    what gets indexed and sent to the model.
+    """
+    text, fragments = extract_text_and_fragments(page)
+    rows = group_rows(fragments)
+    regions = find_table_regions(rows)
+    if not regions:
+        return text, [], text
+
+    tables = []
+    lines = []
+    cursor = 0
+    for start, end in regions:
+        lines.extend(" ".join(cell for _, cell in row['cells']) for row in rows[cursor:start])
+        df = rows_to_dataframe(rows[start:end])
+        tables.append(df)
+        lines.append(render_compact(df))
+        cursor = end
+    lines.extend(" ".join(cell for _, cell in row['cells']) for row in rows[cursor:])
+    return text, tables, "\n".join(lines)
+
+
+def format_value(value: Any) -> str:
+    """Compact cell rendering: integers without decimals, blanks for missing values"""
+    if isinstance(value, float):
+        if np.isnan(value):
+            return ""
+        return str(int(value)) if value.is_integer() else f"{value:g}"
+    return str(value)
+
+
+def render_compact(df: pd.DataFrame, name: str = "") -> str:
+    """Render a table as trimmed CSV (no $ signs, thousands separators or padding)"""
+    lines = [f"Table: {name}"] if name else []
+    lines.append(",".join(str(col) for col in df.columns))
+    for row in df.itertuples(index=False):
+        lines.append(",".join(format_value(value) for value in row))
+    return "\n".join(lines)
+
+
+# Table Collector : Page tables merged across page breaks, fed a few pages at a time
+class TableCollector:
+    """Names page tables 'Page N Table M' and merges tables that continue onto the next page
+
+    Pages must arrive in order; the pages passed in are never modified.
+    """
+
+    def __init__(self):
+        self.tables = {}    # name -> DataFrame, merged so far
+        self.previous = None    # name of the last table seen, which the next page may continue
+        self.previous_page = None    # page that table last ran onto
+
+    def add(self, pages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        """Fold the next pages in; returns the pages with continuation headers renamed in their compact
+        text (copies of the renamed ones) and the names of the tables added or extended"""
+        renamed_pages = []
+        changed = set()
+        for page in pages:
+            for idx, df in enumerate(page.get('tables', [])):
+                previous = self.tables.get(self.previous)
+                # A headerless table at the top of a page with the same width continues the previous one,
+                # if that table ran to the end of the page before
+                continues = (
+                    idx == 0 and previous is not None and page['page'] == self.previous_page + 1
+                    and list(df.columns[1:]) == [f"Column {col + 1}" for col in range(1, df.shape[1])]
+                    and df.shape[1] == previous.shape[1]
+                )
+                if continues:
+                    # Give the continuation the real column names, in the page's compact text too
+                    if 'context' in page:
+                        page = {**page, 'context': page['context'].replace(
+                            ",".join(str(col) for col in df.columns), ",".join(str(col) for col in previous.columns), 1
+                        )}
+                    self.tables[self.previous] = pd.concat([previous, df.set_axis(previous.columns, axis=1)],
+                                                           ignore_index=True)
+                else:
+                    self.previous = f"Page {page['page']} Table {idx + 1}"
+                    self.tables[self.previous] = df
+                self.previous_page = page['page']
+                changed.add(self.previous)
+            renamed_pages.append(page)
+        return renamed_pages, changed
+
+
+def collect_tables(pages: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+    """Name page tables 'Page N Table M', merging tables that continue onto the next page"""
+    collector = TableCollector()
+    collector.add(pages)
+    return collector.tables
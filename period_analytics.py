@@ -0,0 +1,300 @@
+"""
+Period-aware analytics over financial tables
+--> Detects period columns ('Q1 2024', 'FY 2023', 'Mar 31, 2024') and line item rows when a document is processed
+--> Precomputes a cube per table with vectorized NumPy: values, period-over-period and year-over-year growth,
+    trailing four-quarter totals and margin / liquidity ratios
+--> Feeds exact figures to the chat context, the direct-answer router and the plotly charts, without
+    recomputing anything per question
+"""
+
+# import required libraries
+import re
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from metrics import DEFAULT_METRICS
+from query_engine import MAX_LABEL_WORDS, normalize
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+MIN_PERIODS = 2    # period columns a table needs to get a cube
+MAX_CONTEXT_ITEMS = 8    # line items described in the chat context per question
+
+MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+          'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12}
+QUARTER_PATTERN = re.compile(r"^q([1-4])\s*[-']?\s*((?:19|20)?\d{2})$|^((?:19|20)\d{2})\s*-?\s*q([1-4])$")
+YEAR_PATTERN = re.compile(r"^(?:fy\s*)?((?:19|20)\d{2})$")
+DATE_PATTERN = re.compile(r"^([a-z]{3})[a-z]*\.?\s+(?:\d{1,2},?\s+)?((?:19|20)\d{2})$|^((?:19|20)\d{2})-(\d{2})(?:-\d{2})?$")
+
+# Measures of each line item, in the order they are shown
+MEASURES = {
+    'value': "Value",
+    'change': "Period-over-period change %",
+    'yoy': "Year-over-year change %",
+    'ttm': "Trailing four quarters",
+}
+
+# Ratio name -> (numerator metric, denominator metric), as percentages or plain ratios
+RATIOS = {
+    'Gross margin %': ('gross_profit', 'revenue'),
+    'Operating margin %': ('operating_income', 'revenue'),
+    'Net margin %': ('net_income', 'revenue'),
+    'EBITDA margin %': ('ebitda', 'revenue'),
+    'Current ratio': ('current_assets', 'current_liabilities'),
+    'Debt to equity': ('total_liabilities', 'total_equity'),
+}
+RATIO_METRICS = {
+    **DEFAULT_METRICS,
+    'current_assets': r'total\s+current\s+assets',
+    'current_liabilities': r'total\s+current\s+liabilities',
+}
+RATE_WORDS = ('%', 'margin', 'growth', 'ratio', 'turnover', 'days', 'roa', 'roe', 'per share')    # not summed over time
+
+YOY_PATTERN = re.compile(r"\b(?:yoy|year[\s-]+over[\s-]+year|annual\s+growth|vs\.?\s+(?:the\s+)?(?:same\s+quarter|prior\s+year|last\s+year))\b")
+TTM_PATTERN = re.compile(r"\b(?:ttm|ltm|trailing|rolling|last\s+(?:twelve|12)\s+months|last\s+four\s+quarters)\b")
+ANALYTICS_PATTERN = re.compile(r"\b(?:growth|grow|grew|trends?|change[sd]?|increase[sd]?|decrease[sd]?|compare|margins?|"
+                               r"ratios?|performance|quarter|annual|yoy|qoq|ttm|trailing|rolling)\b")
+
+
+def parse_period(header: Any) -> Optional[Tuple[str, int, bool]]:
+    """(frequency 'Q' or 'Y', ordinal, point in time) of a period header; None for other columns
+
+    Quarters and quarter-end dates share one ordinal scale (year * 4 + quarter - 1), so a balance sheet
+    dated 'Dec 31, 2023', 'Mar 31, 2024' lines up with 'Q4 2023', 'Q1 2024'.
+    """
+    text = str(header).strip().lower()
+    match = QUARTER_PATTERN.match(text)
+    if match:
+        quarter, year = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        year = int(year) + (2000 if len(year) == 2 else 0)
+        return 'Q', year * 4 + int(quarter) - 1, False
+    match = YEAR_PATTERN.match(text)
+    if match:
+        return 'Y', int(match.group(1)), False
+    match = DATE_PATTERN.match(text)
+    if match:
+        month = MONTHS.get(match.group(1)) if match.group(1) else int(match.group(4))
+        year = int(match.group(2) or match.group(3))
+        if month and 1 <= month <= 12:
+            return 'Q', year * 4 + (month - 1) // 3, True
+    return None
+
+
+def percent_change(after: np.ndarray, before: np.ndarray) -> np.ndarray:
+    """(after - before) / |before| in percent; NaN where before is missing or zero"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (after - before) / np.abs(before) * 100
+    return np.where(np.isfinite(change), change, np.nan)
+
+
+def format_value(value: float, label: str) -> str:
+    if np.isnan(value):
+        return "n/a"
+    if any(word in label.lower() for word in RATE_WORDS):
+        return f"{value:,.2f}"
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+# Period Cube : Precomputed measures of one table's line items over its periods
+class PeriodCube:
+    """Line items x periods arrays of values, growth rates and trailing totals, plus per-period ratios"""
+
+    def __init__(self, table: str, labels: List[str], periods: List[str], ordinals: np.ndarray,
+                 frequency: str, values: np.ndarray, point_in_time: bool):
+        self.table = table
+        self.labels = labels
+        self.periods = periods    # column headers, oldest first
+        self.ordinals = ordinals
+        self.frequency = frequency
+        self.point_in_time = point_in_time    # balance sheet dates: levels, never summed over time
+        self.measures = {'value': values}
+        self.measures['change'] = percent_change(values, self.shift(values, 1))
+        if frequency == 'Q':
+            self.measures['yoy'] = percent_change(values, self.shift(values, 4))
+            if not point_in_time:
+                # Trailing four quarters; rates and ratios are not summed
+                trailing = sum(self.shift(values, lag) for lag in range(4))
+                summable = np.array([not any(word in label.lower() for word in RATE_WORDS) for label in labels])
+                self.measures['ttm'] = np.where(summable[:, None], trailing, np.nan)
+        else:
+            self.measures['yoy'] = self.measures['change']    # annual columns: each change is year over year
+        self.index = {}    # normalized label -> first row with that label
+        for row, label in enumerate(labels):
+            self.index.setdefault(normalize(label), row)
+        self.metric_rows = self._metric_rows()
+        self.ratios = self._ratios()
+
+    def available(self) -> Dict[str, str]:
+        """Measures with at least one value, with their labels"""
+        return {name: label for name, label in MEASURES.items()
+                if name in self.measures and not np.isnan(self.measures[name]).all()}
+
+    def shift(self, values: np.ndarray, lag: int) -> np.ndarray:
+        """Values of the period `lag` periods earlier, aligned to each column (NaN when not in the table)"""
+        target = self.ordinals - lag
+        position = np.clip(np.searchsorted(self.ordinals, target), 0, len(self.ordinals) - 1)
+        present = self.ordinals[position] == target
+        return np.where(present[None, :], values[:, position], np.nan)
+
+    def _metric_rows(self) -> Dict[str, int]:
+        """First row matching each RATIO_METRICS pattern, found once per cube"""
+        import pandas as pd
+        labels = pd.Series(self.labels, dtype=object).str.lower().str.strip()
+        rows = {}
+        for metric, pattern in RATIO_METRICS.items():
+            hits = np.flatnonzero(labels.str.fullmatch(pattern).to_numpy(dtype=bool))
+            if len(hits):
+                rows[metric] = int(hits[0])
+        return rows
+
+    def find(self, metric: str) -> Optional[int]:
+        """Row of the line item for a metric such as 'revenue' or 'net_income'"""
+        return self.metric_rows.get(metric)
+
+    def _ratios(self) -> Dict[str, np.ndarray]:
+        values = self.measures['value']
+        ratios = {}
+        for name, (numerator, denominator) in RATIOS.items():
+            top, bottom = self.find(numerator), self.find(denominator)
+            if top is None or bottom is None:
+                continue
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = values[top] / values[bottom] * (100 if name.endswith('%') else 1)
+            ratios[name] = np.where(np.isfinite(ratio), ratio, np.nan)
+        return ratios
+
+    def match(self, question: str) -> List[int]:
+        """Rows whose label is spelled out in the question, longest labels first"""
+        words = normalize(question).split()
+        rows = []
+        for size in range(min(MAX_LABEL_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                row = self.index.get(" ".join(words[start:start + size]))
+                if row is not None and row not in rows:
+                    rows.append(row)
+        return rows
+
+    def describe_row(self, row: int, measures: Tuple[str, ...] = tuple(MEASURES)) -> str:
+        """One line per item: each period's value with its growth and trailing total"""
+        label = self.labels[row]
+        parts = []
+        for col, period in enumerate(self.periods):
+            value = self.measures['value'][row, col]
+            if np.isnan(value):
+                continue
+            extras = []
+            if 'change' in measures and not np.isnan(self.measures['change'][row, col]):
+                extras.append(f"{'QoQ' if self.frequency == 'Q' else 'YoY'} {self.measures['change'][row, col]:+.1f}%")
+            if 'yoy' in measures and self.frequency == 'Q' and not np.isnan(self.measures['yoy'][row, col]):
+                extras.append(f"YoY {self.measures['yoy'][row, col]:+.1f}%")
+            if 'ttm' in measures and 'ttm' in self.measures and not np.isnan(self.measures['ttm'][row, col]):
+                extras.append(f"TTM {format_value(self.measures['ttm'][row, col], label)}")
+            parts.append(f"{period} {format_value(value, label)}" + (f" ({', '.join(extras)})" if extras else ""))
+        return f"{label}: " + " | ".join(parts)
+
+    def describe_ratios(self) -> List[str]:
+        return [f"{name}: " + " | ".join(f"{period} {value:.2f}" for period, value in zip(self.periods, ratio)
+                                         if not np.isnan(value))
+                for name, ratio in self.ratios.items()]
+
+    def frame(self, rows: List[int], measure: str = 'value') -> "pd.DataFrame":
+        """Long table (period, item, value) of some rows, for charts"""
+        import pandas as pd
+        values = self.measures[measure]
+        return pd.DataFrame([
+            {'period': period, 'item': self.labels[row], 'value': values[row, col]}
+            for row in rows for col, period in enumerate(self.periods)
+        ]).dropna(subset=['value'])
+
+    def ratio_frame(self) -> "pd.DataFrame":
+        import pandas as pd
+        return pd.DataFrame([
+            {'period': period, 'ratio': name, 'value': ratio[col]}
+            for name, ratio in self.ratios.items() for col, period in enumerate(self.periods)
+        ]).dropna(subset=['value'])
+
+
+def build_cube(name: str, df: "pd.DataFrame") -> Optional[PeriodCube]:
+    """Cube of a table whose columns are periods of one frequency; None for other tables"""
+    import pandas as pd
+    parsed = {col: parse_period(col) for col in df.columns}
+    periods = [(col, period) for col, period in parsed.items() if period is not None]
+    if not periods:
+        return None
+    # Keep the dominant frequency (e.g. quarters next to a full-year column)
+    frequency = max(('Q', 'Y'), key=lambda freq: sum(period[0] == freq for _, period in periods))
+    periods = sorted(((col, period) for col, period in periods if period[0] == frequency), key=lambda item: item[1][1])
+    ordinals = np.array([period[1] for _, period in periods])
+    if len(periods) < MIN_PERIODS or len(set(ordinals)) < len(ordinals):
+        return None    # monthly columns share quarters: not a quarterly table
+
+    label_cols = [col for col in df.columns if parsed[col] is None and not pd.api.types.is_numeric_dtype(df[col])]
+    if not label_cols:
+        return None
+    values = np.column_stack([pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                              for col, _ in periods])
+    labels = df[label_cols[0]].to_numpy(dtype=object)
+    keep = np.array([isinstance(label, str) and label.strip() != "" for label in labels]) & ~np.isnan(values).all(axis=1)
+    if not keep.any():
+        return None
+    return PeriodCube(name, [label.strip() for label in labels[keep]], [str(col) for col, _ in periods], ordinals,
+                      frequency, values[keep], all(period[2] for _, period in periods))
+
+
+def has_periods(columns: List[Any]) -> bool:
+    """Whether enough headers are periods for a table to get a cube"""
+    return sum(parse_period(col) is not None for col in columns) >= MIN_PERIODS
+
+
+def build_cubes(tables: Dict[str, "pd.DataFrame"]) -> Dict[str, PeriodCube]:
+    """Table name -> cube for every table organized by period
+
+    Workbooks are checked on the headers of their scan, and only sheets with period columns are loaded.
+    """
+    names = list(tables)
+    summaries = getattr(tables, 'summaries', None)
+    if summaries is not None:
+        names = [name for name in names if has_periods(summaries[name]['columns'])]
+        if names and hasattr(tables, 'load_all'):
+            tables.load_all(names)    # one parse for all of them
+    cubes = {}
+    for name in names:
+        cube = build_cube(name, tables[name])
+        if cube is not None:
+            cubes[name] = cube
+    return cubes
+
+
+def find_item(cubes: Dict[str, PeriodCube], question: str) -> Optional[Tuple[PeriodCube, int]]:
+    """The line item named in the question (longest label across tables)"""
+    best = None
+    for cube in cubes.values():
+        rows = cube.match(question)
+        if rows:
+            size = len(normalize(cube.labels[rows[0]]).split())
+            if best is None or size > best[0]:
+                best = (size, cube, rows[0])
+    return (best[1], best[2]) if best else None
+
+
+def analytics_context(cubes: Dict[str, PeriodCube], question: str, document: str = "",
+                      max_items: int = MAX_CONTEXT_ITEMS) -> str:
+    """Precomputed figures for the line items a question names (plus ratios for trend/margin questions)"""
+    lines = []
+    for cube in cubes.values():
+        rows = cube.match(question)
+        if not rows and not ANALYTICS_PATTERN.search(question.lower()):
+            continue
+        if not rows:
+            rows = [row for row in (cube.find('revenue'), cube.find('net_income')) if row is not None]
+        for row in rows[:max(0, max_items - len(lines))]:
+            lines.append(f"[{cube.table}] {cube.describe_row(row)}")
+        if ANALYTICS_PATTERN.search(question.lower()):
+            lines.extend(f"[{cube.table}] {ratio}" for ratio in cube.describe_ratios())
+    if not lines:
+        return ""
+    source = f" of {document}" if document else ""
+    return f"=== Period analytics computed from the tables{source} (exact) ===\n" + "\n".join(lines)
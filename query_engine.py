@@ -0,0 +1,351 @@
+"""
+Deterministic answers to simple numeric questions
+--> Recognizes metric / period questions ("What is the net income?", "Total revenue for Q3 2024")
+--> Looks values up in the extracted tables with pandas, including margins and growth
+--> Year-over-year and trailing-total questions read the precomputed period cubes (period_analytics.py)
+--> Falls back to the extracted financial metrics, then to the model for open-ended questions
+--> Logs every routing decision with its latency
+"""
+
+# import required libraries
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import DEFAULT_METRICS
+
+if TYPE_CHECKING:
+    from period_analytics import PeriodCube
+
+
+logger = logging.getLogger(__name__)
+
+MAX_LABEL_WORDS = 6    # longest line item label matched against the question
+MAX_INDEX_ROWS = 50_000    # larger sheets (ledgers, transaction lists) hold no statement line items to look up
+WORD_PATTERN = r"[a-z0-9]+(?:\.[0-9]+)?"
+
+# Questions asking for explanation or judgement always go to the model
+OPEN_ENDED_PATTERN = re.compile(
+    r"\b(?:why|how(?!\s+(?:much|many))|explain|analy[sz]e|analysis|summar(?:y|ize|ise)|describe|compare|"
+    r"trends?|should|recommend|insights?|risks?|impact|improve|concerns?|overview|performance|health|outlook)\b"
+)
+GROWTH_PATTERN = re.compile(r"\b(?:growth|grow|grew|increase[sd]?|decrease[sd]?|change[sd]?|rise|rose|fall|fell|declined?)\b")
+MARGIN_PATTERN = re.compile(r"\b(gross|operating|net|ebitda)\s+(?:profit\s+)?margin\b")
+MARGIN_NUMERATORS = {
+    'gross': 'gross_profit',
+    'operating': 'operating_income',
+    'net': 'net_income',
+    'ebitda': 'ebitda',
+}
+PERCENT_WORDS = ('%', 'margin', 'growth', 'roa', 'roe')
+PLAIN_WORDS = ('ratio', 'turnover', 'days', 'shares', 'to-equity')
+TOTAL_COLUMN_PATTERN = re.compile(r"\b(?:total|ytd)\b")
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+PERIOD_PATTERN = re.compile(
+    r"\b(?:q[1-4]|h[12]|fy|ytd|quarter|(?:19|20)\d{2}|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\b"
+)
+# One specific period named in a normalized question ("q4 2023", "2024 q3", "dec 31 2023", "2023", "march");
+# "may" counts only when a year follows, as it is mostly the verb
+MONTHS = (r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?"
+          r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?")
+NAMED_PERIOD_PATTERN = re.compile(
+    rf"\b(?:(?:q[1-4]|h[12]|{MONTHS})(?: \d{{1,2}})?(?: (?:19|20)\d{{2}})?"
+    r"|may(?: \d{1,2})? (?:19|20)\d{2}"
+    r"|(?:19|20)\d{2}(?: (?:q[1-4]|h[12]))?)\b"
+)
+
+
+def normalize(text: str) -> str:
+    """Lowercase words only: 'Property, Plant & Equipment' -> 'property plant and equipment'"""
+    text = text.lower().replace('&', ' and ')
+    return " ".join(re.findall(WORD_PATTERN, text))
+
+
+def format_amount(value: float, label: str) -> str:
+    """Render a value the way its line item is reported (percent, plain ratio or currency)"""
+    lowered = label.lower()
+    if any(word in lowered for word in PERCENT_WORDS):
+        return f"{value:,.2f}%"
+    if any(word in lowered for word in PLAIN_WORDS):
+        return f"{value:,.2f}"
+    sign = "-" if value < 0 else ""
+    amount = abs(value)
+    return f"{sign}${amount:,.0f}" if float(amount).is_integer() else f"{sign}${amount:,.2f}"
+
+
+# Query Router : Answers metric questions from DataFrames before asking the model
+class QueryRouter:
+    """Routes a question to a pandas lookup, the extracted metrics or the model"""
+
+    def __init__(self, tables: Optional[Dict[str, pd.DataFrame]] = None,
+                 metrics: Optional[Dict[str, Any]] = None,
+                 cubes: Optional[Dict[str, "PeriodCube"]] = None):
+        self.tables = tables if tables is not None else {}
+        self.metrics = metrics if metrics is not None else {}
+        self.cubes = cubes if cubes is not None else {}    # table name -> precomputed period measures
+        self._items = None    # normalized line item label -> [(table, label, row position)]
+        self._value_columns = {}    # table name -> its numeric (period) columns
+        self._rows = {}    # (table name, row position) -> values, for the rows questions have matched
+        self._metric_patterns = {name: re.compile(pattern) for name, pattern in DEFAULT_METRICS.items()}
+
+    @property
+    def items(self) -> Dict[str, List[Tuple[str, str, int]]]:
+        """Index of line item labels across all tables, built on first use"""
+        if self._items is None:
+            self._items = {}
+            for name in self.tables:
+                self._index_table(name)
+        return self._items
+
+    def _sheet(self, name: str) -> pd.DataFrame:
+        """A table's DataFrame; an unopened workbook sheet is read without being kept"""
+        read_sheet = getattr(self.tables, 'read_sheet', None)
+        return read_sheet(name) if read_sheet else self.tables[name]
+
+    def _index_table(self, name: str):
+        # Line items run down the first text column; periods are the numeric columns.
+        # Stored tables are indexed from their schema and label column alone, so no sheet is materialized.
+        tables = self.tables
+        if (tables.shape(name)[0] if hasattr(tables, 'shape') else len(tables[name])) > MAX_INDEX_ROWS:
+            return
+        frame = None if hasattr(tables, 'dtypes') else self._sheet(name)
+        dtypes = tables.dtypes(name) if frame is None else frame.dtypes
+        value_cols = [col for col, dtype in dtypes.items() if pd.api.types.is_numeric_dtype(dtype)]
+        label_cols = [col for col in dtypes.index if col not in value_cols]
+        if not label_cols or not value_cols:
+            return
+        labels = (tables.columns(name, label_cols[:1]) if frame is None else frame)[label_cols[0]]
+        if not (pd.api.types.is_object_dtype(labels) or pd.api.types.is_string_dtype(labels)):
+            return
+        labels = labels.str.strip()    # NaN for cells that are not text
+        keys = labels.str.lower().str.replace('&', ' and ', regex=False).str.findall(WORD_PATTERN).str.join(" ")
+        text = labels.notna().to_numpy()
+        self._value_columns[name] = value_cols
+        for position, label, key in zip(np.flatnonzero(text), labels[text], keys[text]):
+            self._items.setdefault(key, []).append((name, label, int(position)))
+
+    def _item(self, entry: Tuple[str, str, int]) -> Optional[Tuple[str, str, pd.Series]]:
+        """(table, label, values by period) for an index entry; None for section headings without values"""
+        name, label, position = entry
+        key = (name, position)
+        if key not in self._rows:
+            value_cols = self._value_columns[name]
+            if hasattr(self.tables, 'page'):
+                frame = self.tables.page(name, position, 1)    # stored tables: converts this row only
+            else:
+                frame = self._sheet(name).iloc[position:position + 1]
+            row = frame[value_cols].iloc[0]
+            row.index = [str(col) for col in value_cols]
+            self._rows[key] = None if row.isna().all() else row
+        row = self._rows[key]
+        return (name, label, row) if row is not None else None
+
+    def _find_item(self, question: str, metric: Optional[str] = None,
+                   exclude: Optional["re.Pattern"] = None) -> Optional[Tuple[str, str, pd.Series]]:
+        """Find the line item named in the question (or the row for a given metric)"""
+        items = self.items
+        if metric is None:
+            # Longest label spelled out in the question wins
+            words = normalize(question).split()
+            for size in range(min(MAX_LABEL_WORDS, len(words)), 0, -1):
+                for start in range(len(words) - size + 1):
+                    key = " ".join(words[start:start + size])
+                    for entry in items.get(key, []):
+                        item = self._item(entry) if exclude is None or not exclude.search(key) else None
+                        if item is not None:
+                            return item
+            # Otherwise resolve synonyms ("net profit", "COGS") through the metric dictionary
+            metric = self._metric_from_question(question)
+            if metric is None:
+                return None
+
+        pattern = self._metric_patterns.get(metric)
+        if pattern is None:
+            return None
+        for candidates in items.values():
+            for entry in candidates:
+                item = self._item(entry) if pattern.fullmatch(entry[1].lower()) else None
+                if item is not None:
+                    return item
+        return None
+
+    def _metric_from_question(self, question: str) -> Optional[str]:
+        lowered = question.lower()
+        return next((name for name, pattern in self._metric_patterns.items() if pattern.search(lowered)), None)
+
+    @staticmethod
+    def _periods(question: str, columns: List[str]) -> Tuple[List[str], List[str]]:
+        """Columns named in the question, in the order they are mentioned, and the named periods no column covers
+
+        When the question gives years, a column for another year is never a match ("Q2 2023" is not "Q2 2024").
+        """
+        text = f" {normalize(question)} "
+        years = set(YEAR_PATTERN.findall(text))
+        named = list(NAMED_PERIOD_PATTERN.finditer(text))
+        found, spans = [], []
+        for col in columns:
+            header = normalize(col)
+            if years and not years.issuperset(YEAR_PATTERN.findall(header)):
+                continue
+            keys = [header, YEAR_PATTERN.sub("", header).strip()]
+            words = header.split()
+            if words and not YEAR_PATTERN.fullmatch(words[0]):
+                keys.append(words[0])
+            positions = [(text.find(f" {key} ") + 1, key) for key in keys if key]
+            positions = [(pos, pos + len(key)) for pos, key in positions if pos > 0]
+            if positions:
+                found.append((min(positions)[0], col))
+                spans.extend(positions)
+        if not found and named and all(YEAR_PATTERN.fullmatch(match.group()) for match in named):
+            # Only years named ("net income in 2024"): every column of those years
+            periods = [col for col in columns if years.intersection(YEAR_PATTERN.findall(normalize(col)))]
+            covered = {year for col in periods for year in YEAR_PATTERN.findall(normalize(col))}
+            return periods, [match.group() for match in named if match.group() not in covered]
+        missing = [match.group() for match in named
+                   if not any(start < match.end() and match.start() < end for start, end in spans)]
+        return [col for _, col in sorted(found, key=lambda hit: hit[0])], missing
+
+    def _lookup(self, question: str, item: Tuple[str, str, pd.Series]) -> Optional[str]:
+        table, label, row = item
+        row = row.dropna()
+        periods, missing = self._periods(question, list(row.index))
+        if missing:
+            return None    # a period asked about is not in the table
+        if len(periods) == 1:
+            return f"**{label}** for {periods[0]}: {format_amount(row[periods[0]], label)} ({table})"
+        shown = periods or list(row.index)
+        lines = [f"- {col}: {format_amount(row[col], label)}" for col in shown]
+        return f"**{label}** ({table}):\n" + "\n".join(lines)
+
+    def _margin(self, question: str, kind: str) -> Optional[str]:
+        numerator = self._find_item(question, metric=MARGIN_NUMERATORS[kind])
+        revenue = self._find_item(question, metric='revenue')
+        if numerator is None or revenue is None:
+            return None
+        ratio = (numerator[2] / revenue[2].replace(0, np.nan) * 100).dropna()
+        if ratio.empty:
+            return None
+        periods, missing = self._periods(question, list(ratio.index))
+        if missing:
+            return None
+        periods = periods or list(ratio.index)
+        lines = [f"- {col}: {ratio[col]:,.2f}%" for col in periods]
+        source = numerator[0] if numerator[0] == revenue[0] else f"{numerator[0]}, {revenue[0]}"
+        return (f"**{kind.title()} margin** ({numerator[1]} ÷ {revenue[1]}, {source}):\n"
+                + "\n".join(lines))
+
+    def _growth(self, question: str, item: Tuple[str, str, pd.Series]) -> Optional[str]:
+        table, label, row = item
+        row = row.dropna()
+        periods, missing = self._periods(question, list(row.index))
+        if missing:
+            return None
+        if len(periods) >= 2:
+            start, end = periods[0], periods[-1]
+            if row[start] == 0:
+                return None
+            change = (row[end] - row[start]) / abs(row[start]) * 100
+            verb = "grew" if change >= 0 else "fell"
+            return (f"**{label}** {verb} {abs(change):,.2f}% from {start} ({format_amount(row[start], label)}) "
+                    f"to {end} ({format_amount(row[end], label)}) ({table})")
+
+        # No explicit pair: period-over-period across the period columns (totals excluded)
+        columns = [col for col in row.index if not TOTAL_COLUMN_PATTERN.search(col.lower())]
+        lines = []
+        for before, after in zip(columns, columns[1:]):
+            if row[before] != 0:
+                change = (row[after] - row[before]) / abs(row[before]) * 100
+                lines.append(f"- {before} → {after}: {change:+,.2f}%")
+        if not lines:
+            return None
+        return f"**{label}** growth ({table}):\n" + "\n".join(lines)
+
+    def _from_cube(self, question: str, measure: str) -> Optional[str]:
+        """Year-over-year change or trailing four-quarter total of the line item named in the question"""
+        from period_analytics import find_item
+        found = find_item(self.cubes, question)
+        metric = self._metric_from_question(question) if found is None else None
+        if metric is not None:
+            # No label spelled out: the row for the metric the question names (e.g. "Total Revenue")
+            found = next(((cube, cube.find(metric)) for cube in self.cubes.values() if cube.find(metric) is not None), None)
+        if found is None or measure not in found[0].measures:
+            return None
+        cube, row = found
+        label = cube.labels[row]
+        values = cube.measures[measure][row]
+        periods, missing = self._periods(question, cube.periods)
+        if missing:
+            return None
+        shown = [(period, values[cube.periods.index(period)]) for period in periods or cube.periods]
+        shown = [(period, value) for period, value in shown if not np.isnan(value)]
+        if not shown:
+            return None
+        if measure == 'yoy':
+            lines = [f"- {period}: {value:+,.2f}% year over year" for period, value in shown]
+        else:
+            lines = [f"- Four quarters to {period}: {format_amount(value, label)}" for period, value in shown]
+        return f"**{label}** ({cube.table}):\n" + "\n".join(lines)
+
+    def _from_metrics(self, question: str) -> Optional[str]:
+        """Answer from the regex-extracted metrics when no table has the value"""
+        if PERIOD_PATTERN.search(question.lower()):
+            return None    # extracted metrics carry no period
+        metric = self._metric_from_question(question)
+        value = self.metrics.get(metric) if metric else None
+        if value is None or isinstance(value, list):
+            return None    # several candidate values: let the model disambiguate
+        label = metric.replace('_', ' ').title()
+        return f"**{label}**: {format_amount(value, label)} (extracted from the document text)"
+
+    def answer(self, question: str) -> Tuple[str, Optional[str]]:
+        """Return (route, answer); route is 'table', 'metrics' or 'llm' (answer None)"""
+        lowered = question.lower()
+        if OPEN_ENDED_PATTERN.search(lowered):
+            return 'llm', None
+
+        if self.cubes:
+            from period_analytics import TTM_PATTERN, YOY_PATTERN
+            measure = 'yoy' if YOY_PATTERN.search(lowered) else 'ttm' if TTM_PATTERN.search(lowered) else None
+            if measure is not None:
+                answer = self._from_cube(question, measure)
+                return ('table', answer) if answer else ('llm', None)
+
+        if GROWTH_PATTERN.search(lowered):
+            item = self._find_item(question, exclude=GROWTH_PATTERN)
+            answer = self._growth(question, item) if item else None
+            return ('table', answer) if answer else ('llm', None)
+
+        margin = MARGIN_PATTERN.search(lowered)
+        if margin:
+            # A reported margin row beats recomputing it
+            item = self._find_item(question)
+            if item and 'margin' in item[1].lower():
+                answer = self._lookup(question, item)
+            else:
+                answer = self._margin(question, margin.group(1))
+            return ('table', answer) if answer else ('llm', None)
+
+        item = self._find_item(question)
+        if item:
+            answer = self._lookup(question, item)
+            return ('table', answer) if answer else ('llm', None)
+        answer = self._from_metrics(question)
+        if answer:
+            return 'metrics', answer
+        return 'llm', None
+
+    def route(self, question: str) -> Dict[str, Any]:
+        """Route a question and log the decision with its latency"""
+        started = time.perf_counter()
+        try:
+            route, answer = self.answer(question)
+        except Exception:
+            logger.exception("query routing failed; falling back to the model")
+            route, answer = 'llm', None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info("route=%s latency_ms=%.2f question=%r", route, elapsed_ms, question)
+        return {'route': route, 'answer': answer, 'elapsed_ms': elapsed_ms}
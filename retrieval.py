@@ -0,0 +1,323 @@
+"""
+Chunked retrieval index for financial documents
+--> Splits extracted document text into overlapping chunks
+--> Indexes chunks with BM25 for keyword relevance scoring
+--> Builds a question-specific context that fits within a token budget
+--> Merges ranked chunks across several documents' indexes
+--> Chunks tables by row groups that each repeat the table's header
+--> Fuses BM25 with semantic (embedding) rankings by reciprocal rank when a vector index is available
+"""
+
+# import required libraries
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# Retrieval defaults (overridable from the sidebar)
+DEFAULT_CHUNK_TOKENS = 300
+DEFAULT_CHUNK_OVERLAP = 40
+DEFAULT_TOP_K = 6
+DEFAULT_TOKEN_BUDGET = 2000
+RRF_K = 60    # reciprocal rank fusion constant: damps the weight of the very first ranks
+
+# Words that carry no signal for ranking financial chunks
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'did', 'do', 'does', 'for', 'from',
+    'how', 'in', 'is', 'it', 'its', 'much', 'of', 'on', 'or', 'our', 'show', 'tell', 'that',
+    'the', 'this', 'to', 'was', 'we', 'were', 'what', 'which', 'with', 'me',
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English/numeric text)"""
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stopwords"""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+               overlap_tokens: int = DEFAULT_CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """Split text into line-aligned chunks of roughly chunk_tokens with a small overlap"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    chunks = []
+    current = []    # lines in the chunk being built
+    current_tokens = 0
+    overlap = 0    # leading lines repeated from the previous chunk
+
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > chunk_tokens:
+            chunks.append({'id': len(chunks), 'text': "\n".join(current), 'overlap': overlap})
+
+            # Carry trailing lines over so rows split across chunks keep their context
+            carried = []
+            carried_tokens = 0
+            for prev in reversed(current):
+                prev_tokens = estimate_tokens(prev)
+                if carried_tokens + prev_tokens > overlap_tokens:
+                    break
+                carried.insert(0, prev)
+                carried_tokens += prev_tokens
+            current, current_tokens, overlap = carried, carried_tokens, len(carried)
+
+        current.append(line)
+        current_tokens += line_tokens
+
+    if current:
+        chunks.append({'id': len(chunks), 'text': "\n".join(current), 'overlap': overlap})
+
+    return chunks
+
+
+def chunk_pages(pages: List[Dict[str, Any]], chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                overlap_tokens: int = DEFAULT_CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+    """Chunk each page separately so every chunk records the page it came from"""
+    chunks = []
+    for page in pages:
+        # Prefer the compact rendering (tables as CSV) when the page has one
+        for chunk in chunk_text(page.get('context', page['text']), chunk_tokens, overlap_tokens):
+            chunk.update(id=len(chunks), page=page['page'])
+            chunks.append(chunk)
+    return chunks
+
+
+def chunk_tables(tables: Dict[str, List[str]], chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[Dict[str, Any]]:
+    """Chunk compact tables ({name: [header, *rows]}) into row groups that each repeat the header
+
+    The repeated 'Sheet:' and header lines count as overlap, so full_text() shows them once per table.
+    """
+    chunks = []
+    for name, lines in tables.items():
+        if len(lines) < 2:
+            continue    # header only
+        heading = [f"Sheet: {name}", lines[0]]
+        heading_tokens = estimate_tokens("\n".join(heading))
+        current, current_tokens = [], heading_tokens
+        for line in lines[1:]:
+            line_tokens = estimate_tokens(line)
+            if current and current_tokens + line_tokens > chunk_tokens:
+                chunks.append({'id': len(chunks), 'text': "\n".join(heading + current),
+                               'overlap': 2 if chunks and chunks[-1]['sheet'] == name else 0, 'sheet': name})
+                current, current_tokens = [], heading_tokens
+            current.append(line)
+            current_tokens += line_tokens
+        chunks.append({'id': len(chunks), 'text': "\n".join(heading + current),
+                       'overlap': 2 if chunks and chunks[-1]['sheet'] == name else 0, 'sheet': name})
+    return chunks
+
+
+def fuse_rankings(*rankings: List[int]) -> List[Tuple[float, int]]:
+    """Reciprocal rank fusion of best-first lists of chunk ids; returns (score, id), best first"""
+    scores = Counter()
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking):
+            scores[idx] += 1 / (RRF_K + rank + 1)
+    return sorted(((score, idx) for idx, score in scores.items()), key=lambda item: item[0], reverse=True)
+
+
+# Chunk Index : BM25 ranking over document chunks
+class ChunkIndex:
+    """BM25 keyword index over document chunks"""
+
+    def __init__(self, chunks: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.chunks = []
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = []
+        self.lengths = []
+        self.doc_freq = Counter()
+        self.avg_length = 0.0
+        self.total_tokens = 0
+        self.extend(chunks)
+
+    def extend(self, chunks: List[Dict[str, Any]]):
+        """Add chunks to the index, e.g. as pages arrive during incremental ingestion"""
+        for chunk in chunks:
+            chunk['id'] = len(self.chunks)
+            tf = Counter(tokenize(chunk['text']))
+            self.chunks.append(chunk)
+            self.term_freqs.append(tf)
+            self.lengths.append(sum(tf.values()))
+            self.doc_freq.update(tf.keys())
+            self.total_tokens += estimate_tokens(self.own_text(chunk))
+
+        # Inverse document frequencies are computed per query, so adding pages costs only the new chunks
+        self.avg_length = (sum(self.lengths) / len(self.chunks)) if self.chunks else 0.0
+
+    def add_pages(self, pages: List[Dict[str, Any]], chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                  overlap_tokens: int = DEFAULT_CHUNK_OVERLAP):
+        """Chunk and index newly extracted pages"""
+        self.extend(chunk_pages(pages, chunk_tokens, overlap_tokens))
+
+    @classmethod
+    def from_text(cls, text: str, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                  overlap_tokens: int = DEFAULT_CHUNK_OVERLAP) -> "ChunkIndex":
+        """Chunk raw document text and build an index over it"""
+        return cls(chunk_text(text, chunk_tokens, overlap_tokens))
+
+    @classmethod
+    def from_tables(cls, tables: Dict[str, List[str]], chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> "ChunkIndex":
+        """Build an index over compact tables, one row group per chunk"""
+        return cls(chunk_tables(tables, chunk_tokens))
+
+    @classmethod
+    def from_pages(cls, pages: List[Dict[str, Any]], chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                   overlap_tokens: int = DEFAULT_CHUNK_OVERLAP) -> "ChunkIndex":
+        """Build an index over per-page text, keeping page numbers for citations"""
+        return cls(chunk_pages(pages, chunk_tokens, overlap_tokens))
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K,
+               semantic: Optional[List[Tuple[float, int]]] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return the top_k (score, chunk) pairs for a query, best first
+
+        semantic: (similarity, chunk id) nearest neighbours of the query; fused with the BM25 ranking when given.
+        """
+        n = len(self.chunks)
+        idf = {term: math.log(1 + (n - self.doc_freq[term] + 0.5) / (self.doc_freq[term] + 0.5))
+               for term in set(tokenize(query)) if term in self.doc_freq}
+        terms = list(idf)
+        if not terms and not semantic:
+            return []
+
+        scores = []
+        for idx, tf in enumerate(self.term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / (self.avg_length or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term, 0)
+                if freq:
+                    score += idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((score, idx))
+
+        scores.sort(key=lambda item: item[0], reverse=True)
+        if semantic:
+            neighbours = [idx for _, idx in semantic if idx < len(self.chunks)]
+            scores = fuse_rankings([idx for _, idx in scores], neighbours)
+        return [(score, self.chunks[idx]) for score, idx in scores[:top_k]]
+
+    def build_context(self, query: str, top_k: int = DEFAULT_TOP_K, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                      semantic: Optional[List[Tuple[float, int]]] = None) -> str:
+        """Return the most relevant chunks for a query, kept within token_budget"""
+        # Small documents fit entirely, so send them unchanged
+        if self.total_tokens <= token_budget:
+            return self.full_text()
+
+        selected = []
+        used_tokens = 0
+        for _, chunk in self.search(query, top_k, semantic):
+            chunk_tokens = estimate_tokens(chunk['text'])
+            if used_tokens + chunk_tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used_tokens += chunk_tokens
+
+        # Fall back to the start of the document when nothing matches the question
+        if not selected:
+            for chunk in self.chunks:
+                chunk_tokens = estimate_tokens(chunk['text'])
+                if used_tokens + chunk_tokens > token_budget:
+                    break
+                selected.append(chunk)
+                used_tokens += chunk_tokens
+
+        # Keep document order so tables read naturally
+        selected.sort(key=lambda chunk: chunk['id'])
+        return "\n...\n".join(self.format_chunk(chunk) for chunk in selected)
+
+    @staticmethod
+    def own_text(chunk: Dict[str, Any]) -> str:
+        """Chunk text without the lines repeated from the previous chunk"""
+        if not chunk.get('overlap'):
+            return chunk['text']
+        return "\n".join(chunk['text'].split("\n")[chunk['overlap']:])
+
+    def full_text(self) -> str:
+        """Reassemble the whole document from its chunks, labelling page starts"""
+        parts = []
+        last_page = None
+        for chunk in self.chunks:
+            if chunk.get('page') and chunk['page'] != last_page:
+                parts.append(f"[Page {chunk['page']}]")
+                last_page = chunk['page']
+            text = self.own_text(chunk)
+            if text:
+                parts.append(text)
+        return "\n".join(parts)
+
+    @staticmethod
+    def format_chunk(chunk: Dict[str, Any]) -> str:
+        """Prefix the chunk with its page number when known so the model can cite it"""
+        if chunk.get('page'):
+            return f"[Page {chunk['page']}]\n{chunk['text']}"
+        return chunk['text']
+
+
+def build_multi_context(indexes: Dict[str, "ChunkIndex"], query: str, top_k: int = DEFAULT_TOP_K,
+                        token_budget: int = DEFAULT_TOKEN_BUDGET,
+                        semantic: Optional[Dict[str, List[Tuple[float, int]]]] = None) -> str:
+    """Build one context from several documents' indexes, labelled by document name
+
+    Chunks from all documents are ranked together by BM25 score, but each document with a
+    match keeps its best chunk so comparisons see every document. When any document has
+    semantic neighbours (by document name), every document is ranked by reciprocal rank
+    instead, so fused and keyword-only documents share one scale.
+    """
+    semantic = semantic or {}
+    if len(indexes) == 1:
+        name, index = next(iter(indexes.items()))
+        return index.build_context(query, top_k, token_budget, semantic.get(name))
+
+    # Small workspaces fit entirely
+    if sum(index.total_tokens for index in indexes.values()) <= token_budget:
+        return "\n\n".join(f"=== Document: {name} ===\n{index.full_text()}" for name, index in indexes.items())
+
+    fused = any(semantic.get(name) for name in indexes)
+    ranked = []
+    best = []
+    for name, index in indexes.items():
+        hits = index.search(query, top_k, semantic.get(name))
+        if fused and not semantic.get(name):
+            hits = [(1 / (RRF_K + rank + 1), chunk) for rank, (_, chunk) in enumerate(hits)]    # BM25 rank alone
+        if hits:
+            best.append((hits[0][0], name, hits[0][1]))
+            ranked.extend((score, name, chunk) for score, chunk in hits[1:])
+    ranked.sort(key=lambda hit: hit[0], reverse=True)
+
+    selected = {name: [] for name in indexes}
+    used_tokens = 0
+    count = 0
+    for rank, (_, name, chunk) in enumerate(sorted(best, key=lambda hit: hit[0], reverse=True) + ranked):
+        chunk_tokens = estimate_tokens(chunk['text'])
+        if (rank >= len(best) and count >= top_k) or used_tokens + chunk_tokens > token_budget:
+            continue
+        selected[name].append(chunk)
+        used_tokens += chunk_tokens
+        count += 1
+
+    # Fall back to the start of each document, sharing the budget, when nothing matches the question
+    if not count:
+        share = token_budget // len(indexes)
+        for name, index in indexes.items():
+            used_tokens = 0
+            for chunk in index.chunks:
+                chunk_tokens = estimate_tokens(chunk['text'])
+                if used_tokens + chunk_tokens > share:
+                    break
+                selected[name].append(chunk)
+                used_tokens += chunk_tokens
+
+    parts = []
+    for name, chunks in selected.items():
+        if chunks:
+            chunks.sort(key=lambda chunk: chunk['id'])
+            body = "\n...\n".join(ChunkIndex.format_chunk(chunk) for chunk in chunks)
+            parts.append(f"=== Document: {name} ===\n{body}")
+    return "\n\n".join(parts)
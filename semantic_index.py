@@ -0,0 +1,291 @@
+"""
+Local semantic search over document chunks
+--> Embeds chunks in batches with a small embedding model served by the local Ollama (all-minilm by default)
+--> Stores unit-length vectors quantized to int8 (or float16): about 400 bytes per chunk with all-minilm
+--> Approximate nearest neighbours: large indexes are clustered (IVF) and a question scans only its nearest clusters
+--> Persists each document's vectors under its content hash and reopens them memory-mapped
+--> Finds chunks that share meaning rather than words with the question ("how profitable were we" -> Net Income)
+"""
+
+# import required libraries
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ollama_http import DEFAULT_BASE_URL, get_server
+from tracing import tracer
+
+
+EMBED_MODEL = os.environ.get("FINDOC_EMBED_MODEL", "all-minilm")    # empty: semantic search off
+EMBED_BATCH = 32    # chunks per embedding request
+EMBED_TIMEOUT = 120    # seconds per batch on CPU
+
+DEFAULT_VECTOR_DIR = os.environ.get("FINDOC_VECTOR_DIR", os.path.join(".cache", "vectors"))
+DEFAULT_VECTOR_BYTES = 256 * 1024 * 1024    # 256 MB
+MANIFEST = "manifest.json"
+
+IVF_MIN_VECTORS = 4096    # smaller indexes are scanned exactly
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 256    # training vectors per cluster
+NPROBE = 8    # clusters scanned per question
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingError(Exception):
+    """Raised when the embedding model returns an error or no vectors"""
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale every row to unit length, so dot products are cosine similarities"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize(vectors: np.ndarray, dtype: str = 'int8') -> Tuple[np.ndarray, np.ndarray]:
+    """(stored vectors, per-row scales); int8 keeps each row's largest component at 127"""
+    if dtype == 'float16':
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float16)
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float16)
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = KMEANS_ITERATIONS,
+           seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """(unit centroids, cluster of every vector) by spherical k-means on a sample of the vectors"""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > clusters * KMEANS_SAMPLE:
+        sample = vectors[rng.choice(len(vectors), clusters * KMEANS_SAMPLE, replace=False)]
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)]
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=clusters)
+        filled = counts > 0    # an empty cluster keeps its centroid
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums = np.add.reduceat(sample[np.argsort(assign, kind='stable')], starts, axis=0)
+        centroids[filled] = normalize_rows(sums)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+# Embedder : Batched chunk embedding through the local Ollama server
+class Embedder:
+    """Embeds texts with an Ollama embedding model over the pooled, rate-limited server session"""
+
+    def __init__(self, model: str = EMBED_MODEL, base_url: str = DEFAULT_BASE_URL, batch_size: int = EMBED_BATCH):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.server = get_server(base_url)
+
+    def available(self) -> bool:
+        """Whether the embedding model is installed (from the model list shared by all sessions)"""
+        if not self.model:
+            return False
+        try:
+            models = self.server.list_models()
+        except Exception:
+            return False
+        return any(name == self.model or name.split(":")[0] == self.model for name in models)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """One float32 row per text, batch_size texts per request"""
+        batches = []
+        with tracer.span('embedding', chunks=len(texts)):
+            for start in range(0, len(texts), self.batch_size):
+                batch = texts[start:start + self.batch_size]
+                payload = {"model": self.model, "input": batch, "truncate": True}
+                with self.server.slot():
+                    response = self.server.session.post(f"{self.base_url}/api/embed", json=payload,
+                                                        timeout=EMBED_TIMEOUT)
+                if response.status_code != 200:
+                    raise EmbeddingError(f"Error: {response.status_code} - {response.text}")
+                embeddings = response.json().get('embeddings') or []
+                if len(embeddings) != len(batch):
+                    raise EmbeddingError(f"Error: {self.model} returned {len(embeddings)} vectors for {len(batch)} texts")
+                batches.append(np.asarray(embeddings, dtype=np.float32))
+        return np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+
+
+# Vector Index : Quantized chunk vectors with optional IVF clusters
+class VectorIndex:
+    """Row i holds chunk i of the document's ChunkIndex; clusters are built once the index is large"""
+
+    def __init__(self, vectors: np.ndarray, scales: np.ndarray, centroids: Optional[np.ndarray] = None,
+                 order: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None):
+        self.vectors = vectors    # int8 or float16 rows
+        self.scales = scales    # float16 per row: vector = stored row * scale
+        self.centroids = centroids    # float16 unit centroids, None for an exact index
+        self.order = order    # rows sorted by cluster
+        self.offsets = offsets    # cluster c holds order[offsets[c]:offsets[c + 1]]
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, dtype: str = 'int8') -> "VectorIndex":
+        unit = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        vectors, scales = quantize(unit, dtype)
+        if len(unit) < IVF_MIN_VECTORS:
+            return cls(vectors, scales)
+        clusters = int(math.sqrt(len(unit)))
+        centroids, assign = kmeans(unit, clusters)
+        order = np.argsort(assign, kind='stable').astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=clusters))]).astype(np.int64)
+        return cls(vectors, scales, centroids.astype(np.float16), order, offsets)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.vectors, self.scales, self.centroids, self.order, self.offsets)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def search(self, query: np.ndarray, top_k: int, nprobe: int = NPROBE) -> List[Tuple[float, int]]:
+        """(cosine similarity, row) of the top_k nearest rows, best first"""
+        if not len(self):
+            return []
+        query = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        if self.centroids is None:
+            rows, vectors = np.arange(len(self)), self.vectors
+        else:
+            nearest = np.argsort(self.centroids.astype(np.float32) @ query)[::-1][:nprobe]
+            rows = np.sort(np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in nearest]))
+            vectors = self.vectors[rows]
+        scores = (vectors.astype(np.float32) @ query) * self.scales[rows].astype(np.float32)
+        top = min(top_k, len(scores))
+        best = np.argpartition(scores, -top)[-top:]
+        best = best[np.argsort(scores[best])[::-1]]
+        return [(float(scores[idx]), int(rows[idx])) for idx in best]
+
+    def save(self, path: str):
+        """One .npy file per array, so load() can memory-map them"""
+        arrays = {'vectors': self.vectors, 'scales': self.scales, 'centroids': self.centroids,
+                  'order': self.order, 'offsets': self.offsets}
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(os.path.join(path, f"{name}.npy"), array)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        def array(name: str) -> Optional[np.ndarray]:
+            file = os.path.join(path, f"{name}.npy")
+            return np.load(file, mmap_mode='r') if os.path.exists(file) else None
+        return cls(array('vectors'), array('scales'), array('centroids'), array('order'), array('offsets'))
+
+
+# Vector Store : Directory of per-document vector indexes with size-based eviction
+class VectorStore:
+    """Writes and reopens VectorIndexes, one directory per document key and embedding model"""
+
+    def __init__(self, store_dir: str = DEFAULT_VECTOR_DIR, max_bytes: int = DEFAULT_VECTOR_BYTES):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, key: str, model: str) -> str:
+        return os.path.join(self.store_dir, f"{key}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', model)}")
+
+    def open(self, key: str, model: str) -> Optional[VectorIndex]:
+        """The stored index of a document, or None when it was never embedded with this model (or evicted)"""
+        path = self._path(key, model)
+        try:
+            with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+                manifest = json.load(f)
+            index = VectorIndex.load(path)
+            os.utime(os.path.join(path, MANIFEST))    # mark as recently used for eviction
+        except (OSError, ValueError):
+            return None
+        return index if manifest.get('model') == model else None
+
+    def save(self, key: str, model: str, index: VectorIndex) -> VectorIndex:
+        """Store an index and return it reopened memory-mapped; returns it unchanged on error"""
+        # Write to a temp directory first so readers never see a partial index
+        path = self._path(key, model)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_path)
+            index.save(tmp_path)
+            with open(os.path.join(tmp_path, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({'model': model, 'rows': len(index), 'dims': index.vectors.shape[1],
+                           'dtype': str(index.vectors.dtype), 'clusters': 0 if index.centroids is None
+                           else len(index.centroids)}, f)
+            shutil.rmtree(path, ignore_errors=True)    # a stale index of fewer chunks
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Could not store vectors for %s: %s", key, e)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return index
+        self._evict()
+        return self.open(key, model) or index
+
+    def _evict(self):
+        """Delete least recently used indexes until the store fits max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            try:
+                mtime = os.stat(os.path.join(path, MANIFEST)).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+            total += size
+
+        entries.sort()    # oldest first
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)    # open memory maps stay valid until closed
+            total -= size
+
+    def clear(self):
+        """Remove every stored index"""
+        for name in os.listdir(self.store_dir):
+            shutil.rmtree(os.path.join(self.store_dir, name), ignore_errors=True)
+
+
+# Semantic Search : Chunk embedding at ingest and nearest-chunk lookup per question
+class SemanticSearch:
+    """Embedder plus vector store; one shared instance serves every session"""
+
+    def __init__(self, model: str = EMBED_MODEL, base_url: str = DEFAULT_BASE_URL,
+                 store_dir: str = DEFAULT_VECTOR_DIR, dtype: str = 'int8'):
+        self.embedder = Embedder(model, base_url)
+        self.store = VectorStore(store_dir)
+        self.dtype = dtype    # 'int8' or 'float16'
+
+    @property
+    def model(self) -> str:
+        return self.embedder.model
+
+    def available(self) -> bool:
+        return self.embedder.available()
+
+    def open(self, key: str, chunks: int) -> Optional[VectorIndex]:
+        """The stored index of a document, if it covers all of its chunks"""
+        index = self.store.open(key, self.model)
+        return index if index is not None and len(index) == chunks else None
+
+    def index(self, key: str, texts: List[str]) -> VectorIndex:
+        """Embed a document's chunk texts and persist their index under the document key"""
+        index = VectorIndex.build(self.embedder.embed(texts), self.dtype)
+        return self.store.save(key, self.model, index)
+
+    def search(self, indexes: Dict[str, VectorIndex], question: str, top_k: int) -> Dict[str, List[Tuple[float, int]]]:
+        """Nearest chunk ids per document for a question; empty when the question cannot be embedded"""
+        if not indexes or not question.strip():
+            return {}
+        try:
+            query = self.embedder.embed([question])[0]
+        except Exception as e:
+            logger.warning("Semantic search skipped: %s", e)
+            return {}
+        return {name: index.search(query, top_k) for name, index in indexes.items()}
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Stub Ollama server for benchmarks, load tests and offline runs
+--> Implements /api/tags, /api/generate and /api/chat (streaming and non-streaming) with canned answers
+--> /api/embed returns hashed bag-of-words vectors, so semantic search runs offline (texts sharing words are close)
+--> Configurable latency before the first token, generation speed (tokens/sec) and parallel request slots
+--> Failure injection: a share of requests fail with an HTTP status or a dropped connection
+--> Runs in a background thread (start_stub_server) or standalone: python stub_ollama.py --port 11435
+"""
+
+# import required libraries
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional
+
+
+STUB_MODEL = "stub-model"
+STUB_EMBED_MODEL = "all-minilm"    # the default FINDOC_EMBED_MODEL
+STUB_EMBED_DIMS = 64
+STUB_ANSWER = "Based on the document, total revenue was $2,250,000 and net income was $172,900."
+FAILURE_MODES = ('status', 'disconnect')
+
+
+def embed_text(text: str, dims: int = STUB_EMBED_DIMS) -> List[float]:
+    """Unit vector of hashed word counts"""
+    vector = [0.0] * dims
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode('utf-8')) % dims] += 1.0
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+# Stub Handler : Answers Ollama API requests with canned responses
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler; settings live on the server (see start_stub_server)"""
+
+    protocol_version = "HTTP/1.1"    # keep-alive, like Ollama
+    disable_nagle_algorithm = True    # small writes would otherwise add ~40 ms per response
+
+    def log_message(self, format: str, *args: Any):
+        pass    # no per-request logging on stderr
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: Dict[str, Any]):
+        line = json.dumps(payload).encode('utf-8') + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({'models': [{'name': self.server.model}, {'name': self.server.embed_model}]})
+        else:
+            self._send_json({'error': "not found"}, 404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        chat = self.path == "/api/chat"
+        if self.path not in ("/api/generate", "/api/chat", "/api/embed"):
+            self._send_json({'error': "not found"}, 404)
+            return
+
+        server = self.server
+        server.count('requests')
+        failure = server.pick_failure()
+        if failure == 'disconnect':
+            self.close_connection = True
+            return    # no response at all, like a crashed server
+        if failure == 'status':
+            self._send_json({'error': "injected failure"}, server.failure_status)
+            return
+
+        # Like Ollama, requests beyond its parallel slots wait for a free one
+        with server.slots:
+            if self.path == "/api/embed":
+                self._embed(request)
+            else:
+                self._answer(request, chat)
+
+    def _embed(self, request: Dict[str, Any]):
+        texts = request.get('input', [])
+        texts = [texts] if isinstance(texts, str) else texts
+        self._send_json({'model': request.get('model', self.server.embed_model),
+                         'embeddings': [embed_text(text) for text in texts]})
+        self.server.count('answered')
+
+    def _answer(self, request: Dict[str, Any], chat: bool):
+        server = self.server
+        prompt = json.dumps(request.get('messages', [])) if chat else request.get('prompt', "")
+        started = time.perf_counter()
+        time.sleep(server.latency)    # model load + prompt evaluation
+        prompt_eval_s = time.perf_counter() - started
+
+        tokens = server.tokens()
+        final = {
+            'model': request.get('model', server.model), 'done': True,
+            'prompt_eval_count': len(prompt) // 4, 'prompt_eval_duration': int(prompt_eval_s * 1e9),
+            'eval_count': len(tokens),
+        }
+
+        if not request.get('stream', True):
+            generation_s = server.generation_seconds(len(tokens))
+            time.sleep(generation_s)
+            final['eval_duration'] = int(generation_s * 1e9)
+            answer = "".join(tokens)
+            self._send_json({**final, 'message': {'role': 'assistant', 'content': answer}} if chat
+                            else {**final, 'response': answer})
+            server.count('answered')
+            return
+
+        # NDJSON stream, one token per chunk, paced at the configured tokens/sec
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        generation_started = time.perf_counter()
+        for token in tokens:
+            time.sleep(server.generation_seconds(1))
+            self._write_chunk({'message': {'role': 'assistant', 'content': token}, 'done': False} if chat
+                              else {'response': token, 'done': False})
+        final['eval_duration'] = int((time.perf_counter() - generation_started) * 1e9)
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        server.count('answered')
+
+
+# Stub Server : Threaded HTTP server holding the stub's settings and counters
+class StubServer(ThreadingHTTPServer):
+    """Stub Ollama server; see start_stub_server for the settings"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 answer: str = STUB_ANSWER, model: str = STUB_MODEL, embed_model: str = STUB_EMBED_MODEL,
+                 parallel: int = 0, failure_rate: float = 0.0, failure_status: int = 500, failure_mode: str = 'status',
+                 seed: Optional[int] = None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"failure_mode must be one of {FAILURE_MODES}")
+        self.latency = latency    # seconds before the first token
+        self.tokens_per_second = tokens_per_second    # 0: all tokens at once
+        self.answer = answer
+        self.model = model
+        self.embed_model = embed_model    # listed by /api/tags next to model
+        self.parallel = parallel
+        self.slots = threading.BoundedSemaphore(parallel) if parallel else nullcontext()    # 0: unlimited
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status    # 503 is retried by the client, 500 is not
+        self.failure_mode = failure_mode
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'answered': 0, 'failed': 0}
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def pick_failure(self) -> Optional[str]:
+        """The failure to inject for this request, if any"""
+        with self._lock:
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.counters['failed'] += 1
+                return self.failure_mode
+        return None
+
+    def tokens(self) -> List[str]:
+        words = self.answer.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def generation_seconds(self, token_count: int) -> float:
+        return token_count / self.tokens_per_second if self.tokens_per_second else 0.0
+
+
+def start_stub_server(port: int = 0, latency: float = 0.0, tokens_per_second: float = 0.0, **settings: Any) -> StubServer:
+    """Serve on 127.0.0.1 from a daemon thread; port 0 picks a free port (see server.base_url)
+
+    Other settings: answer, model, embed_model, parallel (slots, 0 = unlimited), failure_rate (0-1),
+    failure_status (HTTP status of failed requests), failure_mode ('status' or 'disconnect'), seed.
+    """
+    server = StubServer(port, latency, tokens_per_second, **settings)
+    threading.Thread(target=server.serve_forever, name="stub-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server with canned answers")
+    parser.add_argument("--port", type=int, default=11435, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="generation speed (0: instant)")
+    parser.add_argument("--parallel", type=int, default=0, help="requests answered at once (0: unlimited)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests that fail (0-1)")
+    parser.add_argument("--failure-status", type=int, default=500, help="HTTP status of failed requests")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default='status',
+                        help="fail with the status or by dropping the connection")
+    parser.add_argument("--model", default=STUB_MODEL, help="model name listed by /api/tags")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for failure injection")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.tokens_per_second, model=args.model,
+                               parallel=args.parallel, failure_rate=args.failure_rate,
+                               failure_status=args.failure_status, failure_mode=args.failure_mode, seed=args.seed)
+    print(f"Stub Ollama server on {server.base_url} (model {args.model}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Served {server.counters}")
+
+
+if __name__ == "__main__":
+    main()
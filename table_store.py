@@ -0,0 +1,213 @@
+"""
+Columnar on-disk store of extracted tables
+--> Persists a document's Excel sheets or PDF tables as Arrow IPC files, keyed by document hash
+--> Reopens them memory-mapped: loading a stored document reads only metadata, and every session
+    viewing the same workbook shares the OS page cache instead of holding its own copy
+--> Reads a page of rows without materializing the sheet; full DataFrames load on first access
+--> Optional: without pyarrow, tables stay in memory as before
+"""
+
+# import required libraries
+import json
+import logging
+import os
+import shutil
+import threading
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+DEFAULT_STORE_DIR = os.environ.get("FINDOC_TABLE_DIR", os.path.join(".cache", "tables"))
+DEFAULT_STORE_BYTES = 1024 * 1024 * 1024    # 1 GB
+MANIFEST = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+
+def to_arrow(df: "pd.DataFrame") -> "pa.Table":
+    """Arrow table of a DataFrame; column names become text, columns mixing text and numbers are stored as text"""
+    import pyarrow as pa
+    if not all(isinstance(col, str) for col in df.columns):
+        df = df.rename(columns=str)
+    try:
+        return pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df)
+
+
+def sheet_frames(tables: Mapping) -> Iterator[Tuple[str, "pd.DataFrame"]]:
+    """(name, DataFrame) pairs one at a time; a LazyWorkbook reads unopened sheets without keeping them"""
+    read_sheet = getattr(tables, 'read_sheet', None)
+    for name in tables:
+        yield name, read_sheet(name) if read_sheet else tables[name]
+
+
+# Stored Tables : Sheet name -> DataFrame mapping over memory-mapped Arrow files
+class StoredTables(Mapping):
+    """Read-only mapping of sheet names to DataFrames, backed by one Arrow file per sheet"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.source = manifest['source']    # 'excel' (workbook sheets) or 'pdf' (extracted tables)
+        self.sheets = {sheet['name']: sheet for sheet in manifest['sheets']}
+        self._tables = {}    # sheet name -> memory-mapped pyarrow Table
+        self._frames = {}    # sheet name -> DataFrame, once fully accessed
+        self._lock = threading.Lock()
+
+    def table(self, sheet_name: str) -> "pa.Table":
+        """The sheet as a zero-copy Arrow table over the memory-mapped file"""
+        import pyarrow as pa
+        sheet = self.sheets[sheet_name]
+        with self._lock:
+            if sheet_name not in self._tables:
+                source = pa.memory_map(os.path.join(self.path, sheet['file']), 'r')
+                self._tables[sheet_name] = pa.ipc.open_file(source).read_all()
+            return self._tables[sheet_name]
+
+    def __getitem__(self, sheet_name: str) -> "pd.DataFrame":
+        if sheet_name not in self.sheets:
+            raise KeyError(sheet_name)
+        table = self.table(sheet_name)
+        with self._lock:
+            if sheet_name not in self._frames:
+                self._frames[sheet_name] = table.to_pandas(split_blocks=True)
+            return self._frames[sheet_name]
+
+    def __iter__(self):
+        return iter(self.sheets)
+
+    def __len__(self) -> int:
+        return len(self.sheets)
+
+    def is_loaded(self, sheet_name: str) -> bool:
+        return sheet_name in self._frames
+
+    def dtypes(self, sheet_name: str) -> "pd.Series":
+        """Column dtypes of the sheet's DataFrame, read from the Arrow schema without converting any rows"""
+        if self.is_loaded(sheet_name):
+            return self._frames[sheet_name].dtypes
+        return self.table(sheet_name).schema.empty_table().to_pandas().dtypes
+
+    def columns(self, sheet_name: str, columns: List[str]) -> "pd.DataFrame":
+        """Only the given columns of a sheet, converting just those"""
+        if self.is_loaded(sheet_name):
+            return self._frames[sheet_name][columns]
+        return self.table(sheet_name).select(columns).to_pandas()
+
+    def shape(self, sheet_name: str) -> tuple:
+        """(rows, columns) from the manifest, without opening the sheet"""
+        sheet = self.sheets[sheet_name]
+        return sheet['rows'], sheet['columns']
+
+    def page(self, sheet_name: str, start: int, rows: int) -> "pd.DataFrame":
+        """Rows start..start+rows of a sheet, converting only that slice"""
+        if self.is_loaded(sheet_name):
+            return self._frames[sheet_name].iloc[start:start + rows]
+        frame = self.table(sheet_name).slice(start, rows).to_pandas()
+        frame.index = range(start, start + len(frame))
+        return frame
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the location is pickled; the document cache entry stays tiny and reopens the files
+        return {'path': self.path}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state['path'])    # a missing directory raises, so the cache entry is reprocessed
+
+
+# Table Store : Directory of stored documents with size-based eviction
+class TableStore:
+    """Writes and reopens StoredTables, one directory per document key"""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_STORE_BYTES,
+                 on_evict: Optional[Callable[[str], Any]] = None):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict    # called with each evicted key, so caches holding its StoredTables drop it
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key)
+
+    def open(self, key: str) -> Optional[StoredTables]:
+        """The stored tables of a document, or None when it was never stored (or evicted)"""
+        path = self._path(key)
+        try:
+            tables = StoredTables(path)
+            os.utime(os.path.join(path, MANIFEST))    # mark as recently used for eviction
+        except (OSError, ValueError, KeyError):
+            return None
+        return tables
+
+    def save(self, key: str, tables: Mapping) -> Mapping:
+        """Store tables and return them reopened memory-mapped; returns tables unchanged without pyarrow or on error"""
+        if not tables or isinstance(tables, StoredTables):
+            return tables
+        stored = self.open(key)
+        if stored is not None:
+            return stored    # another session stored the same document
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return tables
+
+        # Write to a temp directory first so readers never see a partial document
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_path)
+            sheets = []
+            for idx, (name, df) in enumerate(sheet_frames(tables)):
+                table = to_arrow(df)
+                file_name = f"{idx}.arrow"
+                with pa.OSFile(os.path.join(tmp_path, file_name), 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                sheets.append({'name': name, 'file': file_name, 'rows': table.num_rows, 'columns': df.shape[1]})
+                del df, table    # released before the next sheet is read
+            with open(os.path.join(tmp_path, MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump({'source': getattr(tables, 'source', 'pdf'), 'sheets': sheets}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("Could not store tables for %s: %s", key, e)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return self.open(key) or tables    # a concurrent writer may have won the rename
+        self._evict()
+        return self.open(key) or tables
+
+    def _evict(self):
+        """Delete least recently used documents until the store fits max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.store_dir):
+            path = self._path(name)
+            try:
+                mtime = os.stat(os.path.join(path, MANIFEST)).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except OSError:
+                continue
+            entries.append((mtime, size, name))
+            total += size
+
+        entries.sort()    # oldest first
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if self.on_evict is not None:
+                self.on_evict(name)
+            shutil.rmtree(self._path(name), ignore_errors=True)    # open memory maps stay valid until closed
+            total -= size
+
+    def clear(self):
+        """Remove every stored document"""
+        for name in os.listdir(self.store_dir):
+            shutil.rmtree(self._path(name), ignore_errors=True)
@@ -0,0 +1,170 @@
+"""
+Lightweight per-stage latency tracing
+--> Records the duration and sizes (bytes, pages, rows, tokens) of each processing / LLM stage
+--> Keeps per-stage totals plus a window of recent spans for percentiles, shared process-wide
+--> Exports Prometheus text format (optionally served on FINDOC_METRICS_PORT) and JSON lines (FINDOC_TRACE_LOG)
+"""
+
+# import required libraries
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+
+RECENT_SPANS = 1000    # spans kept for percentiles and the performance panel
+TRACE_LOG = os.environ.get("FINDOC_TRACE_LOG", "")    # append every span as a JSON line to this file
+METRICS_PORT = int(os.environ.get("FINDOC_METRICS_PORT", "0"))    # serve /metrics on this port (0: off)
+
+# Stages in pipeline order, with the label shown in the performance panel
+STAGES = {
+    'upload_read': "Upload read",
+    'pdf_parse': "PDF parse",
+    'excel_parse': "Excel parse",
+    'metric_extraction': "Metric extraction",
+    'embedding': "Chunk embedding",
+    'retrieval': "Context retrieval",
+    'prompt_build': "Prompt build",
+    'llm_queue': "LLM queue wait",
+    'llm_prompt_eval': "LLM prompt eval",
+    'llm_generation': "LLM generation",
+    'llm_request': "LLM request (total)",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+# Tracer : Thread-safe store of stage spans
+class Tracer:
+    """Collects stage spans; one shared instance (tracer) serves the whole process"""
+
+    def __init__(self, recent: int = RECENT_SPANS, log_path: str = TRACE_LOG):
+        self.log_path = log_path
+        self.spans = deque(maxlen=recent)    # most recent spans, oldest first
+        self.totals = {}    # stage -> {'count', 'seconds', sizes...}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, **sizes: Any):
+        """Add one finished span; sizes are counts such as bytes=..., pages=..., tokens=..."""
+        sizes = {name: value for name, value in sizes.items() if value is not None}
+        span = {'stage': stage, 'seconds': seconds, 'at': time.time(), **sizes}
+        with self._lock:
+            self.spans.append(span)
+            total = self.totals.setdefault(stage, {'count': 0, 'seconds': 0.0})
+            total['count'] += 1
+            total['seconds'] += seconds
+            for name, value in sizes.items():
+                if isinstance(value, (int, float)):
+                    total[name] = total.get(name, 0) + value
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(span) + "\n")
+
+    @contextmanager
+    def span(self, stage: str, **sizes: Any) -> Iterator[Dict[str, Any]]:
+        """Time the block; sizes known only at the end can be set on the yielded dict"""
+        sizes = dict(sizes)
+        start = time.perf_counter()
+        try:
+            yield sizes
+        finally:
+            self.record(stage, time.perf_counter() - start, **sizes)
+
+    def traced(self, stage: str, sizes: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable:
+        """Decorator recording each call as a span; sizes(result, *args) returns the span's sizes"""
+        def decorate(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                self.record(stage, time.perf_counter() - start, **(sizes(result, *args) if sizes else {}))
+                return result
+            return wrapper
+        return decorate
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-stage count, mean / p95 / last duration and the size totals, in pipeline order"""
+        with self._lock:
+            spans = list(self.spans)
+            totals = {stage: dict(total) for stage, total in self.totals.items()}
+        rows = []
+        for stage in sorted(totals, key=lambda name: list(STAGES).index(name) if name in STAGES else len(STAGES)):
+            total = totals[stage]
+            recent = [span['seconds'] for span in spans if span['stage'] == stage]
+            sizes = {name: value for name, value in total.items() if name not in ('count', 'seconds')}
+            rows.append({
+                'stage': stage,
+                'label': STAGES.get(stage, stage),
+                'count': total['count'],
+                'mean_ms': total['seconds'] / total['count'] * 1000,
+                'p95_ms': percentile(recent, 95) * 1000 if recent else None,
+                'last_ms': recent[-1] * 1000 if recent else None,
+                **sizes,
+            })
+        return rows
+
+    def prometheus_text(self) -> str:
+        """Totals in the Prometheus text exposition format"""
+        with self._lock:
+            totals = {stage: dict(total) for stage, total in self.totals.items()}
+        lines = [
+            "# HELP findoc_stage_seconds Time spent per processing stage",
+            "# TYPE findoc_stage_seconds summary",
+        ]
+        for stage, total in totals.items():
+            lines.append(f'findoc_stage_seconds_sum{{stage="{stage}"}} {total["seconds"]:.6f}')
+            lines.append(f'findoc_stage_seconds_count{{stage="{stage}"}} {total["count"]}')
+        lines += [
+            "# HELP findoc_stage_size_total Items processed per stage (bytes, pages, rows, tokens)",
+            "# TYPE findoc_stage_size_total counter",
+        ]
+        for stage, total in totals.items():
+            for name, value in total.items():
+                if name not in ('count', 'seconds'):
+                    lines.append(f'findoc_stage_size_total{{stage="{stage}",unit="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.totals.clear()
+
+
+tracer = Tracer()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    """Serve the tracer's Prometheus text on /metrics from a daemon thread; returns None when port is 0"""
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer    # only needed with an endpoint
+
+    # Metrics Handler : Answers Prometheus scrapes
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,310 @@
+"""
+Multi-document workspace
+--> Holds any number of documents, each with its own text, tables, metrics and retrieval index
+--> Folds pages extracted in the background into the document they belong to
+--> Swaps the results of background processing jobs into their documents in one step
+--> Builds question context across selected documents by merging their ranked chunks
+--> Prepends precomputed period analytics (growth, trailing totals, ratios) for the line items a question names
+--> Answers numeric questions per document so every value stays attributed
+--> Embeds each loaded document's chunks for semantic search and fuses the nearest chunks into retrieval
+"""
+
+# import required libraries
+import logging
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Set
+
+from metrics import default_extractor, merge_metrics
+from pdf_extract import join_pages
+from retrieval import ChunkIndex, build_multi_context, estimate_tokens, DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET
+from tracing import tracer
+
+if TYPE_CHECKING:    # pandas-backed modules load on first use, keeping imports fast for workers and the CLI
+    from ingest import PdfIngestion
+    from jobs import JobQueue
+    from query_engine import QueryRouter
+    from semantic_index import SemanticSearch
+
+
+# Keys of a processed document, as stored in the document cache
+PROCESSED_KEYS = ('document_content', 'excel_data', 'financial_metrics', 'document_index', 'table_stats',
+                  'period_cubes')
+
+# Questions offered as one-click buttons in the app and asked of every document by the batch CLI
+QUICK_QUESTIONS = ["What is the total revenue?", "What are the main expenses?", "What is the net income?"]
+
+logger = logging.getLogger(__name__)
+
+
+def empty_document() -> Dict[str, Any]:
+    """Processed fields for a document whose pages are still being extracted"""
+    return {
+        'document_content': "",
+        'excel_data': {},
+        'financial_metrics': {},
+        'document_index': ChunkIndex([]),
+        'table_stats': {},
+        'period_cubes': {},
+    }
+
+
+def replace_changed(current: Dict[str, Any], updated: Dict[str, Any], names: List[str], changed: Set[str]) -> Dict[str, Any]:
+    """current with the entries of changed names taken from updated (dropped when it has none), in names order"""
+    merged = {}
+    for name in names:
+        value = updated.get(name) if name in changed else current.get(name)
+        if value is not None:
+            merged[name] = value
+    return merged
+
+
+# Workspace : Documents loaded in one session, keyed by content hash
+class Workspace:
+    """Ordered collection of processed documents that questions can target"""
+
+    def __init__(self, jobs: Optional["JobQueue"] = None, semantic: Optional["SemanticSearch"] = None):
+        self.documents = {}    # content hash -> document dict, in upload order
+        self.jobs = jobs    # background processing jobs (documents added with a job id)
+        self.semantic = semantic    # chunk embedding and nearest-chunk search (None: BM25 only)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: str, name: str, processed: Optional[Dict[str, Any]] = None,
+            ingestion: Optional["PdfIngestion"] = None, job: Optional[str] = None, **info: Any) -> Dict[str, Any]:
+        """Add a processed document (or one still being ingested or processed); extra info such as size is kept"""
+        # Same file name with different content: keep both, distinguishable
+        names = {document['name'] for document in self.documents.values()}
+        unique_name, copy = name, 2
+        while unique_name in names:
+            unique_name, copy = f"{name} ({copy})", copy + 1
+
+        document = {
+            'key': key,
+            'name': unique_name,
+            **info,
+            **(processed or empty_document()),
+            'ingestion': ingestion,    # background PDF extraction still in progress
+            'job': job,    # id of the background processing job still in progress
+            'ingested_pages': 0,    # pages already folded into the document
+            'table_collector': None,    # tables of the pages folded in so far, while ingesting
+            'error': None,
+            'query_router': None,    # numeric fast path over this document's tables
+            'semantic_index': None,    # chunk vectors, once embedded
+            'embedding_job': None,    # id of the background embedding job still in progress
+        }
+        self.documents[key] = document
+        if processed is not None:
+            self.embed(document)
+        return document
+
+    def remove(self, key: str):
+        document = self.documents.pop(key, None)
+        if document is not None:
+            self._stop(document)
+            for job in (document['job'], document['embedding_job']):
+                if job is not None:
+                    self.jobs.collect(job)    # nobody will poll for it any more
+
+    def cancel(self, key: str):
+        """Stop loading a document; it stays in the workspace with what was loaded so far"""
+        document = self.documents.get(key)
+        if document is not None:
+            self._stop(document)
+
+    def _stop(self, document: Dict[str, Any]):
+        if document['ingestion'] is not None:
+            document['ingestion'].cancel()
+        for job in (document['job'], document['embedding_job']):
+            if job is not None:
+                self.jobs.cancel(job)
+
+    def retain(self, keys: List[str]):
+        """Drop documents not in keys and order the rest like keys"""
+        for key in list(self.documents):
+            if key not in keys:
+                self.remove(key)
+        self.documents = {key: self.documents[key] for key in keys if key in self.documents}
+
+    def select(self, keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Documents with the given keys (all when None), in workspace order"""
+        return [document for key, document in self.documents.items() if keys is None or key in keys]
+
+    def ingesting(self, keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Selected documents still being extracted or processed in the background"""
+        return [document for document in self.select(keys)
+                if document['ingestion'] is not None or document['job'] is not None]
+
+    def embedding(self, keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Selected documents whose chunks are still being embedded"""
+        return [document for document in self.select(keys) if document['embedding_job'] is not None]
+
+    def embed(self, document: Dict[str, Any]):
+        """Reopen the document's stored chunk vectors, or embed its chunks (on the job queue when there is one)"""
+        chunks = document['document_index'].chunks
+        if self.semantic is None or not chunks or not self.semantic.available():
+            return
+        document['semantic_index'] = self.semantic.open(document['key'], len(chunks))
+        if document['semantic_index'] is not None:
+            return
+        texts = [chunk['text'] for chunk in chunks]
+        if self.jobs is None:
+            try:
+                document['semantic_index'] = self.semantic.index(document['key'], texts)
+            except Exception as e:
+                logger.warning("Could not embed %s: %s", document['name'], e)
+        else:
+            document['embedding_job'] = self.jobs.submit(self.semantic.index, document['key'], texts,
+                                                         name=f"Embed {document['name']}")
+
+    @staticmethod
+    def processed(document: Dict[str, Any]) -> Dict[str, Any]:
+        """The cacheable part of a document"""
+        return {key: document[key] for key in PROCESSED_KEYS}
+
+    def sync(self) -> List[Dict[str, Any]]:
+        """Fold pages extracted and jobs finished since the last call into their documents; return documents that finished"""
+        finished_documents = []
+        for document in self.documents.values():
+            if document['embedding_job'] is not None:
+                self._sync_embedding(document)
+
+            if document['job'] is not None:
+                if self._sync_job(document):
+                    finished_documents.append(document)
+                    if document['error'] is None:
+                        self.embed(document)
+                continue
+
+            ingestion = document['ingestion']
+            if ingestion is None:
+                continue
+
+            finished = ingestion.done    # read before the snapshot so no final pages are missed
+            new_pages = ingestion.snapshot(document['ingested_pages'])
+            if new_pages:
+                from column_stats import table_stats
+                from pdf_tables import TableCollector
+                from period_analytics import build_cubes
+                # Collect tables first: merging page-spanning tables fixes the new pages' column names
+                if document['table_collector'] is None:
+                    document['table_collector'] = TableCollector()
+                new_pages, changed = document['table_collector'].add(new_pages)
+                tables = document['table_collector'].tables
+                # Stats and cubes are recomputed only for the tables these pages added or extended
+                changed_tables = {name: tables[name] for name in tables if name in changed}
+                names = list(tables)
+                document['excel_data'] = dict(tables)
+                document['table_stats'] = replace_changed(document['table_stats'], table_stats(changed_tables),
+                                                          names, changed)
+                document['period_cubes'] = replace_changed(document['period_cubes'], build_cubes(changed_tables),
+                                                           names, changed)
+                document['document_index'].add_pages(new_pages)
+                document['document_content'] += join_pages(new_pages)
+                # Only the new pages are scanned; each page's scale statement covers that page alone
+                with tracer.span('metric_extraction', chars=sum(len(page['text']) for page in new_pages)) as span:
+                    document['financial_metrics'] = merge_metrics(document['financial_metrics'],
+                                                                  default_extractor.extract_pages(new_pages))
+                    span['metrics'] = len(document['financial_metrics'])
+                document['ingested_pages'] += len(new_pages)
+
+            if finished:
+                document['ingestion'] = None
+                document['table_collector'] = None
+                document['error'] = ingestion.error or ("Cancelled" if ingestion.cancelled else None)
+                finished_documents.append(document)
+                if document['error'] is None:
+                    self.embed(document)    # a stopped document keeps keyword search only
+        return finished_documents
+
+    def _sync_job(self, document: Dict[str, Any]) -> bool:
+        """Swap a finished job's result into its document; False while the job is still pending"""
+        job = self.jobs.collect(document['job'])
+        if job is None:
+            return False
+        document['job'] = None
+        if job['status'] == 'done':
+            document.update(self.processed(job['result']))    # all fields at once, never a half-loaded document
+        else:
+            document['error'] = job['error'] or "Cancelled"
+        return True
+
+    def _sync_embedding(self, document: Dict[str, Any]):
+        """Attach a finished embedding job's vectors; a failed one leaves the document on keyword search"""
+        job = self.jobs.collect(document['embedding_job'])
+        if job is None:
+            return
+        document['embedding_job'] = None
+        if job['status'] == 'done':
+            document['semantic_index'] = job['result']
+        elif job['error']:
+            logger.warning("Could not embed %s: %s", document['name'], job['error'])
+
+    def build_context(self, question: str, keys: Optional[List[str]] = None, top_k: int = DEFAULT_TOP_K,
+                      token_budget: int = DEFAULT_TOKEN_BUDGET, semantic: bool = True) -> str:
+        """Relevant chunks from the selected documents, merged by score and labelled by document
+
+        With semantic=True, documents with chunk vectors also rank chunks by their similarity to the question.
+        """
+        documents = self.select(keys)
+        indexes = {document['name']: document['document_index'] for document in documents}
+        if not indexes:
+            return ""
+        with tracer.span('retrieval', documents=len(indexes)) as span:
+            neighbours = {}
+            if semantic and self.semantic is not None:
+                vectors = {document['name']: document['semantic_index'] for document in documents
+                           if document['semantic_index'] is not None}
+                neighbours = self.semantic.search(vectors, question, top_k * 2)
+            analytics = self.analytics_context(question, keys)
+            analytics_tokens = estimate_tokens(analytics)
+            if analytics_tokens > token_budget // 2:
+                analytics, analytics_tokens = "", 0    # never crowd out the document itself
+            context = build_multi_context(indexes, question, top_k, token_budget - analytics_tokens, neighbours)
+            context = f"{analytics}\n\n{context}" if analytics and context else analytics or context
+            span['tokens'] = estimate_tokens(context)
+        return context
+
+    def analytics_context(self, question: str, keys: Optional[List[str]] = None) -> str:
+        """Precomputed period figures for the line items the question names, labelled by document"""
+        documents = [document for document in self.select(keys) if document['period_cubes']]
+        if not question or not documents:
+            return ""
+        from period_analytics import analytics_context
+        labelled = len(documents) > 1
+        parts = [analytics_context(document['period_cubes'], question, document['name'] if labelled else "")
+                 for document in documents]
+        return "\n\n".join(part for part in parts if part)
+
+    @staticmethod
+    def router(document: Dict[str, Any]) -> "QueryRouter":
+        """Return the document's router, rebuilding it when its tables or metrics change"""
+        from query_engine import QueryRouter
+        router = document['query_router']
+        if (router is None or router.tables is not document['excel_data']
+                or router.metrics is not document['financial_metrics'] or router.cubes is not document['period_cubes']):
+            router = QueryRouter(document['excel_data'], document['financial_metrics'], document['period_cubes'])
+            document['query_router'] = router
+        return router
+
+    def route(self, question: str, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Answer a numeric question from every selected document, or send it to the model"""
+        documents = self.select(keys)
+        results = [self.router(document).route(question) for document in documents]
+        elapsed_ms = sum(result['elapsed_ms'] for result in results)
+        if not results or any(result['answer'] is None for result in results):
+            return {'route': 'llm', 'answer': None, 'elapsed_ms': elapsed_ms}
+        if len(results) == 1:
+            return results[0]
+
+        routes = {result['route'] for result in results}
+        answer = "\n\n".join(f"📄 **{document['name']}**\n\n{result['answer']}"
+                             for document, result in zip(documents, results))
+        return {'route': 'table' if routes == {'table'} else 'metrics', 'answer': answer, 'elapsed_ms': elapsed_ms}
+
+    @staticmethod
+    def cache_key(keys: List[str]) -> str:
+        """Answer cache key for a set of documents"""
+        return "+".join(sorted(keys))